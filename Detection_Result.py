@@ -0,0 +1,196 @@
+#encoding=utf-8
+import os
+import struct
+import numpy as np
+from file_util import iter_detection_results
+
+MAGIC = b'DETBIN02'
+# magic, number of frames, number of boxes, bytes and entries of the label table, bytes and entries of the name table
+HEADER = struct.Struct('<8sQQQQQQ')
+HEADER_SIZE = 64
+
+def align(position):
+    return (position + 7) // 8 * 8
+
+def format_number(value):
+    """ shortest text of a float32 coordinate or score, integers are written without a decimal point
+
+    """
+    value = np.float32(value)
+    if value.is_integer():
+        return '%d' % value
+    return str(value)
+
+def split_table(text, count):
+    """ entries of a newline joined table, count is the entry count from the header
+
+    """
+    if count == 0:
+        return []
+    entries = text.split('\n')
+    if len(entries) != count:
+        raise ValueError('the table has {} entries, the header says {}'.format(len(entries), count))
+    return entries
+
+class Detection_Result():
+    """ binary container of detection results, one frame per image
+
+        offsets: (F + 1,) int64, the boxes of frame i are boxes[offsets[i]:offsets[i + 1]]
+        boxes: (N, 4) float32 xmin, ymin, xmax, ymax
+        scores: (N,) float32
+        class_ids: (N,) int32 index into labels
+        labels: (C,) label table
+        names: (F,) or (0,) image names of the frames, optional
+
+        file layout: 64 byte header, then offsets, boxes, scores, class_ids, the label table and the name table,
+        each section starts on 8 bytes and the tables are utf-8 text joined by newlines, their entry counts are in the header
+    """
+    def __init__(self, offsets, boxes, scores, class_ids, labels, names=None):
+        super(Detection_Result, self).__init__()
+        self.offsets = offsets
+        self.boxes = boxes
+        self.scores = scores
+        self.class_ids = class_ids
+        self.labels = labels
+        self.names = names if names is not None else np.array([], dtype=str)
+
+    @classmethod
+    def from_frames(cls, frames, names=None):
+        """
+            :param frames: iterable of (boxes, labels, scores), e.g. file_util.iter_detection_results
+            :param names: [optional] image names of the frames
+        """
+        label_index = {}
+        counts = []
+        boxes = []
+        scores = []
+        class_ids = []
+        for frame_boxes, frame_labels, frame_scores in frames:
+            counts.append(len(frame_boxes))
+            boxes.append(np.asarray(frame_boxes, dtype=np.float32).reshape(-1, 4))
+            scores.append(np.asarray(frame_scores, dtype=np.float32))
+            class_ids.append(np.array([label_index.setdefault(str(label), len(label_index)) for label in frame_labels], dtype=np.int32))
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        labels = sorted(label_index, key=label_index.get)
+        return cls(offsets,
+                   np.concatenate(boxes) if boxes else np.zeros((0, 4), dtype=np.float32),
+                   np.concatenate(scores) if scores else np.zeros(0, dtype=np.float32),
+                   np.concatenate(class_ids) if class_ids else np.zeros(0, dtype=np.int32),
+                   np.array(labels, dtype=str),
+                   np.array(names, dtype=str) if names is not None else None)
+
+    @classmethod
+    def from_txt(cls, txt_file, names=None):
+        """ convert a detection result txt (xmin, ymin, xmax, ymax, label, score; ...)
+
+        """
+        return cls.from_frames(iter_detection_results(txt_file), names)
+
+    @classmethod
+    def from_xml_dir(cls, xml_dir, workers=1):
+        """ convert a VOC xml folder, one frame per xml file in sorted order, every score is 1
+
+            :return: (Detection_Result, (F, 2) int32 width and height of the images)
+        """
+        from XML_Dataset import XML_Dataset
+        dataset = XML_Dataset.from_dir(xml_dir, workers=workers)
+        names = [os.path.splitext(name)[0] for name in dataset.files]
+        result = cls(dataset.offsets.astype(np.int64),
+                     dataset.boxes.astype(np.float32),
+                     np.ones(len(dataset.boxes), dtype=np.float32),
+                     dataset.class_ids.astype(np.int32),
+                     dataset.class_names,
+                     np.array(names, dtype=str))
+        return result, dataset.sizes
+
+    def to_txt(self, txt_file):
+        with open(txt_file, 'w') as f:
+            for boxes, labels, scores in self:
+                f.write(''.join('%s,%s,%s,%s,%s,%s;' % (format_number(box[0]), format_number(box[1]), format_number(box[2]),
+                                                        format_number(box[3]), label, format_number(score))
+                                for box, label, score in zip(boxes, labels, scores)) + '\n')
+
+    def to_xml_dir(self, target_dir, image_sizes, names=None, workers=1):
+        """ write one VOC xml per frame with xml_util.generate_xmls
+
+            :param image_sizes: (F, 2) width and height of the images
+            :param names: [optional] image names, default self.names or the frame numbers
+        """
+        from xml_util import generate_xmls
+        if names is None:
+            names = self.names if len(self.names) == len(self) else ['%06d' % i for i in range(len(self))]
+        records = ((str(names[i]), int(image_sizes[i][0]), int(image_sizes[i][1]),
+                    [[format_number(v) for v in box] + [str(label)] for box, label in zip(*self[i][:2])])
+                   for i in range(len(self)))
+        return generate_xmls(target_dir, records, workers=workers)
+
+    def save(self, path):
+        tables = [[str(label) for label in self.labels], [str(name) for name in self.names]]
+        if any('\n' in entry for table in tables for entry in table):
+            raise ValueError('labels and image names can not contain a newline')
+        labels = '\n'.join(tables[0]).encode('utf-8')
+        names = '\n'.join(tables[1]).encode('utf-8')
+        sections = [np.ascontiguousarray(self.offsets, dtype='<i8'),
+                    np.ascontiguousarray(self.boxes, dtype='<f4'),
+                    np.ascontiguousarray(self.scores, dtype='<f4'),
+                    np.ascontiguousarray(self.class_ids, dtype='<i4')]
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(self), len(self.boxes), len(labels), len(tables[0]),
+                                len(names), len(tables[1])).ljust(HEADER_SIZE, b'\0'))
+            for data in [section.tobytes() for section in sections] + [labels, names]:
+                f.write(data)
+                f.write(b'\0' * (align(len(data)) - len(data)))
+
+    @classmethod
+    def open(cls, path, mmap=True):
+        """ read a file written by save, the arrays are np.memmap views of the file when mmap is True
+
+        """
+        with open(path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+            if header[:8] != MAGIC:
+                raise ValueError('{} is not a detection result file'.format(path))
+            magic, frame_count, box_count, label_bytes, label_count, name_bytes, name_count = HEADER.unpack(header[:HEADER.size])
+            position = HEADER_SIZE
+            arrays = []
+            for dtype, shape in [('<i8', (frame_count + 1,)), ('<f4', (box_count, 4)), ('<f4', (box_count,)), ('<i4', (box_count,))]:
+                size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+                if mmap and size > 0:
+                    arrays.append(np.memmap(path, dtype=dtype, mode='r', offset=position, shape=shape))
+                else:
+                    f.seek(position)
+                    arrays.append(np.frombuffer(f.read(size), dtype=dtype).reshape(shape))
+                position += align(size)
+            f.seek(position)
+            labels = f.read(label_bytes).decode('utf-8')
+            f.seek(position + align(label_bytes))
+            names = f.read(name_bytes).decode('utf-8')
+        labels = np.array(split_table(labels, label_count), dtype=str)
+        names = np.array(split_table(names, name_count), dtype=str)
+        return cls(*(arrays + [labels, names]))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        """ (boxes, labels, scores) of frame i, boxes and scores are views of the arrays
+
+        """
+        if i < 0:
+            i += len(self)
+        if i < 0 or i >= len(self):
+            raise IndexError("frame index out of range")
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.boxes[start:end], self.labels[self.class_ids[start:end]], self.scores[start:end]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def frame_fields(self, i):
+        """ frame i in the list format of file_util.read_detection_result_from_txt
+
+        """
+        boxes, labels, scores = self[i]
+        return [[format_number(v) for v in box] + [str(label), format_number(score)] for box, label, score in zip(boxes, labels, scores)]
@@ -0,0 +1,156 @@
+#encoding=utf-8
+import os
+import numpy as np
+from multiprocessing import Pool
+from XML_Index import parse_annotation_entry
+
+class XML_Dataset():
+    """ structure-of-arrays view of a VOC xml folder
+
+        files: (F,) names of the xml files
+        sizes: (F, 2) int32 width and height of every file, 0 when missing
+        offsets: (F + 1,) int64, the boxes of files[i] are boxes[offsets[i]:offsets[i + 1]]
+        boxes: (N, 4) int32 xmin, ymin, xmax, ymax, missing coordinates are 0
+        class_ids: (N,) uint16 index into class_names
+        class_names: (C,) names of the classes
+    """
+    ARRAYS = ['files', 'sizes', 'offsets', 'boxes', 'class_ids', 'class_names']
+
+    def __init__(self, files, sizes, offsets, boxes, class_ids, class_names):
+        super(XML_Dataset, self).__init__()
+        self.files = files
+        self.sizes = sizes
+        self.offsets = offsets
+        self.boxes = boxes
+        self.class_ids = class_ids
+        self.class_names = class_names
+
+    @classmethod
+    def from_dir(cls, xml_dir, workers=1, chunk_size=256):
+        """ parse every xml file in xml_dir, files that fail to parse are kept with no boxes
+
+            :param xml_dir: folder of the xml files
+            :param workers: number of processes used to parse the files
+            :param chunk_size: number of xml files sent to a worker at a time
+        """
+        names = sorted(x for x in os.listdir(xml_dir) if x.endswith('.xml'))
+        args = [(name, os.path.join(xml_dir, name)) for name in names]
+        if workers > 1:
+            with Pool(workers) as pool:
+                parsed = list(pool.imap(parse_annotation_entry, args, chunksize=chunk_size))
+        else:
+            parsed = [parse_annotation_entry(arg) for arg in args]
+        class_index = {}
+        sizes = np.zeros((len(names), 2), dtype=np.int32)
+        counts = np.zeros(len(names), dtype=np.int64)
+        boxes = []
+        class_ids = []
+        for i, (name, annotation) in enumerate(parsed):
+            if annotation is None:
+                continue
+            width, height, depth, objects = annotation
+            sizes[i] = [width or 0, height or 0]
+            counts[i] = len(objects)
+            for obj in objects:
+                class_ids.append(class_index.setdefault(obj[0], len(class_index)))
+                boxes.append([int(v) if v is not None else 0 for v in obj[1:]])
+        offsets = np.zeros(len(names) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        class_names = sorted(class_index, key=class_index.get)
+        return cls(np.array(names, dtype=str),
+                   sizes,
+                   offsets,
+                   np.array(boxes, dtype=np.int32).reshape(-1, 4),
+                   np.array(class_ids, dtype=np.uint16),
+                   np.array([str(name) for name in class_names], dtype=str))
+
+    def save(self, path):
+        """ save to path.npz, or to a folder of .npy files when path has no .npz suffix
+            (such a folder can be loaded memory-mapped)
+
+        """
+        if path.endswith('.npz'):
+            np.savez(path, **dict((key, getattr(self, key)) for key in self.ARRAYS))
+            return
+        if not os.path.exists(path):
+            os.makedirs(path)
+        for key in self.ARRAYS:
+            np.save(os.path.join(path, key + '.npy'), getattr(self, key))
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        """ load a dataset written by save
+
+            :param path: .npz file or folder of .npy files
+            :param mmap_mode: used for a folder of .npy files, None reads the arrays into memory
+        """
+        if path.endswith('.npz'):
+            with np.load(path) as data:
+                return cls(*[data[key] for key in cls.ARRAYS])
+        return cls(*[np.load(os.path.join(path, key + '.npy'), mmap_mode=mmap_mode) for key in cls.ARRAYS])
+
+    def __len__(self):
+        return len(self.files)
+
+    def file_ids(self):
+        """ (N,) index into files of every box
+
+        """
+        return np.repeat(np.arange(len(self.files)), np.diff(self.offsets))
+
+    def get_boxes(self, i):
+        """ boxes and class names of files[i]
+
+        """
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.boxes[start:end], self.class_names[self.class_ids[start:end]]
+
+    def class_ids_of(self, classes):
+        return np.array([i for i, name in enumerate(self.class_names) if name in classes], dtype=np.uint16)
+
+    def count_classes(self):
+        """ {class: number of instances}, same as XML_Tool.count_classes
+
+        """
+        counts = np.bincount(self.class_ids, minlength=len(self.class_names))
+        return dict((str(name), int(count)) for name, count in zip(self.class_names, counts) if count > 0)
+
+    def box_mask(self, classes=None, min_width=0, min_height=0, max_width=None, max_height=None):
+        """ (N,) bool mask of the boxes of classes whose size lies in the given range
+
+        """
+        width = np.abs(self.boxes[:, 2] - self.boxes[:, 0])
+        height = np.abs(self.boxes[:, 3] - self.boxes[:, 1])
+        mask = (width >= min_width) & (height >= min_height)
+        if max_width is not None:
+            mask &= width <= max_width
+        if max_height is not None:
+            mask &= height <= max_height
+        if classes is not None:
+            mask &= np.isin(self.class_ids, self.class_ids_of(classes))
+        return mask
+
+    def files_with_boxes(self, mask):
+        """ sorted names of the files holding at least one box selected by mask
+
+        """
+        return self.files[np.unique(self.file_ids()[mask])]
+
+    def files_with_classes(self, classes):
+        return self.files_with_boxes(self.box_mask(classes))
+
+    def iou(self, box, mask=None):
+        """ iou of one [xmin, ymin, xmax, ymax] box against every box (or the boxes selected by mask)
+
+        """
+        boxes = self.boxes if mask is None else self.boxes[mask]
+        boxes = boxes.astype(np.float64)
+        xmin = np.maximum(boxes[:, 0], box[0])
+        ymin = np.maximum(boxes[:, 1], box[1])
+        xmax = np.minimum(boxes[:, 2], box[2])
+        ymax = np.minimum(boxes[:, 3], box[3])
+        inter = np.clip(xmax - xmin, 0, None) * np.clip(ymax - ymin, 0, None)
+        area = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        union = area + (box[2] - box[0]) * (box[3] - box[1]) - inter
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(union > 0, inter / union, 0.0)
@@ -0,0 +1,149 @@
+#encoding=utf-8
+import os
+import sqlite3
+from multiprocessing import Pool
+try:
+    import xml.etree.cElementTree as ET
+except ImportError:
+    import xml.etree.ElementTree as ET
+
+def to_number(text):
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return None
+
+def parse_annotation(xml_path):
+    """ parse one VOC xml into (width, height, depth, [(name, xmin, ymin, xmax, ymax), ...])
+
+        :param xml_path: xml file
+    """
+    root = ET.parse(xml_path).getroot()
+    size = root.find('size')
+    width, height, depth = None, None, None
+    if size is not None:
+        width, height, depth = [to_number(size.findtext(tag)) for tag in ['width', 'height', 'depth']]
+    objects = []
+    for obj in root.findall('object'):
+        bndbox = obj.find('bndbox')
+        box = [None] * 4
+        if bndbox is not None:
+            box = [to_number(bndbox.findtext(tag)) for tag in ['xmin', 'ymin', 'xmax', 'ymax']]
+        objects.append((obj.findtext('name'),) + tuple(box))
+    return width, height, depth, objects
+
+def parse_annotation_entry(args):
+    name, xml_path = args
+    try:
+        return name, parse_annotation(xml_path)
+    except (ET.ParseError, IOError, OSError):
+        return name, None
+
+class XML_Index():
+    def __init__(self, xml_dir, index_path, workers=1, chunk_size=256):
+        """ on-disk sqlite index of the object names, boxes and image sizes of the xml files in xml_dir
+
+            :param xml_dir: folder of the xml files
+            :param index_path: sqlite file, created when it does not exist
+            :param workers: number of processes used to parse changed files
+            :param chunk_size: number of xml files sent to a worker at a time
+        """
+        super(XML_Index, self).__init__()
+        self.xml_dir = xml_dir
+        self.index_path = index_path
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.conn = sqlite3.connect(index_path)
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS files (
+                name TEXT PRIMARY KEY, mtime INTEGER, size INTEGER,
+                width REAL, height REAL, depth REAL, valid INTEGER);
+            CREATE TABLE IF NOT EXISTS objects (
+                file TEXT, class TEXT, xmin REAL, ymin REAL, xmax REAL, ymax REAL);
+            CREATE INDEX IF NOT EXISTS objects_file ON objects (file);
+            CREATE INDEX IF NOT EXISTS objects_class ON objects (class);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);
+        ''')
+
+    def close(self):
+        self.conn.close()
+
+    def update(self, check_files=True):
+        """ re-parse the xml files added or changed (by mtime and size) since the last update
+            and drop the removed ones
+
+            :param check_files: stat every xml file, with False nothing is done while the mtime of xml_dir is
+                unchanged, which covers added, removed and atomically replaced (XML_Tool) files
+                but not files edited in place
+            :return: (number of parsed files, number of removed files)
+        """
+        dir_mtime = os.stat(self.xml_dir).st_mtime_ns
+        if not check_files:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'dir_mtime'").fetchone()
+            if row is not None and row[0] == dir_mtime:
+                return 0, 0
+        stats = {}
+        for entry in os.scandir(self.xml_dir):
+            if entry.name.endswith('.xml') and entry.is_file():
+                stat = entry.stat()
+                stats[entry.name] = (stat.st_mtime_ns, stat.st_size)
+        known = dict((name, (mtime, size)) for name, mtime, size in self.conn.execute('SELECT name, mtime, size FROM files'))
+        changed = sorted(name for name, key in stats.items() if known.get(name) != key)
+        removed = [name for name in known if name not in stats]
+        args = [(name, os.path.join(self.xml_dir, name)) for name in changed]
+        if self.workers > 1 and len(args) > self.chunk_size:
+            with Pool(self.workers) as pool:
+                parsed = list(pool.imap(parse_annotation_entry, args, chunksize=self.chunk_size))
+        else:
+            parsed = [parse_annotation_entry(arg) for arg in args]
+        with self.conn:
+            stale = [(name,) for name in removed + changed if name in known]
+            self.conn.executemany('DELETE FROM files WHERE name = ?', stale)
+            self.conn.executemany('DELETE FROM objects WHERE file = ?', stale)
+            files = []
+            objects = []
+            for name, annotation in parsed:
+                mtime, size = stats[name]
+                if annotation is None:
+                    # keep broken files in the index so that they are not re-parsed until they change
+                    files.append((name, mtime, size, None, None, None, 0))
+                    continue
+                width, height, depth, boxes = annotation
+                files.append((name, mtime, size, width, height, depth, 1))
+                objects.extend((name,) + box for box in boxes)
+            self.conn.executemany('INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, ?)', files)
+            self.conn.executemany('INSERT INTO objects VALUES (?, ?, ?, ?, ?, ?)', objects)
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('dir_mtime', ?)", (dir_mtime,))
+        return len(changed), len(removed)
+
+    def count_classes(self):
+        """ {class: number of instances} over all indexed xml files
+
+        """
+        return dict(self.conn.execute('SELECT class, COUNT(*) FROM objects GROUP BY class'))
+
+    def files_with_classes(self, classes):
+        """ sorted names of the xml files containing any of classes
+
+            :param classes: specified classes
+        """
+        classes = list(classes)
+        if len(classes) == 0:
+            return []
+        query = 'SELECT DISTINCT file FROM objects WHERE class IN (%s) ORDER BY file' % ','.join('?' * len(classes))
+        return [name for name, in self.conn.execute(query, classes)]
+
+    def read_objects(self, name):
+        """ [{"name", "xmin", "ymin", "xmax", "ymax"}, ...] of one indexed xml file
+
+            :param name: xml file name in xml_dir
+        """
+        rows = self.conn.execute('SELECT class, xmin, ymin, xmax, ymax FROM objects WHERE file = ? ORDER BY rowid', (name,))
+        return [{"name": row[0], "xmin": row[1], "ymin": row[2], "xmax": row[3], "ymax": row[4]} for row in rows]
+
+    def get_size(self, name):
+        """ (width, height, depth) of one indexed xml file, None if it is not indexed
+
+            :param name: xml file name in xml_dir
+        """
+        return self.conn.execute('SELECT width, height, depth FROM files WHERE name = ?', (name,)).fetchone()
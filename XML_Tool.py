@@ -1,17 +1,147 @@
 #encoding=utf-8
 import os
+from collections import Counter
+from multiprocessing import Pool
 from tqdm import tqdm
 from basicFun import XML as XML
 from basicFun import FILES
+from basicFun import MANIFEST
+from XML_Index import XML_Index
 try: 
     import xml.etree.cElementTree as ET 
 except ImportError: 
     import xml.etree.ElementTree as ET
 
+# per-file workers, kept at module level so that they can be sent to a process pool
+
+def object_key(obj):
+    return tuple(obj.findtext(path) for path in ('name', 'bndbox/xmin', 'bndbox/ymin', 'bndbox/xmax', 'bndbox/ymax'))
+
+def add_classes_to_xml(args):
+    xml_path, refer_path, classes = args
+    if not os.path.exists(refer_path):
+        return False
+    boxes = XML.read_objects(refer_path)
+    tree = ET.ElementTree(file = xml_path)
+    root = tree.getroot()
+    # objects merged by an earlier run are not added again when the refer xml is processed a second time
+    existing = set(object_key(obj) for obj in root.findall('object'))
+    for box in boxes:
+        key = (box['name'], box['xmin'], box['ymin'], box['xmax'], box['ymax'])
+        if box['name'] in classes and key not in existing:
+            root = XML.add_tag(root, box)
+            existing.add(key)
+    XML.write_xml_atomic(tree, xml_path)
+    return True
+
+def replace_class_in_xml(args):
+    xml_path, old_class, new_class = args
+    count = 0
+    if os.path.exists(xml_path):
+        tree = ET.ElementTree(file = xml_path)
+        root = tree.getroot()
+        for obj in root.findall('object'):
+            ob_name = obj.find("name")
+            if ob_name.text in old_class:
+                ob_name.text = new_class
+                count += 1
+        XML.write_xml_atomic(tree, xml_path)
+    return count
+
+def replace_all_classes_in_xml(args):
+    xml_path, new_class = args
+    if os.path.exists(xml_path):
+        tree = ET.ElementTree(file = xml_path)
+        root = tree.getroot()
+        for obj in root.findall('object'):
+            ob_name = obj.find("name")
+            ob_name.text = new_class
+        XML.write_xml_atomic(tree, xml_path)
+    return True
+
+def count_classes_in_xml(xml_path):
+    classes = Counter()
+    if os.path.exists(xml_path):
+        tree = ET.ElementTree(file = xml_path)
+        root = tree.getroot()
+        for obj in root.findall('object'):
+            classes[obj.find('name').text] += 1
+    return classes
+
+def xml_has_classes(args):
+    xml_path, classes = args
+    if os.path.exists(xml_path):
+        tree = ET.ElementTree(file = xml_path)
+        root = tree.getroot()
+        for obj in root.findall('object'):
+            if obj.find('name').text in classes:
+                return True
+    return False
+
 class XML_Tool():
-    def __init__(self, xml_dir):
+    def __init__(self, xml_dir, workers=1, chunk_size=64, index_path=None, index_check_files=True, since=None):
+        """
+            :param xml_dir: folder of the xml files
+            :param workers: number of processes the xml files are sharded across, 1 runs on the calling process
+            :param chunk_size: number of xml files sent to a worker at a time
+            :param index_path: [optional] sqlite index answering count_classes and get_xml_by_class* queries,
+                only the xml files changed since the last query are parsed again
+            :param index_check_files: stat every xml file before an index query, see XML_Index.update
+            :param since: [optional] snapshot file (or MANIFEST.Manifest) of xml_dir, add_new_classes, replace_class
+                and replace_all_classes only process the xml files added or modified since it and then save the
+                snapshot taken before the run, refreshed for the files they rewrote; add_new_classes snapshots
+                refer_dir as a second root and also processes the xml files whose refer xml changed;
+                queries always read every file
+        """
         super(XML_Tool, self).__init__()
         self.xml_dir = xml_dir
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.index = None
+        self.index_check_files = index_check_files
+        self.since = since
+        if index_path is not None:
+            self.index = XML_Index(xml_dir, index_path, workers=workers)
+
+    def imap(self, func, args):
+        """ apply func to every item of args, yield the results in order as they are ready
+
+            :param func: module level function, it has to be picklable when workers > 1
+            :param args: list of arguments of func
+        """
+        if self.workers <= 1:
+            for arg in args:
+                yield func(arg)
+            return
+        with Pool(self.workers) as pool:
+            for result in pool.imap(func, args, chunksize=self.chunk_size):
+                yield result
+
+    def list_xmls(self, refer_dir=None):
+        """ sorted xml files of self.xml_dir, only the ones added or modified since self.since when it is set
+
+            :param refer_dir: [optional] folder the run also reads, snapshotted as a second root, an xml counts
+                as changed when it or the refer xml of the same name was added or modified
+            :return: (xmls, snapshot of self.xml_dir (and refer_dir) taken before the run or None)
+        """
+        xmls = [x for x in FILES.get_sorted_files(self.xml_dir) if ".xml" in x]
+        if self.since is None:
+            return xmls, None
+        roots = [self.xml_dir] if refer_dir is None else [self.xml_dir, refer_dir]
+        current, delta = MANIFEST.snapshot_delta(roots, self.since, recursive=False)
+        changed = MANIFEST.changed_paths(delta.added | delta.modified, self.xml_dir)
+        if refer_dir is not None:
+            changed |= MANIFEST.changed_paths(delta.added | delta.modified, refer_dir)
+        return [xml for xml in xmls if xml in changed], current
+
+    def commit_since(self, current, xmls):
+        """ save the snapshot taken before the run, with the entries of the xmls the tool rewrote refreshed,
+            files changed by someone else during the run still show up as changed next time
+
+        """
+        if current is not None:
+            current.refresh(self.xml_dir, xmls)
+            MANIFEST.commit(self.since, current)
 
     def add_new_classes(self, refer_dir, classes=[]):
         """ Add some new classes from refer_dir's xml to self.xml_dir's xml
@@ -22,18 +152,11 @@ class XML_Tool():
         if len(classes) == 0:
             print('[ERROR]: classes is empty!')
             return False
-        xmls = [x for x in FILES.get_sorted_files(self.xml_dir) if ".xml" in x]
-        for xml in xmls:
-            xml_path = os.path.join(self.xml_dir, xml)
-            refer_path = os.path.join(refer_dir, xml)
-            if os.path.exists(refer_path):
-                boxes = XML.read_objects(refer_path)
-                tree = ET.ElementTree(file = xml_path)
-                root = tree.getroot()
-                for box in boxes:
-                    if box['name'] in classes:
-                        root = XML.add_tag(root, box)
-                XML.write_xml(tree, xml_path) 
+        xmls, current = self.list_xmls(refer_dir)
+        args = [(os.path.join(self.xml_dir, xml), os.path.join(refer_dir, xml), classes) for xml in xmls]
+        for _ in self.imap(add_classes_to_xml, args):
+            pass
+        self.commit_since(current, xmls)
         print('[success]: add classes successfully')
         return True
 
@@ -45,71 +168,48 @@ class XML_Tool():
         """
         if not old_class or not new_class:
             print('[ERROR]: classes is empty!')
-        xmls = [x for x in FILES.get_sorted_files(self.xml_dir) if ".xml" in x]
+        xmls, current = self.list_xmls()
         count = 0 # the number of xmls will be replaced with new class
-        pbar = tqdm(xmls)
-        for xml in pbar:
-            xml_path = os.path.join(self.xml_dir, xml)
-            if os.path.exists(xml_path):
-                tree = ET.ElementTree(file = xml_path)
-                root = tree.getroot()
-                for obj in root.findall('object'):
-                    ob_name = obj.find("name")
-                    if ob_name.text in old_class:
-                        ob_name.text = new_class
-                        count += 1
-                XML.write_xml(tree, xml_path)
+        args = [(os.path.join(self.xml_dir, xml), old_class, new_class) for xml in xmls]
+        pbar = tqdm(zip(xmls, self.imap(replace_class_in_xml, args)), total=len(xmls))
+        for xml, xml_count in pbar:
+            count += xml_count
             pbar.set_description("Processing %s" % xml)
+        self.commit_since(current, xmls)
         print('[success]: replace class successfully. %d instances have been modified here'%count)
         return True
-    
+
     def replace_all_classes(self, new_class=None):
         """ replace all class with new_class in the self.xml_dir's xml
 
             :param new_class: used to replace all class
-        """    
+        """
         if not new_class:
             print('[ERROR]: classes is empty!')
-        xmls = [x for x in FILES.get_sorted_files(self.xml_dir) if ".xml" in x]
-        for xml in xmls:
-            xml_path = os.path.join(self.xml_dir, xml)
-            if os.path.exists(xml_path):
-                tree = ET.ElementTree(file = xml_path)
-                root = tree.getroot()
-                for obj in root.findall('object'):
-                    ob_name = obj.find("name")
-                    ob_name.text = new_class
-                XML.write_xml(tree, xml_path)
+        xmls, current = self.list_xmls()
+        args = [(os.path.join(self.xml_dir, xml), new_class) for xml in xmls]
+        for _ in self.imap(replace_all_classes_in_xml, args):
+            pass
+        self.commit_since(current, xmls)
         print('[success]: replace class successfully')
         return True
-    
+
     def count_classes(self):
         """ count how many classes there are
 
         """
+        if self.index is not None:
+            self.index.update(self.index_check_files)
+            return self.index.count_classes()
         xmls = [x for x in FILES.get_sorted_files(self.xml_dir) if ".xml" in x]
-        classes = {}
-        for xml in xmls:
-            xml_path = os.path.join(self.xml_dir, xml)
-            if os.path.exists(xml_path):
-                tree = ET.ElementTree(file = xml_path)
-                root = tree.getroot()
-                classes_ = []
-                for obj in root.findall('object'):
-                    name = obj.find('name').text
-                    # if name not in classes_:
-                    #     classes_.append(name)
-                    # else:
-                    #     continue
-                    if name not in classes:
-                        classes[name] = 1
-                    else:
-                        classes[name] += 1
-        return classes
-    
+        classes = Counter()
+        for xml_classes in self.imap(count_classes_in_xml, [os.path.join(self.xml_dir, xml) for xml in xmls]):
+            classes.update(xml_classes)
+        return dict(classes)
+
     def xml_to_json(self, txt_path=None, json_path=None):
         pass
-        
+
     def get_xml_by_class(self, classes=[], txt_path=None):
         """ get specified xmls to txt by classes
 
@@ -120,18 +220,7 @@ class XML_Tool():
             print('[ERROR]: classes is empty!')
             return False
         xmls = [x for x in FILES.get_sorted_files(self.xml_dir) if ".xml" in x]
-        for xml in xmls:
-            xml_path = os.path.join(self.xml_dir, xml)
-            if os.path.exists(xml_path):
-                tree = ET.ElementTree(file = xml_path)
-                root = tree.getroot()
-                for obj in root.findall('object'):
-                    name = obj.find('name').text
-                    if name in classes:
-                        portion = os.path.splitext(xml)
-                        with open(txt_path, 'a') as f:
-                            f.write( portion[0] + '\n')
-                        break
+        self.save_xml_by_classes(xmls, classes, txt_path)
         print('[success]: save successfully')
         return True
 
@@ -144,32 +233,38 @@ class XML_Tool():
         if len(classes) == 0:
             print('[ERROR]: classes is empty!')
             return False
-        list_fp = open(txt_src, 'r')
-        for line in list_fp:
-            xml = line.strip() + '.xml' # xml line
-            xml_path = os.path.join(self.xml_dir, xml)
-            if os.path.exists(xml_path):
-                tree = ET.ElementTree(file = xml_path)
-                root = tree.getroot()
-                for obj in root.findall('object'):
-                    name = obj.find('name').text
-                    if name in classes:
-                        portion = os.path.splitext(xml)
-                        with open(txt_path, 'a') as f:
-                            f.write( portion[0] + '\n')
-                        break
+        with open(txt_src, 'r') as list_fp:
+            xmls = [line.strip() + '.xml' for line in list_fp] # xml line
+        self.save_xml_by_classes(xmls, classes, txt_path)
         print('[success]: save successfully')
         return True
 
+    def save_xml_by_classes(self, xmls, classes, txt_path):
+        """ append the names of xmls containing any of classes to txt_path, in the order of xmls
+
+        """
+        if self.index is not None:
+            self.index.update(self.index_check_files)
+            matched_xmls = set(self.index.files_with_classes(classes))
+            matches = [xml in matched_xmls for xml in xmls]
+        else:
+            args = [(os.path.join(self.xml_dir, xml), classes) for xml in xmls]
+            matches = self.imap(xml_has_classes, args)
+        with open(txt_path, 'a') as f:
+            for xml, matched in zip(xmls, matches):
+                if matched:
+                    portion = os.path.splitext(xml)
+                    f.write( portion[0] + '\n')
+
     def delete_class(self, classes=[]):
         pass
+
 if __name__=="__main__":
     xml_dir = "E:/Primitive_Arguments/flag_person/xml/"
     refer_dir = "E:/Primitive_Arguments/flag/detection/flag/xml_flag/"
     # old_class = 'riders'
-    # new_class = 'person' 
+    # new_class = 'person'
     xml = XML_Tool(xml_dir)
     # xml.replace_class(old_class, new_class)
     # xml.add_new_classes(refer_dir, ["flag"])
     print(xml.count_classes())
-
@@ -0,0 +1,245 @@
+import os
+import csv
+import time
+import errno
+import shutil
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from tqdm import tqdm
+try:
+    import fcntl
+except ImportError:
+    fcntl=None
+# file_util/image_util/FILES共用的并行复制
+# 线程池复制，同时在途的任务数限制为workers*4；Linux上优先os.copy_file_range(NFS 4.2/btrfs/xfs上可以在服务端完成)，
+# 不支持时退回shutil.copyfile(Linux上内部使用sendfile)
+# skip='mtime'时目标大小相同且mtime与源文件一致则跳过，复制后会把源文件的mtime写到目标上；skip='hash'比较sha1
+# mode='hardlink'/'reflink'/'symlink'时不复制内容，跨设备或文件系统不支持时自动退回复制，每个文件实际使用的方式记录在manifest中
+# hardlink与源文件共用inode，修改目标会同时修改源文件；symlink指向源文件的绝对路径
+CHUNK_SIZE=1<<24
+MODES=['copy','hardlink','reflink','symlink']
+# linux/fs.h: _IOW(0x94, 9, int)
+FICLONE=0x40049409
+# 这些错误表示当前设备/文件系统不支持链接，退回复制
+FALLBACK_ERRORS=set([errno.EXDEV,errno.EPERM,errno.EOPNOTSUPP,errno.ENOTSUP,errno.EINVAL,errno.ENOTTY,errno.ENOSYS,errno.EMLINK])
+def copy_file_range(src,dst):
+    # 返回False表示当前系统或文件系统不支持copy_file_range，由调用方退回其他方式
+    if not hasattr(os,'copy_file_range'):
+        return False
+    with open(src,'rb') as fsrc, open(dst,'wb') as fdst:
+        size=os.fstat(fsrc.fileno()).st_size
+        copied=0
+        try:
+            while copied<size:
+                sent=os.copy_file_range(fsrc.fileno(),fdst.fileno(),min(CHUNK_SIZE,size-copied))
+                if sent==0:
+                    break
+                copied+=sent
+        except OSError:
+            if copied==0:
+                return False
+            raise
+        if copied<size:
+            # 文件在复制时被截断，按已复制的内容为准
+            fdst.truncate(copied)
+    return True
+def copy_file(src,dst,preserve_mode=False):
+    """
+    :param preserve_mode: 同shutil.copy，同时复制权限位
+    :return: 复制的字节数
+    """
+    if not copy_file_range(src,dst):
+        shutil.copyfile(src,dst)
+    stat=os.stat(src)
+    if preserve_mode:
+        shutil.copymode(src,dst)
+    os.utime(dst,ns=(stat.st_atime_ns,stat.st_mtime_ns))
+    return stat.st_size
+def temp_path(dst):
+    return '%s.%d.%d.tmp'%(dst,os.getpid(),threading.get_ident())
+def link_file(src,dst,mode):
+    """
+    :param mode: 'hardlink'/'reflink'/'symlink'
+    :return: 是否成功，False表示需要退回复制
+    """
+    tmp=temp_path(dst)
+    try:
+        if mode=='hardlink':
+            os.link(src,tmp)
+        elif mode=='symlink':
+            # 与复制和hardlink一样，源文件不存在时失败，不留下悬空的链接
+            os.stat(src)
+            os.symlink(os.path.abspath(src),tmp)
+        else:
+            if fcntl is None:
+                return False
+            with open(src,'rb') as fsrc, open(tmp,'wb') as fdst:
+                fcntl.ioctl(fdst.fileno(),FICLONE,fsrc.fileno())
+            stat=os.stat(src)
+            os.utime(tmp,ns=(stat.st_atime_ns,stat.st_mtime_ns))
+        # 先链接到临时文件再替换，目标已存在时也是原子的
+        os.replace(tmp,dst)
+        return True
+    except OSError as e:
+        if os.path.lexists(tmp):
+            os.remove(tmp)
+        if e.errno in FALLBACK_ERRORS:
+            return False
+        raise
+def is_linked(src,dst,mode):
+    # 目标已经是指向src的链接
+    try:
+        if mode=='hardlink':
+            return os.path.samefile(src,dst)
+        if mode=='symlink':
+            return os.path.islink(dst) and os.readlink(dst)==os.path.abspath(src)
+    except OSError:
+        pass
+    return False
+def file_hash(path):
+    sha=hashlib.sha1()
+    with open(path,'rb') as f:
+        while True:
+            chunk=f.read(1<<20)
+            if not chunk:
+                break
+            sha.update(chunk)
+    return sha.hexdigest()
+def is_unchanged(src,dst,skip):
+    if skip is None:
+        return False
+    try:
+        srcStat=os.stat(src)
+        dstStat=os.lstat(dst)
+    except OSError:
+        return False
+    # 以前用symlink建立的目标不算未变化
+    if os.path.islink(dst) or srcStat.st_size!=dstStat.st_size:
+        return False
+    if skip=='hash':
+        return file_hash(src)==file_hash(dst)
+    return srcStat.st_mtime_ns==dstStat.st_mtime_ns
+class CopyEngine(object):
+    def __init__(self,workers=8,skip='mtime',preserve_mode=False,errors='raise',progress=True,mode='copy'):
+        """
+        :param workers: 复制线程数
+        :param skip: 'mtime'按大小+mtime跳过未变化的文件，'hash'按大小+sha1，None全部复制
+        :param preserve_mode: 同时复制权限位(shutil.copy)
+        :param errors: 'raise'遇到第一个错误时抛出，'ignore'记录在self.errors中继续
+        :param progress: 显示tqdm进度条
+        :param mode: 'copy'、'hardlink'、'reflink'或'symlink'，链接失败(例如跨设备)时退回复制
+        """
+        if mode not in MODES:
+            raise ValueError('mode should be one of {}'.format(MODES))
+        self.mode=mode
+        self.workers=workers
+        self.skip=skip
+        self.preserve_mode=preserve_mode
+        self.errors=errors
+        self.progress=progress
+        self.lock=threading.Lock()
+        self.reset_stats()
+    def reset_stats(self):
+        self.stats={'copied':0,'hardlink':0,'reflink':0,'symlink':0,'skipped':0,'failed':0,'bytes':0,'time':0.0}
+        self.failures=[]
+        # (src,dst,实际使用的方式)
+        self.records=[]
+    def add_stat(self,key,value=1):
+        with self.lock:
+            self.stats[key]+=value
+    def transfer(self,src,dst):
+        # 单个文件，返回实际使用的方式: 'copied'、'hardlink'、'reflink'、'symlink'或'skipped'
+        method=None
+        if self.skip is not None and is_linked(src,dst,self.mode):
+            method='skipped'
+        elif self.mode in ['copy','reflink'] and is_unchanged(src,dst,self.skip):
+            method='skipped'
+        elif self.mode!='copy' and link_file(src,dst,self.mode):
+            method=self.mode
+        size=0
+        if method is None:
+            method='copied'
+            # 先写临时文件再替换，不会透过以前建立的hardlink/symlink写到别的文件上
+            tmp=temp_path(dst)
+            try:
+                size=copy_file(src,tmp,self.preserve_mode)
+                os.replace(tmp,dst)
+            except BaseException:
+                if os.path.lexists(tmp):
+                    os.remove(tmp)
+                raise
+        with self.lock:
+            self.stats[method]+=1
+            self.stats['bytes']+=size
+            self.records.append((src,dst,method))
+        return method
+    def run(self,pairs,manifest=None):
+        """
+        :param pairs: [(src,dst),...]，dst重复时与逐个复制一样以最后一个为准
+        :param manifest: [optional] csv文件，每行为src,dst,method，method为实际使用的方式或failed
+        :return: self.stats
+        """
+        # 同一个目标只保留最后一个源，避免并行时覆盖顺序不确定
+        latest={}
+        for src,dst in pairs:
+            latest.pop(dst,None)
+            latest[dst]=src
+        pairs=[(src,dst) for dst,src in latest.items()]
+        start=time.time()
+        pbar=tqdm(total=len(pairs),unit='file',disable=not self.progress)
+        slots=threading.BoundedSemaphore(self.workers*4)
+        error=[]
+        def done(future,src,dst):
+            slots.release()
+            pbar.update(1)
+            exception=future.exception()
+            if exception is not None:
+                with self.lock:
+                    self.stats['failed']+=1
+                    self.failures.append((src,dst,exception))
+                    error.append(exception)
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for src,dst in pairs:
+                    if error and self.errors=='raise':
+                        break
+                    slots.acquire()
+                    future=pool.submit(self.transfer,src,dst)
+                    future.add_done_callback(lambda future,src=src,dst=dst:done(future,src,dst))
+                    if self.progress and pbar.n%256==0:
+                        pbar.set_postfix(MBps='%.1f'%(self.stats['bytes']/max(time.time()-start,1e-9)/1024.0/1024.0))
+        finally:
+            pbar.close()
+            self.stats['time']+=time.time()-start
+            if manifest is not None:
+                self.write_manifest(manifest)
+        if error and self.errors=='raise':
+            raise error[0]
+        return self.stats
+    def write_manifest(self,manifest):
+        with open(manifest,'w',newline='') as f:
+            writer=csv.writer(f)
+            writer.writerow(['src','dst','method'])
+            writer.writerows(sorted(self.records,key=lambda record:record[1]))
+            writer.writerows(sorted(((src,dst,'failed') for src,dst,exception in self.failures),key=lambda record:record[1]))
+    def transferred(self):
+        # 实际复制或链接的文件数，不含跳过和失败的
+        return sum(self.stats[key] for key in ['copied','hardlink','reflink','symlink'])
+    def summary(self):
+        cost=max(self.stats['time'],1e-9)
+        links=''.join('  %s: %d'%(mode,self.stats[mode]) for mode in ['hardlink','reflink','symlink'] if self.stats[mode])
+        return 'copied: %d%s  skipped: %d  failed: %d  %.1f MB  %.1f MB/s'%(
+            self.stats['copied'],links,self.stats['skipped'],self.stats['failed'],
+            self.stats['bytes']/1024.0/1024.0,self.stats['bytes']/cost/1024.0/1024.0)
+def copy_pairs(pairs,workers=8,skip='mtime',preserve_mode=False,errors='raise',progress=True,mode='copy',manifest=None):
+    # CopyEngine(...).run(pairs)的简写，返回CopyEngine以便读取stats/failures/records
+    engine=CopyEngine(workers,skip,preserve_mode,errors,progress,mode)
+    engine.run(pairs,manifest)
+    return engine
+def info():
+    print("CopyEngine(workers=8,skip='mtime',preserve_mode=False,errors='raise',progress=True,mode='copy').run([(src,dst),...],manifest=None) -> stats")
+    print("copy_pairs([(src,dst),...],workers=8,skip='mtime',mode='copy',manifest=None) -> CopyEngine")
+    print("copy_file(src,dst,preserve_mode=False) -> bytes")
+    print("CopyEngine.transferred() -> number of files copied or linked")
+    exit()
@@ -0,0 +1,263 @@
+import os
+import time
+import base64
+import hashlib
+import threading
+import http.client
+import urllib.error
+import urllib.request
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlsplit, urljoin, unquote
+# 并发下载: 线程池限制总并发，每个host另有信号量限制；每个线程对每个host保持一个keep-alive连接
+# 连接错误、429和5xx按backoff*2^n退避重试；响应按块写入临时文件，同时计算sha1，完成后改名
+# dedupe为True时同一个url只下载一次(重复的url等待第一次下载的结果)，内容sha1相同的图片只保存第一张，其余返回已保存的路径
+# http/https之外的协议(ftp、file、data等)交给urllib.request，与原来的urlretrieve一致；user:pass@转为Basic认证头
+class RetryError(IOError):
+    pass
+class StatusError(IOError):
+    # 4xx，不重试
+    pass
+class Downloader(object):
+    def __init__(self, workers=8, per_host=4, retries=3, backoff=0.5, timeout=10, headers=None, dedupe=True, chunk_size=1 << 16):
+        """
+        :param workers: 下载线程数
+        :param per_host: 同一host同时进行的请求数上限
+        :param retries: 失败后的重试次数
+        :param backoff: 第n次重试前等待backoff*2^n秒
+        :param timeout: 连接和读取的超时(秒)
+        :param headers: 请求头，例如User-Agent/referer
+        :param dedupe: 按url和内容sha1去重
+        :param chunk_size: 写入文件的块大小
+        """
+        self.workers = workers
+        self.per_host = per_host
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.headers = dict(headers or {})
+        self.dedupe = dedupe
+        self.chunk_size = chunk_size
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.connections = []
+        self.host_limits = {}
+        # url -> Future，结果为保存的路径或None
+        self.urls = {}
+        self.hashes = {}
+        self.pool = None
+        self.reset_stats()
+    def reset_stats(self):
+        self.stats = {'downloaded': 0, 'duplicates': 0, 'failed': 0, 'retries': 0, 'bytes': 0, 'time': 0.0}
+    def add_stat(self, key, value=1):
+        with self.lock:
+            self.stats[key] += value
+    def host_limit(self, netloc):
+        with self.lock:
+            if netloc not in self.host_limits:
+                self.host_limits[netloc] = threading.BoundedSemaphore(self.per_host)
+            return self.host_limits[netloc]
+    def connection(self, scheme, netloc):
+        # 每个线程每个host一个连接，响应读完后复用
+        connections = getattr(self.local, 'connections', None)
+        if connections is None:
+            connections = self.local.connections = {}
+        key = (scheme, netloc)
+        if key not in connections:
+            if scheme == 'https':
+                conn = http.client.HTTPSConnection(netloc, timeout=self.timeout)
+            else:
+                conn = http.client.HTTPConnection(netloc, timeout=self.timeout)
+            connections[key] = conn
+            with self.lock:
+                self.connections.append(conn)
+        return connections[key]
+    def drop_connection(self, scheme, netloc):
+        connections = getattr(self.local, 'connections', {})
+        conn = connections.pop((scheme, netloc), None)
+        if conn is not None:
+            conn.close()
+    def urlopen(self, url, handle):
+        # http/https之外的协议，由urllib.request处理重定向和认证
+        try:
+            request = urllib.request.Request(url, headers=self.headers)
+        except ValueError as e:
+            # 不认识的地址(没有协议等)，不重试
+            raise StatusError('{} {}'.format(e, url))
+        try:
+            response = urllib.request.urlopen(request, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            e.close()
+            if e.code == 429 or e.code >= 500:
+                raise RetryError('{} {}'.format(e.code, url))
+            raise StatusError('{} {}'.format(e.code, url))
+        with response:
+            return handle(response)
+    def request_headers(self, parts):
+        # 地址中的user:pass@去掉后作为Basic认证头发送，返回(host[:port], headers)
+        if parts.username is None:
+            return parts.netloc, self.headers
+        headers = dict(self.headers)
+        userinfo = '%s:%s' % (unquote(parts.username), unquote(parts.password or ''))
+        headers['Authorization'] = 'Basic ' + base64.b64encode(userinfo.encode('utf-8')).decode('ascii')
+        return parts.netloc.rpartition('@')[2], headers
+    def get(self, url, handle):
+        """
+        :param url: 最多跟随5次重定向，http/https之外的协议交给urllib.request
+        :param handle: handle(response)读取响应内容并返回结果，重试时会被再次调用
+        :return: handle的返回值，4xx或重试后仍失败则抛出IOError
+        """
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt > 0:
+                self.add_stat('retries')
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            target = url
+            try:
+                for redirect in range(6):
+                    parts = urlsplit(target)
+                    if parts.scheme not in ('http', 'https'):
+                        return self.urlopen(target, handle)
+                    netloc, headers = self.request_headers(parts)
+                    path = (parts.path or '/') + ('?' + parts.query if parts.query else '')
+                    with self.host_limit(netloc):
+                        conn = self.connection(parts.scheme, netloc)
+                        try:
+                            conn.request('GET', path, headers=headers)
+                            response = conn.getresponse()
+                            location = response.getheader('Location')
+                            if response.status in (301, 302, 303, 307, 308) and location:
+                                response.read()
+                                target = urljoin(target, location)
+                                continue
+                            if response.status == 429 or response.status >= 500:
+                                response.read()
+                                raise RetryError('{} {}'.format(response.status, target))
+                            if response.status >= 400:
+                                response.read()
+                                raise StatusError('{} {}'.format(response.status, target))
+                            result = handle(response)
+                            if response.will_close:
+                                self.drop_connection(parts.scheme, netloc)
+                            return result
+                        except StatusError:
+                            raise
+                        except (OSError, http.client.HTTPException):
+                            self.drop_connection(parts.scheme, netloc)
+                            raise
+                raise StatusError('too many redirects {}'.format(url))
+            except StatusError:
+                raise
+            except (OSError, http.client.HTTPException) as e:
+                error = e
+        raise IOError('{} failed after {} retries: {}'.format(url, self.retries, error))
+    def fetch(self, url):
+        # 整个响应读入内存，用于搜索结果页
+        return self.get(url, lambda response: response.read())
+    def download(self, url, save_path):
+        """
+        :return: 图片保存的路径，内容重复时为先保存的那张的路径，失败返回None；
+            url重复时等待正在进行的下载，它失败时同样返回None
+        """
+        if not self.dedupe:
+            return self.download_file(url, save_path)
+        with self.lock:
+            future = self.urls.get(url)
+            owner = future is None
+            if owner:
+                future = self.urls[url] = Future()
+        if not owner:
+            result = future.result()
+            if result is not None:
+                self.add_stat('duplicates')
+            return result
+        result = None
+        try:
+            result = self.download_file(url, save_path)
+        finally:
+            if result is None:
+                # 失败的url之后可以重新下载
+                with self.lock:
+                    self.urls.pop(url, None)
+            future.set_result(result)
+        return result
+    def download_file(self, url, save_path):
+        start = time.time()
+        # 每个进程和线程各自的临时文件，同时下载到同一个save_path时不会写到同一个文件里
+        tmp_path = '%s.%d.%d.part' % (save_path, os.getpid(), threading.get_ident())
+        def handle(response):
+            sha = hashlib.sha1()
+            size = 0
+            with open(tmp_path, 'wb') as f:
+                while True:
+                    chunk = response.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    sha.update(chunk)
+                    size += len(chunk)
+            return sha.hexdigest(), size
+        try:
+            digest, size = self.get(url, handle)
+        except (OSError, http.client.HTTPException):
+            self.add_stat('failed')
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+        existing = None
+        with self.lock:
+            if self.dedupe:
+                existing = self.hashes.get(digest)
+                if existing is None:
+                    self.hashes[digest] = save_path
+            if existing is None:
+                self.stats['downloaded'] += 1
+                self.stats['bytes'] += size
+            else:
+                self.stats['duplicates'] += 1
+            self.stats['time'] += time.time() - start
+        if existing is not None:
+            os.remove(tmp_path)
+            return existing
+        os.replace(tmp_path, save_path)
+        return save_path
+    def submit(self, url, save_path):
+        # 异步下载，返回Future
+        with self.lock:
+            if self.pool is None:
+                self.pool = ThreadPoolExecutor(max_workers=self.workers)
+        return self.pool.submit(self.download, url, save_path)
+    def download_all(self, items):
+        """
+        :param items: [(url, save_path), ...]
+        :return: 与items一一对应的download结果
+        """
+        futures = [self.submit(url, save_path) for url, save_path in items]
+        return [future.result() for future in futures]
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None
+        with self.lock:
+            for conn in self.connections:
+                conn.close()
+            self.connections = []
+        self.local = threading.local()
+    def summary(self):
+        stats = self.stats
+        return 'downloaded: %d  duplicates: %d  failed: %d  retries: %d  %.1f MB' % (
+            stats['downloaded'], stats['duplicates'], stats['failed'], stats['retries'], stats['bytes'] / 1024.0 / 1024.0)
+_shared = None
+_sharedLock = threading.Lock()
+def get_downloader():
+    # 进程内共享、不去重的下载器，用于逐个url的下载以复用连接
+    global _shared
+    with _sharedLock:
+        if _shared is None:
+            _shared = Downloader(dedupe=False)
+        return _shared
+def info():
+    print("Downloader(workers=8, per_host=4, retries=3, backoff=0.5, timeout=10, headers=None, dedupe=True)")
+    print("Downloader.fetch(url) -> bytes")
+    print("Downloader.download(url, save_path) -> save_path or None")
+    print("Downloader.download_all([(url, save_path), ...]) -> list")
+    exit()
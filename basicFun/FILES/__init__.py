@@ -1,52 +1,92 @@
 #encoding=utf-8
 import os
 import shutil
-def copy_files_refer_dir(srcDir,srcForm,ReferDir,tarDir):
+from concurrent.futures import ThreadPoolExecutor
+from basicFun import COPY
+def copy_files_refer_dir(srcDir,srcForm,ReferDir,tarDir,workers=8,skip=None,mode='copy',manifest=None):
+    # 缺失的文件忽略，skip/mode见COPY.CopyEngine，manifest记录每个文件是链接还是复制
     allRefers=get_sorted_files(ReferDir)
+    pairs=[]
     for refer in allRefers:
         file=refer.split('.')[0]+srcForm
         srcPath=os.path.join(srcDir,file)
         tarPath=os.path.join(tarDir,file)
-        try:
-            shutil.copy(srcPath,tarPath)
-        except:
-            pass
-def list_all_files(rootdir):
-    _files = []
-    list = os.listdir(rootdir) #列出文件夹下所有的目录与文件
-    for i in range(0,len(list)):
-           path = os.path.join(rootdir,list[i])
-           if os.path.isdir(path):
-              _files.extend(list_all_files(path))
-           if os.path.isfile(path):
-              _files.append(list[i])
-    return _files
-def list_all_filePaths(rootdir):
-    _files = []
-    list = os.listdir(rootdir) #列出文件夹下所有的目录与文件
-    for i in range(0,len(list)):
-           path = os.path.join(rootdir,list[i])
-           if os.path.isdir(path):
-              _files.extend(list_all_filePaths(path))
-           if os.path.isfile(path):
-              _files.append(path)
-    return _files
+        pairs.append((srcPath,tarPath))
+    return COPY.copy_pairs(pairs,workers,skip,preserve_mode=True,errors='ignore',progress=False,mode=mode,manifest=manifest).stats
+def scan_entries(rootDir,suffixes=None,dirs=False,recursive=True,workers=1,followlinks=True):
+    """
+    os.scandir遍历，返回os.DirEntry的生成器，类型来自scandir缓存，不再对每个文件stat
+    顺序与原list_all_files一致: 每层按scandir顺序，遇到子目录时先遍历子目录
+    :param suffixes: [optional] 只返回这些后缀的文件，不区分大小写，例如('.jpg','.png')
+    :param dirs: 同时返回目录
+    :param recursive: False时只遍历第一层
+    :param workers: >1时第一层的各个子目录在线程池中并行遍历(网络文件系统上延迟大时有效)，输出顺序不变
+    :param followlinks: 进入指向目录的符号链接(与原os.path.isdir的行为一致)
+    """
+    if suffixes is not None:
+        suffixes=tuple(suffix.lower() for suffix in suffixes)
+    if workers<=1 or not recursive:
+        for entry in iter_entries(rootDir,suffixes,dirs,recursive,followlinks):
+            yield entry
+        return
+    items=[]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        with os.scandir(rootDir) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=followlinks):
+                    if dirs:
+                        items.append([entry])
+                    items.append(pool.submit(list,iter_entries(entry.path,suffixes,dirs,True,followlinks)))
+                elif entry.is_file() and (suffixes is None or entry.name.lower().endswith(suffixes)):
+                    items.append([entry])
+        for item in items:
+            for entry in (item if isinstance(item,list) else item.result()):
+                yield entry
+def iter_entries(rootDir,suffixes=None,dirs=False,recursive=True,followlinks=True):
+    # scan_entries的单线程实现，用scandir迭代器的栈代替递归
+    stack=[os.scandir(rootDir)]
+    try:
+        while stack:
+            entry=next(stack[-1],None)
+            if entry is None:
+                stack.pop().close()
+                continue
+            if entry.is_dir(follow_symlinks=followlinks):
+                if dirs:
+                    yield entry
+                if recursive:
+                    stack.append(os.scandir(entry.path))
+            elif entry.is_file() and (suffixes is None or entry.name.lower().endswith(suffixes)):
+                yield entry
+    finally:
+        for it in stack:
+            it.close()
+def list_all_files(rootdir,suffixes=None,workers=1):
+    return [entry.name for entry in scan_entries(rootdir,suffixes,workers=workers)]
+def list_all_filePaths(rootdir,suffixes=None,workers=1):
+    return [entry.path for entry in scan_entries(rootdir,suffixes,workers=workers)]
+def first_level(rootDir):
+    # 第一层的(子目录,文件)，与os.walk第一次返回的dirs/files一致，目录不存在时为空
+    subDirs=[]
+    files=[]
+    try:
+        with os.scandir(rootDir) as it:
+            for entry in it:
+                try:
+                    isDir=entry.is_dir()
+                except OSError:
+                    isDir=False
+                (subDirs if isDir else files).append(entry.name)
+    except OSError:
+        pass
+    return subDirs,files
 def get_sub_dirs(rootDir):
-    for root,dirs,files in os.walk(rootDir):
-        if root==rootDir:
-            return dirs
-    return []
+    return first_level(rootDir)[0]
 def get_files(rootDir):
     #获取目录第一层所有文件
-    for root,dirs,files in os.walk(rootDir):
-        if root==rootDir:
-            return files
-    return []
+    return first_level(rootDir)[1]
 def get_sorted_files(fileDIr):
-    for root,dirs,files in os.walk(fileDIr):
-        if root==fileDIr:
-            return sorted(files)
-    return []
+    return sorted(first_level(fileDIr)[1])
 def mkdir(fileDIr):
     if not os.path.exists(fileDIr):
         os.mkdir(fileDIr)
@@ -67,17 +107,24 @@ def rm_mkdir(fileDIr):
         else:
             print('Gave up')
             exit()
-def shutil_by_refer(referDir,referForm,opForm,srcDir,tarDir):
+def shutil_by_refer(referDir,referForm,opForm,srcDir,tarDir,workers=8,skip=None,mode='copy',manifest=None):
     allRefers=[x for x in get_files(referDir) if referForm in x]#审核为.refer形成列表
+    pairs=[]
     for refer in allRefers:
         sour=refer.split('.')[0]+opForm
         tar=refer.split('.')[0]+opForm
         srcPath=os.path.join(srcDir,sour)
         tarPath=os.path.join(tarDir,tar)
-        shutil.copy(srcPath,tarPath)
+        pairs.append((srcPath,tarPath))
+    return COPY.copy_pairs(pairs,workers,skip,preserve_mode=True,progress=False,mode=mode,manifest=manifest).stats
 def info():
+    print("scan_entries(rootDir,suffixes=None,dirs=False,recursive=True,workers=1) -> generator of os.DirEntry")
+    print("list_all_files(rootdir,suffixes=None,workers=1) -> name list")
+    print("list_all_filePaths(rootdir,suffixes=None,workers=1) -> path list")
     print("get_sub_dirs(rootDir) -> class list")
     print("get_files(fileDIr) -> class list")
     print("get_sorted_files(fileDIr) -> class list")
     print("mkdir(fileDIr) -> void")
+    print("copy_files_refer_dir(srcDir,srcForm,ReferDir,tarDir,workers=8,skip=None,mode='copy',manifest=None) -> stats")
+    print("shutil_by_refer(referDir,referForm,opForm,srcDir,tarDir,workers=8,skip=None,mode='copy',manifest=None) -> stats")
     exit()
\ No newline at end of file
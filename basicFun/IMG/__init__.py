@@ -1,7 +1,13 @@
 import os
+import itertools
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
 import cv2
 import numpy as np
+from basicFun import IMGCACHE
+# LBP的8个邻域，顺序对应特征值从高位到低位
+LBP_NEIGHBORS=[(-1,-1),(-1,0),(-1,1),(0,1),(1,1),(1,0),(1,-1),(0,-1)]
 def img_cos_for_labels(basePath, checkPath, baseRoi=[],checkRoi=[]):
     baseRoi=cut_roi_for_labels(basePath,baseRoi)
     checkRoi=cut_roi_for_labels(checkPath,checkRoi)
@@ -25,35 +31,37 @@ def cos(baseArray,checkArray):
     denom=np.linalg.norm(baseArray)*np.linalg.norm(checkArray)
     cosValue=num/denom
     return cosValue
-def cut_roi(jpgPath,roi=(100,100,200,200)):
+def cut_roi(jpgPath,roi=(100,100,200,200),cache=False):
     # roi=(int(xmin),int(ymin),int(xmax),int(ymax))
-    img=Image.open(jpgPath)
+    # cache为True时使用IMGCACHE的共享解码缓存，也可以传入IMGCACHE.ImageCache
+    img=IMGCACHE.open_image(jpgPath,cache)
     if roi!=[]:
         try:
             img=img.crop(roi)
             if roi[3]-roi[1]>200:
-                img=img.resize((128,64),Image.ANTIALIAS)
+                img=img.resize((128,64),Image.LANCZOS)
         except:
             print("Wrong roi")
             return None
     else:
-        baseImg = cv2.imread(jpgPath)
+        baseImg = IMGCACHE.imread(jpgPath,cache)
         # img=cv2.resize(baseImg,(256, 256))
         img=cv2.resize(baseImg,(128, 64))
     # img = cv2.cvtColor(np.asarray(img),cv2.COLOR_RGB2BGR)
     return img
-def cut_roi_for_labels(jpgPath,roi=(100,100,200,200)):
+def cut_roi_for_labels(jpgPath,roi=(100,100,200,200),cache=False):
     # roi=(int(xmin),int(ymin),int(xmax),int(ymax))
-    img=Image.open(jpgPath)
+    # cache为True时使用IMGCACHE的共享解码缓存，也可以传入IMGCACHE.ImageCache
+    img=IMGCACHE.open_image(jpgPath,cache)
     if roi!=[]:
         try:
             img=img.crop(roi)
-            img=img.resize((64,64),Image.ANTIALIAS)
+            img=img.resize((64,64),Image.LANCZOS)
         except:
             print("Wrong roi")
             return None
     else:
-        baseImg = cv2.imread(jpgPath)
+        baseImg = IMGCACHE.imread(jpgPath,cache)
         # img=cv2.resize(baseImg,(256, 256))
         img=cv2.resize(baseImg,(64, 64))
     # img = cv2.cvtColor(np.asarray(img),cv2.COLOR_RGB2BGR)
@@ -61,88 +69,162 @@ def cut_roi_for_labels(jpgPath,roi=(100,100,200,200)):
 def save_image(imgPath,region):
     region.save(imgPath,"jpeg")
 def get_LBP_featrue(rgb):
-    gray=rgb2gray(rgb)
-    img_feature = np.zeros(gray.shape,np.uint8) 
-    H,W=gray.shape
-    for h in range(H):
-        for w in range(W):
-            ## h-1,w-1
-            Sum=0
-            if h==0 or w==0:
-                Sum+=0
-            else:
-                Sum+=(gray[h-1,w-1] > gray[h,w])
-            ## h-1,w
-            if h==0:
-                Sum*=2
-            else:
-                Sum*=2
-                Sum+=(gray[h-1,w] > gray[h,w])
-            ## h-1,w+1
-            if h==0 or w==W-1:
-                Sum*=2
-            else:
-                Sum*=2
-                Sum+=(gray[h-1,w+1] > gray[h,w])
-            ## h,w+1
-            if w==W-1:
-                Sum*=2
-            else:
-                Sum*=2###
-                Sum+=(gray[h,w+1] > gray[h,w])
-            ## h+1,w+1
-            if h==H-1 or w==W-1:
-                Sum*=2
-            else:
-                Sum*=2###
-                Sum+=(gray[h+1,w+1] > gray[h,w])
-            ## h+1,w
-            if h==H-1:
-                Sum*=2
-            else:
-                Sum*=2###
-                Sum+=(gray[h+1,w] > gray[h,w])
-            ## h+1,w-1
-            if h==H-1 or w==0:
-                Sum*=2
-            else:
-                Sum*=2###
-                Sum+=(gray[h+1,w-1] > gray[h,w])
-            ## h,w-1
-            if w==0:
-                Sum*=2
-            else:
-                Sum*=2###
-                Sum+=(gray[h,w-1] > gray[h,w])
-            img_feature[h,w]=Sum
-    # return (sum(img_feature.reshape(-1)>4)/(H*W*1.0))
-    return(img_feature)
-def get_shape(imgPath):
-    return(cv2.cvtColor(np.array(Image.open(imgPath)), cv2.COLOR_BGR2GRAY).shape)
+    return gray2LBP(rgb2gray(rgb))
+def get_LBP_featrue_batch(rgbs):
+    # rgbs为同样大小的一组crop(list或N*H*W*3)，返回N*H*W
+    grays=np.stack([rgb2gray(rgb) for rgb in rgbs])
+    return gray2LBP(grays)
+def gray2LBP(gray):
+    # 用整幅错位比较代替逐像素循环，越界的邻域记为0，与原来的逐像素实现(tests/reference.py)逐位一致
+    # gray为H*W或N*H*W
+    H,W=gray.shape[-2:]
+    padded=np.pad(gray,[(0,0)]*(gray.ndim-2)+[(1,1),(1,1)],mode='edge')
+    img_feature=np.zeros(gray.shape,np.uint8)
+    for dh,dw in LBP_NEIGHBORS:
+        bit=(padded[...,1+dh:1+dh+H,1+dw:1+dw+W]>gray).astype(np.uint8)
+        if dh==-1:
+            bit[...,0,:]=0
+        elif dh==1:
+            bit[...,H-1,:]=0
+        if dw==-1:
+            bit[...,:,0]=0
+        elif dw==1:
+            bit[...,:,W-1]=0
+        img_feature=(img_feature<<1)|bit
+    return img_feature
+def get_shape(imgPath,cache=False):
+    # 只读文件头得到(height,width)，不解码整张图片
+    width,height=IMGCACHE.probe_image(imgPath,cache)[:2]
+    return (height,width)
 def gray2array_ave(grayImg):
-    height, width = grayImg.shape
-    pixCount=0
-    pixSum=0
-    pixList=[]
-    for line in range(height):
-        for pixel in range(width):
-            pixCount+=1
-            pixSum+=grayImg[line][pixel]
-    pixAve = pixSum /pixCount
-    for line in range(height):
-        for pixel in range(width):
-            pixList.append(grayImg[line][pixel]-pixAve)
-    return np.array(pixList)
+    # 展平并减去均值；整型图像先精确求和再除，与逐像素累加的结果一致
+    grayImg=np.asarray(grayImg)
+    if np.issubdtype(grayImg.dtype,np.integer):
+        pixSum=grayImg.sum(dtype=np.int64)
+    else:
+        pixSum=grayImg.sum()
+    pixAve=pixSum/grayImg.size
+    return grayImg.reshape(-1)-pixAve
 def gray2array_raw(grayImg):
-    height, width = grayImg.shape
-    pixList=[]
-    for line in range(height):
-        for pixel in range(width):
-            pixList.append(grayImg[line][pixel])
-    return np.array(pixList)
+    return np.array(grayImg).reshape(-1)
+def gray2array_ave_batch(grayImgs):
+    # N*H*W -> N*(H*W)，每行分别减去自己的均值
+    grayImgs=np.asarray(grayImgs)
+    flat=grayImgs.reshape(len(grayImgs),-1)
+    if np.issubdtype(flat.dtype,np.integer):
+        pixSum=flat.sum(axis=1,dtype=np.int64)
+    else:
+        pixSum=flat.sum(axis=1)
+    return flat-(pixSum/flat.shape[1])[:,None]
+def cos_matrix(baseStack,checkStack):
+    # baseStack为N张、checkStack为M张同样大小的灰度图(或LBP特征)，一次矩阵乘法得到N*M的cos值
+    return cos_features(gray2array_ave_batch(baseStack),gray2array_ave_batch(checkStack))
+def cos_features(baseArray,checkArray):
+    # N*D与M*D的特征(gray2array_ave的结果)两两求cos，得到N*M
+    num=np.dot(baseArray,checkArray.T)
+    denom=np.outer(np.linalg.norm(baseArray,axis=1),np.linalg.norm(checkArray,axis=1))
+    return num/denom
 def rgb2gray(rgb):
     gray=cv2.cvtColor(np.array(rgb), cv2.COLOR_BGR2GRAY)
     return gray
+def roi_features(imgPath,rois,size=(64,64)):
+    # 图片只解码一次，依次crop出所有roi，与cut_roi_for_labels+rgb2gray+gray2array_ave的结果一致，返回K*(64*64)
+    img=Image.open(imgPath)
+    img.load()
+    grays=[rgb2gray(img.crop(tuple(roi)).resize(size,Image.LANCZOS)) for roi in rois]
+    if len(grays)==0:
+        return np.zeros((0,size[0]*size[1]))
+    return gray2array_ave_batch(np.stack(grays))
+class RoiCosEngine(object):
+    def __init__(self,workers=4,size=(64,64),max_bytes=256*1024*1024,window=None):
+        """
+        :param workers: 解码图片的线程数
+        :param size: roi缩放后的大小，默认与img_cos_for_labels一致
+        :param max_bytes: 特征缓存的字节数上限(每个框size[0]*size[1]个float64)，超过时淘汰最久未用的
+        :param window: similarity_sequence每次解码的帧数，默认workers*2
+        """
+        self.workers=workers
+        self.size=size
+        self.max_bytes=max_bytes
+        self.window=window or max(workers*2,2)
+        # (imgPath,(xmin,ymin,xmax,ymax)) -> 特征，LRU顺序
+        self.features=OrderedDict()
+        self.bytes=0
+    def clear(self):
+        self.features=OrderedDict()
+        self.bytes=0
+    def store(self,key,feature):
+        if feature.nbytes>self.max_bytes:
+            return
+        self.features[key]=feature
+        self.bytes+=feature.nbytes
+        while self.bytes>self.max_bytes:
+            self.bytes-=self.features.popitem(last=False)[1].nbytes
+    def load(self,frames):
+        """
+        :param frames: [(imgPath,rois),...]，同一张图片不在缓存中的roi合并后只解码一次
+        :return: {(imgPath,roi):特征}，包含frames的所有roi，不受缓存淘汰影响
+        """
+        found={}
+        missing={}
+        for imgPath,rois in frames:
+            for roi in rois:
+                key=(imgPath,tuple(int(v) for v in roi))
+                if key in found:
+                    continue
+                feature=self.features.get(key)
+                if feature is not None:
+                    self.features.move_to_end(key)
+                    found[key]=feature
+                else:
+                    missing.setdefault(imgPath,{})[key[1]]=None
+        jobs=[(imgPath,list(rois)) for imgPath,rois in missing.items()]
+        def decode(job):
+            return roi_features(job[0],job[1],self.size)
+        if self.workers>1 and len(jobs)>1:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                results=list(pool.map(decode,jobs))
+        else:
+            results=[decode(job) for job in jobs]
+        for (imgPath,rois),features in zip(jobs,results):
+            for roi,feature in zip(rois,features):
+                found[(imgPath,roi)]=feature
+                self.store((imgPath,roi),feature)
+        return found
+    def stack(self,found,imgPath,rois):
+        if len(rois)==0:
+            return np.zeros((0,self.size[0]*self.size[1]))
+        return np.stack([found[(imgPath,tuple(int(v) for v in roi))] for roi in rois])
+    def get(self,imgPath,rois):
+        # K*D特征，不在缓存中的roi先解码
+        return self.stack(self.load([(imgPath,rois)]),imgPath,rois)
+    def similarity(self,basePath,checkPath,baseRois,checkRois):
+        # baseRois与checkRois两两的cos值，N*M，与逐对调用img_cos_for_labels相同
+        found=self.load([(basePath,baseRois),(checkPath,checkRois)])
+        return cos_features(self.stack(found,basePath,baseRois),self.stack(found,checkPath,checkRois))
+    def iter_similarity_sequence(self,frames):
+        """
+        :param frames: 可迭代的(imgPath,rois)，例如视频逐帧的标注
+        :return: 依次yield每一帧与前一帧所有框两两的cos矩阵；每次只解码window帧，内存与序列长度无关
+        """
+        frames=iter(frames)
+        previous=None
+        while True:
+            chunk=list(itertools.islice(frames,self.window))
+            if not chunk:
+                return
+            found=self.load(chunk)
+            for imgPath,rois in chunk:
+                current=self.stack(found,imgPath,rois)
+                if previous is not None:
+                    yield cos_features(previous,current)
+                previous=current
+    def similarity_sequence(self,frames):
+        """
+        :param frames: [(imgPath,rois),...]，例如视频逐帧的标注
+        :return: 每一帧与前一帧所有框两两的cos矩阵，共len(frames)-1个
+        """
+        return list(self.iter_similarity_sequence(frames))
 def show_img(img,pos=[100,100]):
     cv2.imshow("img",img)
     cv2.moveWindow("img",pos[0],pos[1])
@@ -151,10 +233,18 @@ def info():
     print("compare_LBP_featrue(basePath, checkPath, roi) -> float")
     print("compare_cos_featrue(basePath, checkPath, roi) -> float")
     print("cos(baseArray,checkArray) -> float")
-    print("cut_roi(jpgPath,roi=(xmin,ymin,xmax,ymax))) -> Image")
+    print("cut_roi(jpgPath,roi=(xmin,ymin,xmax,ymax)),cache=False) -> Image")
+    print("get_shape(imgPath,cache=False) -> (height,width)")
     print("get_LBP_featrue(roi) -> grayImg")
+    print("get_LBP_featrue_batch(rois) -> numpy.array")
     print("gray2array_ave(grayImg) -> numpy.array")
     print("gray2array_raw(grayImg) -> numpy.array")
+    print("cos_matrix(baseStack,checkStack) -> numpy.array")
+    print("cos_features(baseArray,checkArray) -> numpy.array")
+    print("roi_features(imgPath,rois,size=(64,64)) -> numpy.array")
+    print("RoiCosEngine(workers=4).similarity(basePath,checkPath,baseRois,checkRois) -> numpy.array")
+    print("RoiCosEngine(workers=4,max_bytes=256MB).similarity_sequence([(imgPath,rois),...]) -> [numpy.array,...]")
+    print("RoiCosEngine(workers=4,max_bytes=256MB).iter_similarity_sequence(frames) -> generator")
     print("rgb2gray(rgb) -> grayImg")
     print("show_img(img,pos=[100,100]) -> void")
     exit()
@@ -0,0 +1,115 @@
+import os
+import threading
+from collections import OrderedDict
+import cv2
+from PIL import Image
+from basicFun.IMGMETA import probe
+# 进程内共享的解码图片缓存，IMG、image_util和模型工具通过cache参数选用
+# key为(读取方式, 绝对路径, mtime, 文件大小)，文件被修改后旧条目不会再命中，按LRU淘汰到max_bytes以内
+# cv2读取的数组被设为只读，需要在图上修改(例如画框)时先copy()
+def read_cv2(path):
+    img=cv2.imread(path)
+    if img is not None:
+        img.flags.writeable=False
+    return img
+def open_pil(path):
+    img=Image.open(path)
+    img.load()
+    return img
+def pil_nbytes(img):
+    return img.size[0]*img.size[1]*len(img.getbands())
+class ImageCache(object):
+    def __init__(self,max_bytes=512*1024*1024):
+        """
+        :param max_bytes: 缓存图片的总字节数上限，单张超过上限的图片不缓存
+        """
+        self.max_bytes=max_bytes
+        self.lock=threading.Lock()
+        self.entries=OrderedDict()
+        self.bytes=0
+        self.reset_stats()
+    def reset_stats(self):
+        self.stats={'hits':0,'misses':0,'evictions':0}
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes=0
+    def set_max_bytes(self,max_bytes):
+        with self.lock:
+            self.max_bytes=max_bytes
+            self.evict()
+    def evict(self):
+        # 调用方持有self.lock
+        while self.bytes>self.max_bytes and self.entries:
+            value,nbytes=self.entries.popitem(last=False)[1]
+            self.bytes-=nbytes
+            self.stats['evictions']+=1
+    def get(self,kind,path,load,nbytes):
+        try:
+            stat=os.stat(path)
+        except OSError:
+            # 文件不存在时交给load决定返回None还是抛异常，与不用缓存时一致
+            return load(path)
+        key=(kind,os.path.abspath(path),stat.st_mtime_ns,stat.st_size)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.stats['hits']+=1
+                return self.entries[key][0]
+            self.stats['misses']+=1
+        value=load(path)
+        if value is None:
+            return value
+        size=nbytes(value)
+        with self.lock:
+            if size<=self.max_bytes and key not in self.entries:
+                self.entries[key]=(value,size)
+                self.bytes+=size
+                self.evict()
+        return value
+    def imread(self,path):
+        # 同cv2.imread(path)，返回只读数组
+        return self.get('cv2',path,read_cv2,lambda img:img.nbytes)
+    def open(self,path):
+        # 同Image.open(path)，返回已解码的图片
+        return self.get('pil',path,open_pil,pil_nbytes)
+    def probe(self,path):
+        return self.get('probe',path,probe,lambda meta:64)
+    def summary(self):
+        return 'entries: %d  bytes: %d/%d  hits: %d  misses: %d  evictions: %d'%(
+            len(self.entries),self.bytes,self.max_bytes,self.stats['hits'],self.stats['misses'],self.stats['evictions'])
+_shared=None
+_sharedLock=threading.Lock()
+def get_cache():
+    # 进程内共享的缓存，第一次使用时创建
+    global _shared
+    with _sharedLock:
+        if _shared is None:
+            _shared=ImageCache()
+        return _shared
+def resolve(cache):
+    # cache参数: False/None不使用缓存，True使用共享缓存，也可以直接传入ImageCache
+    if cache is True:
+        return get_cache()
+    if cache is False or cache is None:
+        return None
+    return cache
+def imread(path,cache=False):
+    cache=resolve(cache)
+    return cache.imread(path) if cache is not None else cv2.imread(path)
+def open_image(path,cache=False):
+    cache=resolve(cache)
+    return cache.open(path) if cache is not None else Image.open(path)
+def probe_image(path,cache=False):
+    cache=resolve(cache)
+    return cache.probe(path) if cache is not None else probe(path)
+def info():
+    print("ImageCache(max_bytes=512*1024*1024)")
+    print("ImageCache.imread(path) -> numpy.array (read only)")
+    print("ImageCache.open(path) -> Image")
+    print("ImageCache.probe(path) -> (width,height,channels,mode)")
+    print("ImageCache.summary() -> str")
+    print("get_cache() -> ImageCache")
+    print("imread(path,cache=False) -> numpy.array")
+    print("probe_image(path,cache=False) -> (width,height,channels,mode)")
+    exit()
@@ -0,0 +1,126 @@
+import os
+import csv
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+# 只读文件头得到图片的宽、高、通道数和mode，不解码像素
+# JPEG/PNG直接解析文件头，其他格式交给PIL(Image.open同样只读文件头)，mode与通道数和PIL一致
+JPEG_SOF=set(range(0xC0,0xD0))-set([0xC4,0xC8,0xCC])
+JPEG_MODES={1:'L',3:'RGB',4:'CMYK'}
+# PNG color type -> (mode, channels)
+PNG_MODES={0:('L',1),2:('RGB',3),3:('P',1),4:('LA',2),6:('RGBA',4)}
+PNG_SIGNATURE=b'\x89PNG\r\n\x1a\n'
+def read_jpeg_header(f):
+    # f位于SOI之后，逐个跳过marker段直到SOF，返回(width,height,channels,mode)，不是合法的JPEG返回None
+    while True:
+        byte=f.read(1)
+        while byte and byte!=b'\xff':
+            byte=f.read(1)
+        while byte==b'\xff':
+            byte=f.read(1)
+        if not byte:
+            return None
+        marker=ord(byte)
+        if marker==0x01 or 0xD0<=marker<=0xD8:
+            continue
+        if marker==0xD9 or marker==0xDA:
+            return None
+        data=f.read(2)
+        if len(data)<2:
+            return None
+        length=struct.unpack('>H',data)[0]
+        if marker in JPEG_SOF:
+            data=f.read(6)
+            if len(data)<6:
+                return None
+            precision,height,width,channels=struct.unpack('>BHHB',data)
+            if channels not in JPEG_MODES:
+                return None
+            return width,height,channels,JPEG_MODES[channels]
+        f.seek(length-2,1)
+def read_png_header(f):
+    # f位于PNG签名之后，第一个chunk必须是IHDR
+    data=f.read(25)
+    if len(data)<25 or data[4:8]!=b'IHDR':
+        return None
+    width,height,depth,colorType=struct.unpack('>IIBB',data[8:18])
+    if colorType not in PNG_MODES:
+        return None
+    mode,channels=PNG_MODES[colorType]
+    if depth==16 and colorType==0:
+        mode='I;16'
+    elif depth==1 and colorType==0:
+        mode='1'
+    return width,height,channels,mode
+def read_header(path):
+    # JPEG/PNG返回(width,height,channels,mode)，其他格式或文件头损坏返回None
+    with open(path,'rb') as f:
+        head=f.read(8)
+        if head[:2]==b'\xff\xd8':
+            f.seek(2)
+            return read_jpeg_header(f)
+        if head==PNG_SIGNATURE:
+            return read_png_header(f)
+    return None
+def probe(path):
+    """
+    :param path: 图片路径
+    :return: (width,height,channels,mode)，无法识别的图片抛出异常(IOError或PIL的异常)
+    """
+    meta=read_header(path)
+    if meta is not None:
+        return meta
+    with Image.open(path) as img:
+        return img.size[0],img.size[1],len(img.getbands()),img.mode
+def probe_entry(path):
+    try:
+        return probe(path)
+    except Exception:
+        return None
+def list_images(imageDir,suffixes=('.jpg','.jpeg','.png')):
+    # imageDir下(含子目录)所有图片的相对路径，排序后返回
+    paths=[]
+    for root,dirs,files in os.walk(imageDir):
+        for name in files:
+            if os.path.splitext(name)[-1].lower() in suffixes:
+                paths.append(os.path.relpath(os.path.join(root,name),imageDir))
+    paths.sort()
+    return paths
+def scan_dir(imageDir,manifestPath=None,workers=8,suffixes=('.jpg','.jpeg','.png')):
+    """
+    :param imageDir: 图片目录，包含子目录
+    :param manifestPath: [optional] csv清单，每行为path,width,height,channels,mode，无法识别的图片后四列为空
+    :param workers: 读取文件头的线程数
+    :return: [(path,(width,height,channels,mode) or None),...]，path为相对imageDir的路径
+    """
+    paths=list_images(imageDir,suffixes)
+    fullPaths=[os.path.join(imageDir,path) for path in paths]
+    if workers>1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            metas=list(pool.map(probe_entry,fullPaths))
+    else:
+        metas=[probe_entry(path) for path in fullPaths]
+    results=list(zip(paths,metas))
+    if manifestPath is not None:
+        with open(manifestPath,'w',newline='') as f:
+            writer=csv.writer(f)
+            writer.writerow(['path','width','height','channels','mode'])
+            for path,meta in results:
+                writer.writerow([path]+list(meta if meta is not None else ['','','','']))
+    return results
+def read_manifest(manifestPath):
+    # scan_dir写出的清单 -> {path:(width,height,channels,mode) or None}
+    manifest={}
+    with open(manifestPath,'r',newline='') as f:
+        reader=csv.reader(f)
+        next(reader)
+        for row in reader:
+            path,width,height,channels,mode=row
+            manifest[path]=(int(width),int(height),int(channels),mode) if width!='' else None
+    return manifest
+def info():
+    print("probe(path) -> (width,height,channels,mode)")
+    print("read_header(path) -> (width,height,channels,mode) or None")
+    print("scan_dir(imageDir,manifestPath=None,workers=8,suffixes=('.jpg','.jpeg','.png')) -> [(path,meta),...]")
+    print("read_manifest(manifestPath) -> dict")
+    exit()
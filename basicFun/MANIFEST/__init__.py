@@ -0,0 +1,144 @@
+import os
+import csv
+import hashlib
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from basicFun import FILES
+# 目录快照: 每个文件记录(大小, mtime, 可选的sha1)，与上一次快照比较得到新增、删除和修改的文件
+# 批处理工具的since参数为快照文件路径(或Manifest)，只处理变化的部分，处理完后把处理前的快照写回since
+# (工具自己改写的文件用refresh更新)，处理期间被其他进程修改的文件下一次仍然算作变化
+# key为(root, 相对root的路径)，一个快照可以包含多个root；root为单个文件时相对路径为''
+Delta=namedtuple('Delta',['added','deleted','modified'])
+def file_hash(path):
+    sha=hashlib.sha1()
+    with open(path,'rb') as f:
+        while True:
+            chunk=f.read(1<<20)
+            if not chunk:
+                break
+            sha.update(chunk)
+    return sha.hexdigest()
+class Manifest(object):
+    def __init__(self,entries=None):
+        # (root, relpath) -> (size, mtime_ns, sha1 or None)
+        self.entries=entries if entries is not None else {}
+    @classmethod
+    def scan(cls,roots,hash=False,suffixes=None,recursive=True,workers=1,previous=None):
+        """
+        :param roots: 目录或文件，或者它们的list
+        :param hash: 同时计算sha1，大小和mtime都没变的文件沿用previous中的sha1
+        :param suffixes: [optional] 只记录这些后缀的文件
+        :param recursive: False时只记录第一层
+        :param workers: 遍历子目录和计算sha1的线程数
+        :param previous: [optional] 上一次的快照，用于沿用sha1
+        """
+        if isinstance(roots,str):
+            roots=[roots]
+        entries={}
+        for root in roots:
+            root=os.path.normpath(root)
+            if os.path.isfile(root):
+                stat=os.stat(root)
+                entries[(root,'')]=(stat.st_size,stat.st_mtime_ns,None)
+                continue
+            if not os.path.isdir(root):
+                continue
+            start=len(root)+1
+            for entry in FILES.scan_entries(root,suffixes,recursive=recursive,workers=workers):
+                stat=entry.stat()
+                entries[(root,entry.path[start:])]=(stat.st_size,stat.st_mtime_ns,None)
+        if hash:
+            missing=[]
+            for key,(size,mtime,sha) in entries.items():
+                old=previous.entries.get(key) if previous is not None else None
+                if old is not None and old[:2]==(size,mtime) and old[2] is not None:
+                    entries[key]=(size,mtime,old[2])
+                else:
+                    missing.append(key)
+            paths=[os.path.join(root,path) if path else root for root,path in missing]
+            with ThreadPoolExecutor(max_workers=max(workers,1)) as pool:
+                for key,sha in zip(missing,pool.map(file_hash,paths)):
+                    entries[key]=entries[key][:2]+(sha,)
+        return cls(entries)
+    def save(self,path):
+        # 先写临时文件再替换
+        tmpPath=path+'.tmp'
+        with open(tmpPath,'w',newline='') as f:
+            writer=csv.writer(f)
+            writer.writerow(['root','path','size','mtime_ns','sha1'])
+            for (root,relpath),(size,mtime,sha) in sorted(self.entries.items()):
+                writer.writerow([root,relpath,size,mtime,sha or ''])
+        os.replace(tmpPath,path)
+    @classmethod
+    def load(cls,path):
+        entries={}
+        with open(path,'r',newline='') as f:
+            reader=csv.reader(f)
+            next(reader)
+            for root,relpath,size,mtime,sha in reader:
+                entries[(root,relpath)]=(int(size),int(mtime),sha or None)
+        return cls(entries)
+    def refresh(self,root,relpaths):
+        # 重新stat root下的这些文件(工具自己改写或删除的文件)，不存在的文件从快照中去掉
+        root=os.path.normpath(root)
+        for relpath in relpaths:
+            try:
+                stat=os.stat(os.path.join(root,relpath) if relpath else root)
+            except FileNotFoundError:
+                self.entries.pop((root,relpath),None)
+                continue
+            self.entries[(root,relpath)]=(stat.st_size,stat.st_mtime_ns,None)
+    def __len__(self):
+        return len(self.entries)
+    def diff(self,previous):
+        """
+        :param previous: 上一次的快照，None表示所有文件都是新增的
+        :return: Delta(added, deleted, modified)，均为key的集合；
+            大小或mtime变化的文件为修改，两边都有sha1且相同时(只是touch)不算修改
+        """
+        old=previous.entries if previous is not None else {}
+        added=set(self.entries.keys()-old.keys())
+        deleted=set(old.keys()-self.entries.keys())
+        modified=set()
+        for key in self.entries.keys()&old.keys():
+            size,mtime,sha=self.entries[key]
+            oldSize,oldMtime,oldSha=old[key]
+            if (size,mtime)!=(oldSize,oldMtime) and (sha is None or oldSha is None or sha!=oldSha or size!=oldSize):
+                modified.add(key)
+        return Delta(added,deleted,modified)
+def load_since(since):
+    # since为Manifest、快照文件路径或None，文件不存在时返回None
+    if since is None or isinstance(since,Manifest):
+        return since
+    if os.path.exists(since):
+        return Manifest.load(since)
+    return None
+def snapshot_delta(roots,since,**kwargs):
+    """
+    :param since: 上一次的快照(Manifest或文件路径)，不存在时所有文件都是新增的
+    :param kwargs: Manifest.scan的参数
+    :return: (当前快照, Delta)
+    """
+    previous=load_since(since)
+    current=Manifest.scan(roots,previous=previous,**kwargs)
+    return current,current.diff(previous)
+def changed_paths(keys,root):
+    # Delta中某个root下的相对路径集合
+    root=os.path.normpath(root)
+    return set(relpath for keyRoot,relpath in keys if keyRoot==root)
+def commit(since,current):
+    """
+    处理完成后把处理前的快照current写回since(文件路径时)；不重新扫描目录，工具改写的文件先用current.refresh更新
+    """
+    if since is None or isinstance(since,Manifest):
+        return None
+    current.save(since)
+    return current
+def info():
+    print("Manifest.scan(roots,hash=False,suffixes=None,recursive=True,workers=1,previous=None) -> Manifest")
+    print("Manifest.diff(previous) -> Delta(added,deleted,modified)")
+    print("Manifest.save(path) / Manifest.load(path)")
+    print("snapshot_delta(roots,since,**kwargs) -> (Manifest,Delta)")
+    print("Manifest.refresh(root,relpaths) -> void")
+    print("commit(since,current) -> Manifest")
+    exit()
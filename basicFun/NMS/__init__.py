@@ -0,0 +1,168 @@
+import numpy as np
+# modelTool/modelTool_mb 共用的互斥框合并
+# engine='numpy' 一次算出两两IoU矩阵，用bool mask记录已使用的框
+# engine='loop' 为原来的逐对循环实现，保留用于对照
+def nms_exclusive_boxes(boxes,classes,labelmap,exclusiveGroups,thresh,specialThresh,engine='numpy'):
+    preBoxes,preClasses=select_boxes(boxes,classes,labelmap,exclusiveGroups,thresh,specialThresh)
+    if engine=='loop':
+        return match_boxes_loop(preBoxes,preClasses,labelmap,thresh,specialThresh)
+    return match_boxes(preBoxes,preClasses,labelmap,thresh,specialThresh)
+def select_boxes(boxes,classes,labelmap,exclusiveGroups,thresh,specialThresh):
+    # 互斥组内的类别共享阈值 cthresh/len(exclusiveGroup)
+    preBoxes=[]
+    preClasses=[]
+    try:
+        for i, c in enumerate(classes):
+            for exclusiveGroup in exclusiveGroups:
+                if labelmap[c] in specialThresh.keys():
+                    cthresh=specialThresh[labelmap[c]]
+                else:
+                    cthresh=thresh
+                if labelmap[c] in exclusiveGroup:
+                    shareThresh=cthresh/len(exclusiveGroup)
+                    if boxes[i][4]>shareThresh:
+                        preBoxes.append(boxes[i])
+                        preClasses.append(c)
+                    break
+            if boxes[i][4]>cthresh:
+                preBoxes.append(boxes[i])
+                preClasses.append(c)
+    except:
+        pass
+    return preBoxes,preClasses
+def get_iou(box1, box2):
+    """
+    :param box1:[x1,y1,x2,y2] 左上角的坐标与右下角的坐标
+    :param box2:[x1,y1,x2,y2]
+    :return: iou_ratio--交并比
+    """
+    width1 = abs(box1[2] - box1[0])
+    height1 = abs(box1[1] - box1[3])  # 这里y1-y2是因为一般情况y1>y2，为了方便采用绝对值
+    width2 = abs(box2[2] - box2[0])
+    height2 = abs(box2[1] - box2[3])
+    x_max = max(box1[0], box1[2], box2[0], box2[2])
+    y_max = max(box1[1], box1[3], box2[1], box2[3])
+    x_min = min(box1[0], box1[2], box2[0], box2[2])
+    y_min = min(box1[1], box1[3], box2[1], box2[3])
+    iou_width = x_min + width1 + width2 - x_max
+    iou_height = y_min + height1 + height2 - y_max
+    if iou_width <= 0 or iou_height <= 0:
+        iou_ratio = 0
+    else:
+        iou_area = iou_width * iou_height  # 交集的面积
+        box1_area = width1 * height1
+        box2_area = width2 * height2
+        iou_ratio = iou_area / (box1_area + box2_area - iou_area)  # 并集的面积
+    return iou_ratio
+def get_iou_matrix(coords):
+    """
+    :param coords: Nx4 [x1,y1,x2,y2]
+    :return: NxN 交并比矩阵，逐元素与get_iou的计算顺序一致
+    """
+    x1,y1,x2,y2=coords[:,0],coords[:,1],coords[:,2],coords[:,3]
+    width=np.abs(x2-x1)
+    height=np.abs(y1-y2)
+    xHigh=np.maximum(x1,x2)
+    yHigh=np.maximum(y1,y2)
+    xLow=np.minimum(x1,x2)
+    yLow=np.minimum(y1,y2)
+    x_max=np.maximum(xHigh[:,None],xHigh[None,:])
+    y_max=np.maximum(yHigh[:,None],yHigh[None,:])
+    x_min=np.minimum(xLow[:,None],xLow[None,:])
+    y_min=np.minimum(yLow[:,None],yLow[None,:])
+    iou_width=x_min+width[:,None]+width[None,:]-x_max
+    iou_height=y_min+height[:,None]+height[None,:]-y_max
+    iou_area=iou_width*iou_height
+    area=width*height
+    with np.errstate(divide='ignore',invalid='ignore'):
+        iou=iou_area/(area[:,None]+area[None,:]-iou_area)
+    iou[(iou_width<=0)|(iou_height<=0)]=0
+    return iou
+def match_boxes(preBoxes,preClasses,labelmap,thresh,specialThresh,iouThresh=0.7):
+    if len(preBoxes)==0:
+        return [],[]
+    # 同一个box对象可能被select_boxes加入两次，只保留第一次出现的位置
+    seen=set()
+    keep=[]
+    for i, preBox in enumerate(preBoxes):
+        if id(preBox) not in seen:
+            seen.add(id(preBox))
+            keep.append(i)
+    stacked=np.asarray([preBoxes[i] for i in keep])
+    # 值完全相同的不同对象在原实现里会因原地修改分数而出现特殊情况，交给原实现处理
+    if np.isnan(stacked).any() or len(np.unique(stacked,axis=0))!=len(keep):
+        return match_boxes_loop(preBoxes,preClasses,labelmap,thresh,specialThresh)
+    iou=get_iou_matrix(stacked[:,:4])>iouThresh
+    n=len(keep)
+    used=np.zeros(n,dtype=bool)
+    postBoxes=[]
+    postClasses=[]
+    for i in range(n):
+        if used[i]:
+            continue
+        used[i]=True
+        members=np.flatnonzero(iou[i,i+1:]&~used[i+1:])+i+1
+        used[members]=True
+        preBox=preBoxes[keep[i]]
+        matchBox=preBox
+        matchClass=preClasses[keep[i]]
+        maxMatchScore=preBox[4]
+        matchScore=preBox[4]
+        for m in members:
+            pBox=preBoxes[keep[m]]
+            matchScore+=pBox[4]
+            if pBox[4]>maxMatchScore:
+                maxMatchScore=pBox[4]
+                matchBox=pBox
+                matchClass=preClasses[keep[m]]
+        matchBox[4]=min(matchScore,1.0)
+        if labelmap[matchClass] in specialThresh.keys():
+            cthresh=specialThresh[labelmap[matchClass]]
+        else:
+            cthresh=thresh
+        if matchBox[4]>cthresh:
+            postBoxes.append(matchBox)
+            postClasses.append(matchClass)
+    return postBoxes,postClasses
+def match_boxes_loop(preBoxes,preClasses,labelmap,thresh,specialThresh):
+    postBoxes=[]
+    postClasses=[]
+    usedBoxes=[]
+    for i, preBox in enumerate(preBoxes):
+        used=0
+        for usedBox in usedBoxes:
+            if all(preBox==usedBox):
+                used=1
+        if used==0:
+            usedBoxes.append(preBox)
+            matchBox=preBox
+            matchClass=preClasses[i]
+            maxMatchScore=preBox[4]
+            matchScore=preBox[4]
+            for p, pBox in enumerate(preBoxes[i+1:]):
+                pused=0
+                for usedBox in usedBoxes:
+                    if all(pBox==usedBox):
+                        pused=1
+                if pused==0:
+                    boxIou=get_iou(preBox[:4],pBox[:4])
+                    if boxIou>0.7:
+                        usedBoxes.append(pBox)
+                        matchScore+=pBox[4]
+                        if pBox[4]>maxMatchScore:
+                            maxMatchScore=pBox[4]
+                            matchBox=pBox
+                            matchClass=preClasses[p+i+1]
+            matchBox[4]=min(matchScore,1.0)
+            if labelmap[matchClass] in specialThresh.keys():
+                cthresh=specialThresh[labelmap[matchClass]]
+            else:
+                cthresh=thresh
+            if matchBox[4]>cthresh:
+                postBoxes.append(matchBox)
+                postClasses.append(matchClass)
+    return postBoxes,postClasses
+def info():
+    print("nms_exclusive_boxes(boxes,classes,labelmap,exclusiveGroups,thresh,specialThresh,engine='numpy') -> postBoxes,postClasses")
+    print("get_iou_matrix(coords) -> numpy.array")
+    exit()
@@ -0,0 +1,148 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+from basicFun import IMGCACHE
+# 解码/预处理、推理、后处理三段流水线
+# 解码和预处理在线程池中进行，推理和后处理各占一个线程，阶段之间用有界队列连接
+# queue_size控制每段最多积压的帧数，下游处理不过来时上游会阻塞(back-pressure)
+_END = object()
+class _Failure(object):
+    def __init__(self, error):
+        self.error = error
+class FramePipeline(object):
+    def __init__(self, infer, preprocess=None, postprocess=None, workers=4, queue_size=8, cache=False):
+        """
+        :param infer: 推理函数 infer(preprocessed) -> raw result，只在一个线程中调用
+        :param preprocess: 预处理函数 preprocess(image) -> preprocessed，在线程池中调用，None则直接传递图片
+        :param postprocess: 后处理函数 postprocess(image, raw result) -> result，None则直接返回raw result
+        :param workers: 解码/预处理线程数
+        :param queue_size: 每个阶段队列的长度
+        :param cache: 图片路径通过IMGCACHE缓存解码，True为共享缓存，读到的图片为只读数组
+        """
+        self.infer = infer
+        self.preprocess = preprocess
+        self.postprocess = postprocess
+        self.workers = workers
+        self.queue_size = queue_size
+        self.cache = cache
+        self.lock = threading.Lock()
+        self.reset_stats()
+    def reset_stats(self):
+        # 每个阶段累计处理的帧数与耗时(秒)，decode为所有线程耗时之和
+        self.stats = {stage: {'count': 0, 'time': 0.0} for stage in ['decode', 'preprocess', 'infer', 'postprocess']}
+    def add_stat(self, stage, cost):
+        with self.lock:
+            self.stats[stage]['count'] += 1
+            self.stats[stage]['time'] += cost
+    def summary(self):
+        lines = []
+        for stage in ['decode', 'preprocess', 'infer', 'postprocess']:
+            stat = self.stats[stage]
+            average = stat['time'] / stat['count'] * 1000 if stat['count'] else 0.0
+            lines.append('%-11s count: %6d  total: %8.3f sec  average: %7.2f ms' % (stage, stat['count'], stat['time'], average))
+        return '\n'.join(lines)
+    def prepare(self, item):
+        start = time.time()
+        image = IMGCACHE.imread(item, self.cache) if isinstance(item, str) else item
+        if image is None:
+            raise IOError('Can not read image {}'.format(item))
+        self.add_stat('decode', time.time() - start)
+        start = time.time()
+        preprocessed = self.preprocess(image) if self.preprocess is not None else image
+        self.add_stat('preprocess', time.time() - start)
+        return image, preprocessed
+    def put(self, q, item, stop):
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    def get(self, q, stop):
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END
+    def feed(self, inputs, pool, decoded, stop):
+        try:
+            for item in inputs:
+                if not self.put(decoded, pool.submit(self.prepare, item), stop):
+                    return
+        except Exception as e:
+            self.put(decoded, _Failure(e), stop)
+        self.put(decoded, _END, stop)
+    def run_infer(self, decoded, inferred, stop):
+        while True:
+            future = self.get(decoded, stop)
+            if future is _END or isinstance(future, _Failure):
+                self.put(inferred, future, stop)
+                return
+            try:
+                image, preprocessed = future.result()
+                start = time.time()
+                raw = self.infer(preprocessed)
+                self.add_stat('infer', time.time() - start)
+            except Exception as e:
+                self.put(inferred, _Failure(e), stop)
+                return
+            if not self.put(inferred, (image, raw), stop):
+                return
+    def run_postprocess(self, inferred, results, stop):
+        while True:
+            item = self.get(inferred, stop)
+            if item is _END or isinstance(item, _Failure):
+                self.put(results, item, stop)
+                return
+            try:
+                image, raw = item
+                start = time.time()
+                result = self.postprocess(image, raw) if self.postprocess is not None else raw
+                self.add_stat('postprocess', time.time() - start)
+            except Exception as e:
+                self.put(results, _Failure(e), stop)
+                return
+            if not self.put(results, result, stop):
+                return
+    def run(self, inputs):
+        """
+        :param inputs: 图片路径或opencv图片组成的可迭代对象
+        :return: 生成器，按输入顺序逐个返回结果
+        """
+        decoded = queue.Queue(self.queue_size)
+        inferred = queue.Queue(self.queue_size)
+        results = queue.Queue(self.queue_size)
+        stop = threading.Event()
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        threads = [
+            threading.Thread(target=self.feed, args=(inputs, pool, decoded, stop)),
+            threading.Thread(target=self.run_infer, args=(decoded, inferred, stop)),
+            threading.Thread(target=self.run_postprocess, args=(inferred, results, stop)),
+        ]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        try:
+            while True:
+                item = results.get()
+                if item is _END:
+                    break
+                if isinstance(item, _Failure):
+                    raise item.error
+                yield item
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+            pool.shutdown(wait=True)
+def info():
+    print("FramePipeline(infer, preprocess=None, postprocess=None, workers=4, queue_size=8, cache=False)")
+    print("FramePipeline.run(inputs) -> generator")
+    print("FramePipeline.summary() -> str")
+    exit()
@@ -0,0 +1,135 @@
+import os
+import csv
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from basicFun import COPY
+# xml与图片的对应关系: 两个目录各只列一次，在集合上得到有xml没图片、有图片没xml以及配对的文件
+# 不再对每个xml做一次os.path.isfile，网络存储上每次isfile都是一次往返
+IMAGE_SUFFIXES=('.jpg','.jpeg','.png')
+ACTIONS=('delete','move','copy','report')
+def list_names(rootDir):
+    # rootDir第一层的文件名(跟随软链接)，目录不存在时为空
+    if not os.path.isdir(rootDir):
+        return []
+    with os.scandir(rootDir) as it:
+        return [entry.name for entry in it if entry.is_file()]
+class Reconciliation(object):
+    def __init__(self,xmlDir,imageDir,imageSuffixes=IMAGE_SUFFIXES):
+        """
+        :param xmlDir: xml目录
+        :param imageDir: 图片目录
+        :param imageSuffixes: 参与配对的图片后缀，不区分大小写，同名多张图片时按此顺序排列
+        """
+        self.xmlDir=xmlDir
+        self.imageDir=imageDir
+        self.imageSuffixes=tuple(suffix.lower() for suffix in imageSuffixes)
+        order={suffix[1:]:i for i,suffix in enumerate(self.imageSuffixes)}
+        # 用rpartition代替os.path.splitext，几十万个文件名时后者占了大部分时间
+        xmls={}
+        for name in list_names(xmlDir):
+            stem,dot,suffix=name.rpartition('.')
+            if stem and suffix=='xml':
+                xmls[stem]=name
+        images={}
+        for name in list_names(imageDir):
+            stem,dot,suffix=name.rpartition('.')
+            rank=order.get(suffix.lower()) if stem else None
+            if rank is None:
+                continue
+            names=images.get(stem)
+            if names is None:
+                images[stem]=[name]
+            else:
+                names.append(name)
+                names.sort(key=lambda name:order[name.rpartition('.')[2].lower()])
+        # xml名 -> 同名图片列表
+        self.matched={xmls[stem]:images[stem] for stem in sorted(xmls.keys()&images.keys())}
+        self.xml_only=sorted(xmls[stem] for stem in xmls.keys()-images.keys())
+        self.image_only=sorted(name for stem in images.keys()-xmls.keys() for name in images[stem])
+    def matched_images(self):
+        return [name for names in self.matched.values() for name in names]
+    def summary(self):
+        return 'matched: %d  xml without image: %d  image without xml: %d'%(
+            len(self.matched),len(self.xml_only),len(self.image_only))
+    def write_report(self,reportPath):
+        # csv: kind,xml,image，kind为matched/xml_only/image_only
+        with open(reportPath,'w',newline='') as f:
+            writer=csv.writer(f)
+            writer.writerow(['kind','xml','image'])
+            for xml,images in self.matched.items():
+                for image in images:
+                    writer.writerow(['matched',xml,image])
+            for xml in self.xml_only:
+                writer.writerow(['xml_only',xml,''])
+            for image in self.image_only:
+                writer.writerow(['image_only','',image])
+def move_file(args):
+    src,dst=args
+    try:
+        os.replace(src,dst)
+    except OSError:
+        # 跨设备时os.replace失败，shutil.move会复制后删除
+        shutil.move(src,dst)
+    return True
+def remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return False
+    return True
+def apply(names,srcDir,action,targetDir=None,workers=8,dryRun=False,**kwargs):
+    """
+    :param names: srcDir下的文件名
+    :param action: delete/move/copy/report，report不修改任何文件
+    :param targetDir: move和copy的目标目录
+    :param dryRun: 只返回将要处理的文件，不修改任何文件
+    :param kwargs: copy时传给COPY.copy_pairs(skip, mode, manifest)
+    :return: 处理(dryRun时为将要处理)的文件数
+    """
+    if action not in ACTIONS:
+        raise ValueError('action must be one of %s, got %r'%(ACTIONS,action))
+    if action in ('move','copy') and targetDir is None:
+        raise ValueError('%s needs targetDir'%action)
+    if dryRun or action=='report' or not names:
+        return len(names)
+    srcPaths=[os.path.join(srcDir,name) for name in names]
+    if action in ('move','copy') and not os.path.exists(targetDir):
+        os.makedirs(targetDir)
+    if action=='copy':
+        pairs=[(src,os.path.join(targetDir,name)) for src,name in zip(srcPaths,names)]
+        engine=COPY.copy_pairs(pairs,workers=workers,progress=False,**kwargs)
+        return len(pairs)-engine.stats['failed']
+    if action=='move':
+        tasks=[(src,os.path.join(targetDir,name)) for src,name in zip(srcPaths,names)]
+        func=move_file
+    else:
+        tasks=srcPaths
+        func=remove_file
+    with ThreadPoolExecutor(max_workers=max(workers,1)) as pool:
+        return sum(1 for done in pool.map(func,tasks) if done)
+def reconcile(xmlDir,imageDir,target='xml_only',action='report',targetDir=None,imageSuffixes=IMAGE_SUFFIXES,
+              workers=8,dryRun=False,reportPath=None,**kwargs):
+    """
+    :param target: xml_only(没有图片的xml)、image_only(没有xml的图片)或matched(有xml的图片)
+    :param action: delete/move/copy/report
+    :param targetDir: move和copy的目标目录
+    :param reportPath: [optional] 写出完整的配对报告(dryRun时同样写出)
+    :return: (Reconciliation, 处理的文件数)
+    """
+    result=Reconciliation(xmlDir,imageDir,imageSuffixes)
+    if target=='xml_only':
+        names,srcDir=result.xml_only,xmlDir
+    elif target=='image_only':
+        names,srcDir=result.image_only,imageDir
+    elif target=='matched':
+        names,srcDir=result.matched_images(),imageDir
+    else:
+        raise ValueError("target must be xml_only, image_only or matched, got %r"%target)
+    if reportPath is not None:
+        result.write_report(reportPath)
+    return result,apply(names,srcDir,action,targetDir,workers,dryRun,**kwargs)
+def info():
+    print("Reconciliation(xmlDir,imageDir,imageSuffixes=('.jpg','.jpeg','.png')) -> matched/xml_only/image_only")
+    print("reconcile(xmlDir,imageDir,target='xml_only',action='report',targetDir=None,imageSuffixes=IMAGE_SUFFIXES,workers=8,dryRun=False,reportPath=None) -> (Reconciliation,count)")
+    print("apply(names,srcDir,action,targetDir=None,workers=8,dryRun=False) -> count")
+    exit()
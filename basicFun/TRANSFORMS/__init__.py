@@ -0,0 +1,112 @@
+import cv2
+import numpy as np
+import torch
+from torchvision import transforms as T
+from torchvision.transforms import functional as F
+# MBModel的预处理，不依赖maskrcnn_benchmark: 原来的PIL流水线(ToPILImage -> Resize -> ToTensor -> to_bgr -> Normalize)
+# 以及直接作用在OpenCV图像上的TensorTransform
+
+
+class Resize(object):
+    def __init__(self, min_size, max_size):
+        # if not isinstance(min_size, (list, tuple)):
+        #     min_size = (min_size,)
+        self.min_size = min_size
+        self.max_size = max_size
+
+    # modified from torchvision to add support for max size
+    def get_size(self, image_size):
+        w, h = image_size
+        size = self.min_size
+        max_size = self.max_size
+        if max_size is not None:
+            min_original_size = float(min((w, h)))
+            max_original_size = float(max((w, h)))
+            if max_original_size / min_original_size * size > max_size:
+                size = int(round(max_size * min_original_size / max_original_size))
+
+        if (w <= h and w == size) or (h <= w and h == size):
+            return (h, w)
+
+        if w < h:
+            ow = size
+            oh = int(size * h / w)
+        else:
+            oh = size
+            ow = int(size * w / h)
+
+        return (oh, ow)
+
+    def __call__(self, image):
+        size = self.get_size(image.size)
+        image = F.resize(image, size)
+        return image
+
+
+class TensorTransform(object):
+    """
+    Same preprocessing as ToPILImage -> Resize -> ToTensor -> to_bgr ->
+    Normalize, but applied to the OpenCV buffer directly: one cv2.resize,
+    one uint8 -> float copy and a single fused scale/offset normalisation.
+    """
+
+    def __init__(self, min_size, max_size, to_bgr255, pixel_mean, pixel_std):
+        self.resize = Resize(min_size, max_size)
+        self.to_bgr255 = to_bgr255
+        mean = torch.tensor(pixel_mean, dtype=torch.float32).view(-1, 1, 1)
+        std = torch.tensor(pixel_std, dtype=torch.float32).view(-1, 1, 1)
+        # (x * k - mean) / std == x * (k / std) - mean / std
+        # with k = 1 for BGR255 input and k = 1 / 255 for RGB in [0-1] range
+        self.scale = (1.0 if to_bgr255 else 1.0 / 255) / std
+        self.offset = -mean / std
+
+    def __call__(self, image):
+        height, width = image.shape[:2]
+        size = self.resize.get_size((width, height))
+        if size != (height, width):
+            # PIL filters on downscale; INTER_AREA is only worth its cost when
+            # shrinking by 2x or more, below that INTER_LINEAR stays close
+            interpolation = cv2.INTER_AREA if size[0] * 2 <= height else cv2.INTER_LINEAR
+            image = cv2.resize(image, (size[1], size[0]), interpolation=interpolation)
+        tensor = torch.from_numpy(np.ascontiguousarray(image)).permute(2, 0, 1)
+        if not self.to_bgr255:
+            tensor = tensor.flip(0)
+        tensor = tensor.contiguous().float()
+        return tensor.mul_(self.scale).add_(self.offset)
+
+
+def build_transform(min_size, max_size, to_bgr255, pixel_mean, pixel_std, tensor_transform=False):
+    """
+    :param to_bgr255: True时输入为0-255的BGR，否则为0-1的RGB
+    :param tensor_transform: True返回TensorTransform，否则返回原来的PIL流水线
+    """
+    if tensor_transform:
+        return TensorTransform(min_size, max_size, to_bgr255, pixel_mean, pixel_std)
+
+    # we are loading images with OpenCV, so we don't need to convert them
+    # to BGR, they are already! So all we need to do is to normalize
+    # by 255 if we want to convert to BGR255 format, or flip the channels
+    # if we want it to be in RGB in [0-1] range.
+    if to_bgr255:
+        to_bgr_transform = T.Lambda(lambda x: x * 255)
+    else:
+        to_bgr_transform = T.Lambda(lambda x: x[[2, 1, 0]])
+
+    normalize_transform = T.Normalize(mean=pixel_mean, std=pixel_std)
+
+    return T.Compose(
+        [
+            T.ToPILImage(),
+            Resize(min_size, max_size),
+            T.ToTensor(),
+            to_bgr_transform,
+            normalize_transform,
+        ]
+    )
+
+
+def info():
+    print("build_transform(min_size, max_size, to_bgr255, pixel_mean, pixel_std, tensor_transform=False) -> transform")
+    print("TensorTransform(min_size, max_size, to_bgr255, pixel_mean, pixel_std)(image) -> tensor")
+    print("Resize(min_size, max_size)(pil_image) -> pil_image")
+    exit()
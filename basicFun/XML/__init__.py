@@ -1,9 +1,18 @@
 import os
+import shutil
+import threading
 try: 
     import xml.etree.cElementTree as ET 
 except ImportError: 
     import xml.etree.ElementTree as ET  
-from bs4 import BeautifulSoup
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
+# read_objects/read_objects_exclude_minsize/read_boxes的解析后端
+# "etree"直接用ElementTree解析，解析失败(不规范的xml)时退回"bs4"
+# "bs4"为原来的BeautifulSoup+lxml html解析
+READ_BACKEND = "etree"
 def draw_xml(objs_s,tarXml):
     if len(objs_s)>0:
         tree = ET.ElementTree(file=tarXml)
@@ -64,62 +73,71 @@ def del_tag(root, nameList, tag="object"):
         if ob_name.text in nameList:
             root.remove(obj)
     return root
-def read_objects(path=None):
-    if path==None:
-        print("[ERROR ] Path is None!")
-        return []
-    objs=[]
+def tagName(node):
+    # 注释等节点的tag不是字符串
+    return node.tag.lower() if isinstance(node.tag,str) else None
+def read_tag_texts(path,tags,backend=None):
+    # 每个object下各tag第一次出现的文本，与BeautifulSoup的find_all(tag)[0].get_text()一致
+    backend=backend or READ_BACKEND
+    if backend=="etree":
+        try:
+            root=ET.parse(path).getroot()
+        except ET.ParseError:
+            return read_tag_texts(path,tags,"bs4")
+        # lxml的html解析器会把标签转成小写，这里同样忽略大小写，<Object>/<Name>也能读到
+        texts=[]
+        for m_object in root.iter():
+            if tagName(m_object)!='object':
+                continue
+            firsts={}
+            for node in m_object.iter():
+                firsts.setdefault(tagName(node),node)
+            row=[]
+            for tag in tags:
+                node=firsts.get(tag.lower())
+                if node is None:
+                    raise IndexError("list index out of range")
+                row.append("".join(node.itertext()))
+            texts.append(row)
+        return texts
+    texts=[]
     with open(path,'rb') as fr:
         all_txt=fr.read()
         soup=BeautifulSoup(all_txt,"lxml")
         m_objects=soup.find_all('object')
         for m_object in m_objects:
-            name=m_object.find_all("name")[0].get_text()
-            xmin=m_object.find_all("xmin")[0].get_text()
-            ymin=m_object.find_all("ymin")[0].get_text()
-            xmax=m_object.find_all("xmax")[0].get_text()
-            ymax=m_object.find_all("ymax")[0].get_text()
-            objs.append({"name":name,
-                "xmin":xmin,"ymin":ymin,"xmax":xmax,"ymax":ymax})
+            texts.append([m_object.find_all(tag)[0].get_text() for tag in tags])
+    return texts
+def read_objects(path=None,backend=None):
+    if path==None:
+        print("[ERROR ] Path is None!")
+        return []
+    objs=[]
+    for name,xmin,ymin,xmax,ymax in read_tag_texts(path,["name","xmin","ymin","xmax","ymax"],backend):
+        objs.append({"name":name,
+            "xmin":xmin,"ymin":ymin,"xmax":xmax,"ymax":ymax})
     return objs
-def read_objects_exclude_minsize(path=None):
+def read_objects_exclude_minsize(path=None,backend=None):
     if path==None:
         print("[ERROR ] Path is None!")
         return []
     objs=[]
-    with open(path,'rb') as fr:
-        all_txt=fr.read()
-        soup=BeautifulSoup(all_txt,"lxml")
-        m_objects=soup.find_all('object')
-        for m_object in m_objects:
-            name=m_object.find_all("name")[0].get_text()
-            xmin=m_object.find_all("xmin")[0].get_text()
-            ymin=m_object.find_all("ymin")[0].get_text()
-            xmax=m_object.find_all("xmax")[0].get_text()
-            ymax=m_object.find_all("ymax")[0].get_text()
-            width=abs(int(xmin)-int(xmax))
-            height=abs(int(ymin)-int(ymax))
-            if name in ['blue','yellow','red','gray','security','other']:
-                if height<100 and width<50:
-                    continue
-            objs.append({"name":name,
-                "xmin":xmin,"ymin":ymin,"xmax":xmax,"ymax":ymax})
+    for name,xmin,ymin,xmax,ymax in read_tag_texts(path,["name","xmin","ymin","xmax","ymax"],backend):
+        width=abs(int(xmin)-int(xmax))
+        height=abs(int(ymin)-int(ymax))
+        if name in ['blue','yellow','red','gray','security','other']:
+            if height<100 and width<50:
+                continue
+        objs.append({"name":name,
+            "xmin":xmin,"ymin":ymin,"xmax":xmax,"ymax":ymax})
     return objs
-def read_boxes(path=None):
+def read_boxes(path=None,backend=None):
     if path==None:
         print("[ERROR ] Path is None!")
         return []
     boxes=[]
-    with open(path,'rb') as fr:
-        all_txt=fr.read()
-        soup=BeautifulSoup(all_txt,"lxml")
-        m_objects=soup.find_all('object')
-        for m_object in m_objects:
-            xmin=m_object.find_all("xmin")[0].get_text()
-            ymin=m_object.find_all("ymin")[0].get_text()
-            xmax=m_object.find_all("xmax")[0].get_text()
-            ymax=m_object.find_all("ymax")[0].get_text()
-            boxes.append([float(int(xmin)),float(int(ymin)),float(int(xmax)),float(int(ymax)),1.0])
+    for xmin,ymin,xmax,ymax in read_tag_texts(path,["xmin","ymin","xmax","ymax"],backend):
+        boxes.append([float(int(xmin)),float(int(ymin)),float(int(xmax)),float(int(ymax)),1.0])
     return boxes
 def right_filename(root,filename,tag="filename"):
     for obj in root.findall(tag):
@@ -152,9 +170,25 @@ def thresh_size(root,width,sizeThreshDict,tag="object"):
 def write_xml(tree, out_path):
     tree.write(out_path, encoding="utf-8",xml_declaration=True)
     # print("write")
+def atomic_temp_path(out_path):
+    # 同目录下的隐藏临时文件，名字里不含".xml"，不会被按".xml" in x过滤的目录列表当成标注
+    dirName, baseName = os.path.split(out_path)
+    return os.path.join(dirName, ".%s.%d.%d.tmp" % (baseName.replace(".", "_"), os.getpid(), threading.get_ident()))
+def write_xml_atomic(tree, out_path):
+    # 先写到同目录下的临时文件再替换，中途出错或被打断时不会留下写了一半的xml；替换后保留原文件的权限位
+    tmp_path = atomic_temp_path(out_path)
+    try:
+        tree.write(tmp_path, encoding="utf-8",xml_declaration=True)
+        if os.path.exists(out_path):
+            shutil.copymode(out_path, tmp_path)
+        os.replace(tmp_path, out_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
 def info():
     print('add_tag(root,BBox=["name","xmin","xmax","ymin","ymax"],tag="object",insertPlace=6) -> ET.root')
     print('del_tag(root, nameList, tag="object") -> ET.root')
-    print("read_object(path=None) -> list=[name,xmin,xmax,ymin,ymax]")
+    print("read_object(path=None,backend=None) -> list=[name,xmin,xmax,ymin,ymax]")
     print("write_xml(tree, out_path) -> void")
+    print("write_xml_atomic(tree, out_path) -> void")
     exit()
@@ -13,6 +13,8 @@ import os
 import sys
 import time
 import numpy as np
+from basicFun import NMS
+from basicFun.PIPELINE import FramePipeline
 from caffe2.python import workspace
 from detectron.core.config import assert_and_infer_cfg
 from detectron.core.config import cfg
@@ -41,104 +43,31 @@ class modelTool:
         assert_and_infer_cfg()
         self.labelmap = labelmap
         self.model = infer_engine.initialize_model_from_cfg(wts_path)
-    def nms_exclusive_boxes(self,boxes,classes,exclusiveGroups,thresh,specialThresh):
-        def match_boxes(preBoxes,preClasses,thresh,specialThresh):
-            def get_iou(box1, box2):
-                """
-                :param box1:[x1,y1,x2,y2] 左上角的坐标与右下角的坐标
-                :param box2:[x1,y1,x2,y2]
-                :return: iou_ratio--交并比
-                """
-                # box1=[int(obj1['xmin']),int(obj1['ymin']),int(obj1['xmax']),int(obj1['ymax'])]
-                # box2=[int(obj2['xmin']),int(obj2['ymin']),int(obj2['xmax']),int(obj2['ymax'])]
-                width1 = abs(box1[2] - box1[0])
-                height1 = abs(box1[1] - box1[3])  # 这里y1-y2是因为一般情况y1>y2，为了方便采用绝对值
-                width2 = abs(box2[2] - box2[0])
-                height2 = abs(box2[1] - box2[3])
-                x_max = max(box1[0], box1[2], box2[0], box2[2])
-                y_max = max(box1[1], box1[3], box2[1], box2[3])
-                x_min = min(box1[0], box1[2], box2[0], box2[2])
-                y_min = min(box1[1], box1[3], box2[1], box2[3])
-                iou_width = x_min + width1 + width2 - x_max
-                iou_height = y_min + height1 + height2 - y_max
-                if iou_width <= 0 or iou_height <= 0:
-                    iou_ratio = 0
-                else:
-                    iou_area = iou_width * iou_height  # 交集的面积
-                    box1_area = width1 * height1
-                    box2_area = width2 * height2
-                    iou_ratio = iou_area / (box1_area + box2_area - iou_area)  # 并集的面积
-                return iou_ratio
-            postBoxes=[]
-            postClasses=[]
-            usedBoxes=[]
-            for i, preBox in enumerate(preBoxes):
-                used=0
-                for usedBox in usedBoxes:
-                    if all(preBox==usedBox):
-                        used=1
-                if used==0:
-                    usedBoxes.append(preBox)
-                    matchBox=preBox
-                    matchClass=preClasses[i]
-                    maxMatchScore=preBox[4]
-                    matchScore=preBox[4]
-                    for p, pBox in enumerate(preBoxes[i+1:]):
-                        pused=0
-                        for usedBox in usedBoxes:
-                            if all(pBox==usedBox):
-                                pused=1
-                        if pused==0:
-                            boxIou=get_iou(preBox[:4],pBox[:4])
-                            if boxIou>0.7:
-                                usedBoxes.append(pBox)
-                                matchScore+=pBox[4]
-                                if pBox[4]>maxMatchScore:
-                                    maxMatchScore=pBox[4]
-                                    matchBox=pBox
-                                    matchClass=preClasses[p+i+1]
-                    matchBox[4]=min(matchScore,1.0)
-                    if self.labelmap[matchClass] in specialThresh.keys():
-                        cthresh=specialThresh[self.labelmap[matchClass]]
-                    else:
-                        cthresh=thresh
-                    if matchBox[4]>cthresh:
-                        postBoxes.append(matchBox)
-                        postClasses.append(matchClass)
-            return postBoxes,postClasses
-        preBoxes=[]
-        preClasses=[]
-        try:
-            for i, c in enumerate(classes):
-                for exclusiveGroup in exclusiveGroups:
-                    if self.labelmap[c] in specialThresh.keys():
-                        cthresh=specialThresh[self.labelmap[c]]
-                    else:
-                        cthresh=thresh
-                    if self.labelmap[c] in exclusiveGroup:
-                        shareThresh=cthresh/len(exclusiveGroup)
-                        if boxes[i][4]>shareThresh:
-                            preBoxes.append(boxes[i])
-                            preClasses.append(c)
-                        break
-                if boxes[i][4]>cthresh:
-                    preBoxes.append(boxes[i])
-                    preClasses.append(c)
-        except:
-            pass
-        postBoxes,postClasses=match_boxes(preBoxes,preClasses,thresh,specialThresh)
-        return postBoxes,postClasses
+    # 互斥组合并，engine='numpy'为向量化实现，engine='loop'为原逐对循环实现
+    def nms_exclusive_boxes(self,boxes,classes,exclusiveGroups,thresh,specialThresh,engine='numpy'):
+        return NMS.nms_exclusive_boxes(boxes,classes,self.labelmap,exclusiveGroups,thresh,specialThresh,engine)
     # 功能：输入一张opencv读取的图片，通过模型返回相应的结果
     # 输入：
     # image为cv读取的图片
     # thresh为置信的阈值
     # 返回值：满足大于阈值的labels、xmin、ymin、xmax、ymax的list（其中坐标且为相对值）
     def getInfoByModel(self,image,thresh=0.7):
+        return self.getInfoByDetection(image,self.detect(image),thresh)
+    # 功能：输入图片路径或opencv图片的可迭代对象，解码、推理、后处理三段并行
+    # workers为解码线程数，queue_size为每段队列长度，cache为True时图片路径经IMGCACHE共享缓存解码
+    # 返回值：生成器，按输入顺序返回getInfoByModel的结果，各阶段耗时见self.pipeline.summary()
+    def getInfoByModelPipeline(self,inputs,thresh=0.7,workers=4,queue_size=8,cache=False):
+        self.pipeline=FramePipeline(self.detect,None,lambda image,detection:self.getInfoByDetection(image,detection,thresh),workers,queue_size,cache)
+        return self.pipeline.run(inputs)
+    def detect(self,image):
         timers = defaultdict(Timer)
         with c2_utils.NamedCudaScope(0):
             cls_boxes, cls_segms, cls_keyps = infer_engine.im_detect_all(
             self.model, image, None, timers=timers
-            )    
+            )
+        return cls_boxes, cls_segms, cls_keyps
+    def getInfoByDetection(self,image,detection,thresh=0.7):
+        cls_boxes, cls_segms, cls_keyps = detection
         totalboxes, segms, keypoints, classes = vis_utils.convert_from_cls_format(cls_boxes, cls_segms, cls_keyps)
         exclusiveGroups=[['truck','car','tanker','bus','motorcycle'],['blue','yellow','red','gray','security','other']]
         specialThresh = {'tube':0.6,'def':0.6}
@@ -2,6 +2,8 @@
 from .predictor import MBModel
 from maskrcnn_benchmark.config import cfg
 import numpy as np
+from basicFun import NMS
+from basicFun.PIPELINE import FramePipeline
 
 class modelTool:
 
@@ -9,10 +11,11 @@ class modelTool:
     # initModel用于初始化模型
     # cfg_path是model_config.yaml的路径
     # wts_path是模型.pth存放的路径
-    def initModel(self, cfg_path, wts_path, labelmap=None):
+    # tensor_transform为True时预处理直接在numpy/torch上完成，不经过PIL
+    def initModel(self, cfg_path, wts_path, labelmap=None, tensor_transform=False):
         cfg.merge_from_file(cfg_path)
         cfg.merge_from_list(["MODEL.WEIGHT", wts_path])
-        model = MBModel(cfg)
+        model = MBModel(cfg, tensor_transform=tensor_transform)
         if labelmap is not None:
             assert isinstance(labelmap, dict)
             # assert len(labelmap) >= cfg.MODEL.ROI_BOX_HEAD.NUM_CLASSES - 1,
@@ -21,95 +24,28 @@ class modelTool:
         else:
             model.set_categories(None)
         self.model = model
-    def nms_exclusive_boxes(self,boxes,classes,exclusiveGroups,thresh,specialThresh):
-        def match_boxes(preBoxes,preClasses,thresh,specialThresh):
-            def get_iou(box1, box2):
-                """
-                :param box1:[x1,y1,x2,y2] 左上角的坐标与右下角的坐标
-                :param box2:[x1,y1,x2,y2]
-                :return: iou_ratio--交并比
-                """
-                # box1=[int(obj1['xmin']),int(obj1['ymin']),int(obj1['xmax']),int(obj1['ymax'])]
-                # box2=[int(obj2['xmin']),int(obj2['ymin']),int(obj2['xmax']),int(obj2['ymax'])]
-                width1 = abs(box1[2] - box1[0])
-                height1 = abs(box1[1] - box1[3])  # 这里y1-y2是因为一般情况y1>y2，为了方便采用绝对值
-                width2 = abs(box2[2] - box2[0])
-                height2 = abs(box2[1] - box2[3])
-                x_max = max(box1[0], box1[2], box2[0], box2[2])
-                y_max = max(box1[1], box1[3], box2[1], box2[3])
-                x_min = min(box1[0], box1[2], box2[0], box2[2])
-                y_min = min(box1[1], box1[3], box2[1], box2[3])
-                iou_width = x_min + width1 + width2 - x_max
-                iou_height = y_min + height1 + height2 - y_max
-                if iou_width <= 0 or iou_height <= 0:
-                    iou_ratio = 0
-                else:
-                    iou_area = iou_width * iou_height  # 交集的面积
-                    box1_area = width1 * height1
-                    box2_area = width2 * height2
-                    iou_ratio = iou_area / (box1_area + box2_area - iou_area)  # 并集的面积
-                return iou_ratio
-            postBoxes=[]
-            postClasses=[]
-            usedBoxes=[]
-            for i, preBox in enumerate(preBoxes):
-                used=0
-                for usedBox in usedBoxes:
-                    if all(preBox==usedBox):
-                        used=1
-                if used==0:
-                    usedBoxes.append(preBox)
-                    matchBox=preBox
-                    matchClass=preClasses[i]
-                    maxMatchScore=preBox[4]
-                    matchScore=preBox[4]
-                    for p, pBox in enumerate(preBoxes[i+1:]):
-                        pused=0
-                        for usedBox in usedBoxes:
-                            if all(pBox==usedBox):
-                                pused=1
-                        if pused==0:
-                            boxIou=get_iou(preBox[:4],pBox[:4])
-                            if boxIou>0.7:
-                                usedBoxes.append(pBox)
-                                matchScore+=pBox[4]
-                                if pBox[4]>maxMatchScore:
-                                    maxMatchScore=pBox[4]
-                                    matchBox=pBox
-                                    matchClass=preClasses[p+i+1]
-                    matchBox[4]=min(matchScore,1.0)
-                    if self.model.CATEGORIES[matchClass] in specialThresh.keys():
-                        cthresh=specialThresh[self.model.CATEGORIES[matchClass]]
-                    else:
-                        cthresh=thresh
-                    if matchBox[4]>cthresh:
-                        postBoxes.append(matchBox)
-                        postClasses.append(matchClass)
-            return postBoxes,postClasses
-        preBoxes=[]
-        preClasses=[]
-        try:
-            for i, c in enumerate(classes):
-                for exclusiveGroup in exclusiveGroups:
-                    if self.model.CATEGORIES[c] in specialThresh.keys():
-                        cthresh=specialThresh[self.model.CATEGORIES[c]]
-                    else:
-                        cthresh=thresh
-                    if self.model.CATEGORIES[c] in exclusiveGroup:
-                        shareThresh=cthresh/len(exclusiveGroup)
-                        if boxes[i][4]>shareThresh:
-                            preBoxes.append(boxes[i])
-                            preClasses.append(c)
-                        break
-                if boxes[i][4]>cthresh:
-                    preBoxes.append(boxes[i])
-                    preClasses.append(c)
-        except:
-            pass
-        postBoxes,postClasses=match_boxes(preBoxes,preClasses,thresh,specialThresh)
-        return postBoxes,postClasses
+    # 互斥组合并，engine='numpy'为向量化实现，engine='loop'为原逐对循环实现
+    def nms_exclusive_boxes(self,boxes,classes,exclusiveGroups,thresh,specialThresh,engine='numpy'):
+        return NMS.nms_exclusive_boxes(boxes,classes,self.model.CATEGORIES,exclusiveGroups,thresh,specialThresh,engine)
     def getInfoByModel(self, image, thresh=0.7):
         predictions = self.model.compute_prediction(image)
+        return self.getInfoByPrediction(predictions, thresh)
+    # 功能：输入一组opencv读取的图片，按batch_size分批送入模型
+    # 返回值：与输入图片一一对应的getInfoByModel结果list
+    def getInfoByModelBatch(self, images, thresh=0.7, batch_size=8):
+        predictions = self.model.compute_predictions(images, batch_size=batch_size)
+        return [self.getInfoByPrediction(prediction, thresh) for prediction in predictions]
+    # 功能：输入图片路径或opencv图片的可迭代对象，解码/预处理、推理、后处理三段并行
+    # workers为解码/预处理线程数，queue_size为每段队列长度，cache为True时图片路径经IMGCACHE共享缓存解码
+    # 返回值：生成器，按输入顺序返回getInfoByModel的结果，各阶段耗时见self.pipeline.summary()
+    def getInfoByModelPipeline(self, inputs, thresh=0.7, workers=4, queue_size=8, cache=False):
+        self.pipeline = FramePipeline(
+            lambda image: self.model.predict([image])[0],
+            self.model.transforms,
+            lambda image, predictions: self.getInfoByPrediction(predictions, thresh),
+            workers, queue_size, cache)
+        return self.pipeline.run(inputs)
+    def getInfoByPrediction(self, predictions, thresh=0.7):
         top_predictions=predictions
         normalized_top_predictions = top_predictions.resize((1, 1))
         top_scores = normalized_top_predictions.get_field('scores').numpy()
@@ -1,6 +1,4 @@
 import torch
-from torchvision import transforms as T
-from torchvision.transforms import functional as F
 # from maskrcnn_benchmark.data.transforms import transforms as MBT
 
 from maskrcnn_benchmark.modeling.detector import build_detection_model
@@ -8,41 +6,7 @@ from maskrcnn_benchmark.utils.checkpoint import DetectronCheckpointer
 from maskrcnn_benchmark.structures.image_list import to_image_list
 from maskrcnn_benchmark.modeling.roi_heads.mask_head.inference import Masker
 
-
-class Resize(object):
-    def __init__(self, min_size, max_size):
-        # if not isinstance(min_size, (list, tuple)):
-        #     min_size = (min_size,)
-        self.min_size = min_size
-        self.max_size = max_size
-
-    # modified from torchvision to add support for max size
-    def get_size(self, image_size):
-        w, h = image_size
-        size = self.min_size
-        max_size = self.max_size
-        if max_size is not None:
-            min_original_size = float(min((w, h)))
-            max_original_size = float(max((w, h)))
-            if max_original_size / min_original_size * size > max_size:
-                size = int(round(max_size * min_original_size / max_original_size))
-
-        if (w <= h and w == size) or (h <= w and h == size):
-            return (h, w)
-
-        if w < h:
-            ow = size
-            oh = int(size * h / w)
-        else:
-            oh = size
-            ow = int(size * w / h)
-
-        return (oh, ow)
-
-    def __call__(self, image):
-        size = self.get_size(image.size)
-        image = F.resize(image, size)
-        return image
+from basicFun.TRANSFORMS import Resize, TensorTransform, build_transform
 
 
 class MBModel(object):
@@ -133,6 +97,7 @@ class MBModel(object):
     def __init__(
             self,
             cfg,
+            tensor_transform=False,
             # show_mask_heatmaps=False,
             # masks_per_dim=2,
     ):
@@ -143,6 +108,7 @@ class MBModel(object):
         self.model.to(self.device)
         self.min_image_size = cfg.INPUT.MIN_SIZE_TEST
         self.max_image_size = cfg.INPUT.MAX_SIZE_TEST
+        self.tensor_transform = tensor_transform
 
         save_dir = cfg.OUTPUT_DIR
         checkpointer = DetectronCheckpointer(cfg, self.model, save_dir=save_dir)
@@ -166,33 +132,15 @@ class MBModel(object):
 
     def build_transform(self):
         """
-        Creates a basic transformation that was used to train the models
+        Creates a basic transformation that was used to train the models.
+        With `tensor_transform` the same steps run on the numpy buffer
+        without the PIL round-trip
         """
         cfg = self.cfg
-
-        # we are loading images with OpenCV, so we don't need to convert them
-        # to BGR, they are already! So all we need to do is to normalize
-        # by 255 if we want to convert to BGR255 format, or flip the channels
-        # if we want it to be in RGB in [0-1] range.
-        if cfg.INPUT.TO_BGR255:
-            to_bgr_transform = T.Lambda(lambda x: x * 255)
-        else:
-            to_bgr_transform = T.Lambda(lambda x: x[[2, 1, 0]])
-
-        normalize_transform = T.Normalize(
-            mean=cfg.INPUT.PIXEL_MEAN, std=cfg.INPUT.PIXEL_STD
-        )
-
-        transform = T.Compose(
-            [
-                T.ToPILImage(),
-                Resize(self.min_image_size, self.max_image_size),
-                T.ToTensor(),
-                to_bgr_transform,
-                normalize_transform,
-            ]
+        return build_transform(
+            self.min_image_size, self.max_image_size, cfg.INPUT.TO_BGR255,
+            cfg.INPUT.PIXEL_MEAN, cfg.INPUT.PIXEL_STD, self.tensor_transform
         )
-        return transform
 
     def compute_prediction(self, original_image, bbox_in_image_size=False):
         """
@@ -219,6 +167,47 @@ class MBModel(object):
 
         return prediction
 
+    def compute_predictions(self, original_images, batch_size=8, bbox_in_image_size=False):
+        """
+        Arguments:
+            original_images (list[np.ndarray]): images as returned by OpenCV
+            batch_size (int): number of images sent to the model per forward pass
+
+        Returns:
+            predictions (list[BoxList]): one BoxList per input image, in the
+                same order as `original_images`. Images of one batch are padded
+                to a common size by `to_image_list`, so keyframes of the same
+                resolution give the same result as `compute_prediction`
+        """
+        predictions = []
+        for start in range(0, len(original_images), batch_size):
+            batch = original_images[start:start + batch_size]
+            images = [self.transforms(original_image) for original_image in batch]
+            batch_predictions = self.predict(images)
+
+            # reshape each prediction (a BoxList) into its original image size
+            if bbox_in_image_size:
+                for i, original_image in enumerate(batch):
+                    height, width = original_image.shape[:-1]
+                    batch_predictions[i] = batch_predictions[i].resize((width, height))
+            predictions.extend(batch_predictions)
+
+        return predictions
+
+    def predict(self, images):
+        """
+        Arguments:
+            images (list[Tensor]): images already passed through `self.transforms`
+
+        Returns:
+            predictions (list[BoxList]): one BoxList per image, on the cpu
+        """
+        image_list = to_image_list(images, self.cfg.DATALOADER.SIZE_DIVISIBILITY)
+        image_list = image_list.to(self.device)
+        with torch.no_grad():
+            predictions = self.model(image_list)
+        return [o.to(self.cpu_device) for o in predictions]
+
     def select_top_predictions(self, predictions, confidence_threshold=0.7):
         """
         Select only predictions which have a `score` > self.confidence_threshold,
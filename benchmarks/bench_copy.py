@@ -0,0 +1,65 @@
+#encoding=utf-8
+""" serial shutil.copyfile against basicFun.COPY.CopyEngine, first run, unchanged rerun and the link modes,
+    run from the repo root:
+
+    python -m benchmarks.bench_copy
+"""
+import os
+import shutil
+import tempfile
+import time
+
+from basicFun import COPY
+from tests.synthetic import make_files
+
+def same_content(pairs):
+    for src, dst in pairs:
+        with open(src, 'rb') as fsrc, open(dst, 'rb') as fdst:
+            if fsrc.read() != fdst.read():
+                return False
+    return True
+
+def benchmark(file_count=2000, file_size=256 * 1024, workers=(1, 8), base_dir=None, modes=('hardlink', 'reflink', 'symlink')):
+    """ MB/s of every run, every copied or linked file is compared with its source
+
+        :param base_dir: [optional] parent of the work folder, tmpfs (/dev/shm) by default
+    """
+    base_dir = base_dir or ('/dev/shm' if os.path.isdir('/dev/shm') else None)
+    work_dir = tempfile.mkdtemp(dir=base_dir)
+    try:
+        src_dir = os.path.join(work_dir, 'src')
+        make_files(src_dir, file_count, file_size)
+        names = sorted(os.listdir(src_dir))
+        total_mb = file_count * file_size / 1024.0 / 1024.0
+        tar_dir = os.path.join(work_dir, 'serial')
+        os.makedirs(tar_dir)
+        start = time.time()
+        for name in names:
+            shutil.copyfile(os.path.join(src_dir, name), os.path.join(tar_dir, name))
+        cost = time.time() - start
+        print('shutil.copyfile serial: %.2f sec  %.1f MB/s' % (cost, total_mb / cost))
+        same = True
+        for worker in workers:
+            tar_dir = os.path.join(work_dir, 'engine%d' % worker)
+            os.makedirs(tar_dir)
+            pairs = [(os.path.join(src_dir, name), os.path.join(tar_dir, name)) for name in names]
+            for run in ['first', 'again']:
+                engine = COPY.copy_pairs(pairs, workers=worker, progress=False)
+                print('CopyEngine workers %2d %-5s: %.2f sec  %s' % (worker, run, engine.stats['time'], engine.summary()))
+            worker_same = same_content(pairs) and engine.stats['skipped'] == file_count
+            same = same and worker_same
+            print('CopyEngine workers %2d same=%s' % (worker, worker_same))
+        for mode in modes:
+            tar_dir = os.path.join(work_dir, mode)
+            os.makedirs(tar_dir)
+            pairs = [(os.path.join(src_dir, name), os.path.join(tar_dir, name)) for name in names]
+            engine = COPY.copy_pairs(pairs, workers=max(workers), progress=False, mode=mode, manifest=tar_dir + '.csv')
+            mode_same = same_content(pairs)
+            same = same and mode_same
+            print('CopyEngine %-8s: %.2f sec  %s  same=%s' % (mode, engine.stats['time'], engine.summary(), mode_same))
+        return same
+    finally:
+        shutil.rmtree(work_dir)
+
+if __name__ == "__main__":
+    benchmark()
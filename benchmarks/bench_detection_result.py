@@ -0,0 +1,51 @@
+#encoding=utf-8
+""" parse time of a detection result txt against opening the Detection_Result binary file, run from the repo root:
+
+    python -m benchmarks.bench_detection_result <txt file>
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+from Detection_Result import Detection_Result
+from file_util import read_detection_result_from_txt
+from tests.synthetic import make_detection_txt
+
+def benchmark(txt_file, box_count=10000000, boxes_per_frame=20, lookups=10000):
+    """ parse time of the txt against opening the binary file, and random frame latency,
+        every looked up frame is compared with the txt
+
+        :param txt_file: detection result txt, generated when it does not exist
+    """
+    if not os.path.exists(txt_file):
+        start = time.time()
+        make_detection_txt(txt_file, box_count, boxes_per_frame)
+        print('generate %d boxes: %.2f sec' % (box_count, time.time() - start))
+    bin_file = os.path.splitext(txt_file)[0] + '.det'
+    start = time.time()
+    legacy = read_detection_result_from_txt(txt_file)
+    print('read_detection_result_from_txt: %.2f sec' % (time.time() - start))
+    start = time.time()
+    result = Detection_Result.from_txt(txt_file)
+    print('txt -> arrays: %.2f sec' % (time.time() - start))
+    result.save(bin_file)
+    start = time.time()
+    result = Detection_Result.open(bin_file)
+    print('open binary: %.4f sec, %d frames, %d boxes, %.1f MB' % (
+        time.time() - start, len(result), len(result.boxes), os.path.getsize(bin_file) / 1024.0 / 1024.0))
+    indexes = np.random.RandomState(1).randint(0, len(result), lookups)
+    start = time.time()
+    for i in indexes:
+        result[i]
+    print('random frame: %.4f ms per lookup' % ((time.time() - start) / lookups * 1000))
+    same = len(result) == len(legacy) and all(result.frame_fields(i) == legacy[i] for i in indexes)
+    del legacy
+    start = time.time()
+    high = int((result.scores > 0.5).sum())
+    print('full scan of the scores: %.4f sec (%d boxes above 0.5)  same=%s' % (time.time() - start, high, same))
+    return same
+
+if __name__ == "__main__":
+    benchmark(sys.argv[1])
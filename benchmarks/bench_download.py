@@ -0,0 +1,66 @@
+#encoding=utf-8
+""" serial urllib.request.urlopen against basicFun.DOWNLOAD.Downloader on a local fake image server,
+    run from the repo root:
+
+    python -m benchmarks.bench_download
+"""
+import os
+import shutil
+import tempfile
+import time
+import urllib.request
+
+from basicFun.DOWNLOAD import Downloader
+from tests.fake_image_server import FakeImageServer
+
+def benchmark(save_dir, image_count=300, workers=(1, 8), delay=0.02, image_size=20000):
+    """ images/sec of every run, the saved files are compared with the served images
+
+        :param save_dir: folder the images are saved to, cleared before every run
+        :param delay: simulated network latency of every request (sec)
+    """
+    if not os.path.exists(save_dir):
+        os.makedirs(save_dir)
+    server = FakeImageServer(image_count=image_count, image_size=image_size, duplicate_every=0, delay=delay).start()
+    try:
+        urls = ['%s/img/%d.jpg' % (server.url, i) for i in range(image_count)]
+        paths = [os.path.join(save_dir, '%06d.jpg' % i) for i in range(image_count)]
+        def clear():
+            for name in os.listdir(save_dir):
+                os.remove(os.path.join(save_dir, name))
+        def saved():
+            contents = []
+            for i, path in enumerate(paths):
+                with open(path, 'rb') as f:
+                    contents.append(f.read() == server.image(i))
+            return all(contents)
+        clear()
+        start = time.time()
+        for url, path in zip(urls, paths):
+            with open(path, 'wb') as f:
+                f.write(urllib.request.urlopen(url).read())
+        cost = time.time() - start
+        same = saved()
+        print('urlopen serial:       %7.1f images/sec  same=%s' % (image_count / cost, same))
+        for worker in workers:
+            clear()
+            downloader = Downloader(workers=worker, per_host=worker, dedupe=False)
+            start = time.time()
+            results = downloader.download_all(list(zip(urls, paths)))
+            cost = time.time() - start
+            downloader.close()
+            worker_same = results == paths and saved()
+            same = same and worker_same
+            print('Downloader workers %2d: %7.1f images/sec  %6.1f MB/s  %s  same=%s' % (
+                worker, image_count / cost, downloader.stats['bytes'] / cost / 1024.0 / 1024.0, downloader.summary(), worker_same))
+        clear()
+        return same
+    finally:
+        server.stop()
+
+if __name__ == "__main__":
+    save_dir = tempfile.mkdtemp()
+    try:
+        benchmark(save_dir)
+    finally:
+        shutil.rmtree(save_dir)
@@ -0,0 +1,58 @@
+#encoding=utf-8
+""" memory and latency of read_detection_result_from_txt against the lazy and indexed readers of file_util,
+    run from the repo root:
+
+    python -m benchmarks.bench_file_util <txt file>
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from file_util import read_detection_result_from_txt, iter_detection_results, DetectionResultReader
+from tests.synthetic import make_detection_txt
+
+def benchmark_detection_reader(target_file, frame_count=20000, box_count=20, lookups=1000):
+    """ memory and latency of read_detection_result_from_txt against the lazy and indexed readers
+    
+    Args:
+        target_file (str): txt file, generated when it does not exist
+        frame_count (int): number of lines of the generated file
+        box_count (int): number of boxes per line of the generated file
+        lookups (int): number of random frames fetched, every one is compared with the full read
+    """
+    if not os.path.exists(target_file):
+        make_detection_txt(target_file, frame_count * box_count, box_count, labels=('face',))
+    index_file = target_file + ".idx.npy"
+    for name, func in [("read_detection_result_from_txt", lambda: read_detection_result_from_txt(target_file)),
+                       ("iter_detection_results", lambda: sum(len(frame[0]) for frame in iter_detection_results(target_file))),
+                       ("DetectionResultReader cold", lambda: DetectionResultReader(target_file)),
+                       ("DetectionResultReader warm", lambda: DetectionResultReader(target_file))]:
+        # timed first, then run again under tracemalloc which slows it down
+        costs = []
+        for traced in [False, True]:
+            if name.endswith("cold") and os.path.exists(index_file):
+                os.remove(index_file)
+            if traced:
+                tracemalloc.start()
+            start = time.time()
+            result = func()
+            costs.append(time.time() - start)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print("{:32s} {:8.3f} sec  peak {:8.1f} MB".format(name, costs[0], peak / 1024.0 / 1024.0))
+    reader = result
+    legacy = read_detection_result_from_txt(target_file)
+    indexes = np.random.RandomState(1).randint(0, len(reader), lookups)
+    start = time.time()
+    frames = [reader[i] for i in indexes]
+    cost = time.time() - start
+    fields_reader = DetectionResultReader(target_file, typed=False)
+    same = len(reader) == len(legacy) and all(fields_reader[i] == legacy[i] for i in indexes)
+    print("random frame: {:.3f} ms per lookup  same={}".format(cost / lookups * 1000, same))
+    return same
+
+if __name__ == "__main__":
+    benchmark_detection_reader(sys.argv[1])
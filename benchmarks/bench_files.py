@@ -0,0 +1,58 @@
+#encoding=utf-8
+""" the original listdir + isdir/isfile walk against basicFun.FILES.scan_entries on a synthetic tree,
+    run from the repo root:
+
+    python -m benchmarks.bench_files
+"""
+import os
+import shutil
+import tempfile
+import time
+
+from basicFun import FILES
+from tests.reference import list_all_files_listdir
+from tests.synthetic import make_tree
+
+def benchmark(root_dir, file_count=1000000, files_per_dir=1000, workers=(1, 8)):
+    """ seconds of every walk, every listing is compared with the original implementation
+
+        :param root_dir: empty folder, a tree generated by an earlier run is reused
+    """
+    if not os.listdir(root_dir):
+        start = time.time()
+        make_tree(root_dir, file_count, files_per_dir)
+        print('make_tree %d files: %.2f sec' % (file_count, time.time() - start))
+    start = time.time()
+    reference = list_all_files_listdir(root_dir)
+    print('listdir + isdir/isfile: %.2f sec  %d files' % (time.time() - start, len(reference)))
+    same = True
+    for worker in workers:
+        start = time.time()
+        files = FILES.list_all_files(root_dir, workers=worker)
+        same = same and files == reference
+        print('scandir workers %2d:     %.2f sec  same=%s' % (worker, time.time() - start, files == reference))
+    start = time.time()
+    jpgs = FILES.list_all_filePaths(root_dir, suffixes=('.jpg',))
+    cost = time.time() - start
+    jpg_same = [os.path.basename(path) for path in jpgs] == [name for name in reference if name.endswith('.jpg')]
+    same = same and jpg_same
+    print('scandir .jpg paths:     %.2f sec  %d files  same=%s' % (cost, len(jpgs), jpg_same))
+    sub_dir = os.path.join(root_dir, sorted(FILES.get_sub_dirs(root_dir))[0])
+    start = time.time()
+    for i in range(100):
+        walked = next(os.walk(sub_dir))
+    walk_cost = time.time() - start
+    start = time.time()
+    for i in range(100):
+        level = FILES.first_level(sub_dir)
+    level_same = (walked[1], walked[2]) == level
+    same = same and level_same
+    print('first level x100: os.walk %.3f sec  scandir %.3f sec  same=%s' % (walk_cost, time.time() - start, level_same))
+    return same
+
+if __name__ == "__main__":
+    root_dir = tempfile.mkdtemp()
+    try:
+        benchmark(root_dir, file_count=100000)
+    finally:
+        shutil.rmtree(root_dir)
@@ -0,0 +1,88 @@
+#encoding=utf-8
+""" basicFun.IMG features against the original per-pixel implementations, run from the repo root:
+
+    python -m benchmarks.bench_img
+"""
+import shutil
+import tempfile
+import time
+import numpy as np
+
+from basicFun import IMG
+from tests.synthetic import make_roi_frames
+from tests.reference import get_LBP_featrue_loop, gray2array_ave_loop, gray2array_raw_loop
+
+def benchmark_LBP(count=100, size=(64, 128)):
+    """ ms per random crop (size is width, height) of the loop, vectorized and batch LBP, every crop is compared """
+    rng = np.random.RandomState(0)
+    crops = rng.randint(0, 256, (count, size[1], size[0], 3)).astype(np.uint8)
+    start = time.time()
+    loop_featrues = [get_LBP_featrue_loop(crop) for crop in crops]
+    loop_cost = (time.time() - start) / count
+    start = time.time()
+    featrues = [IMG.get_LBP_featrue(crop) for crop in crops]
+    cost = (time.time() - start) / count
+    start = time.time()
+    batch_featrues = IMG.get_LBP_featrue_batch(crops)
+    batch_cost = (time.time() - start) / count
+    same = all(np.array_equal(a, b) for a, b in zip(loop_featrues, featrues)) and np.array_equal(np.stack(featrues), batch_featrues)
+    print("loop %.3f ms  vectorized %.3f ms  batch %.3f ms per crop  same=%s" % (loop_cost * 1000, cost * 1000, batch_cost * 1000, same))
+    return same
+
+def benchmark_cos(count=64, size=(64, 64)):
+    """ loop against vectorized gray2array_ave/gray2array_raw on random gray images (size is width, height),
+        and pairwise cos against cos_matrix, every image and every pair is compared
+    """
+    rng = np.random.RandomState(0)
+    grays = rng.randint(0, 256, (count, size[1], size[0])).astype(np.uint8)
+    start = time.time()
+    loop_arrays = [gray2array_ave_loop(gray) for gray in grays]
+    loop_cost = (time.time() - start) / count
+    start = time.time()
+    arrays = [IMG.gray2array_ave(gray) for gray in grays]
+    cost = (time.time() - start) / count
+    same = all(np.array_equal(a, b) for a, b in zip(loop_arrays, arrays))
+    same = same and all(np.array_equal(gray2array_raw_loop(gray), IMG.gray2array_raw(gray)) for gray in grays)
+    start = time.time()
+    pair_values = np.array([[IMG.cos(a, b) for b in arrays] for a in arrays])
+    pair_cost = time.time() - start
+    start = time.time()
+    matrix_values = IMG.cos_matrix(grays, grays)
+    matrix_cost = time.time() - start
+    print("gray2array_ave: loop %.3f ms  vectorized %.3f ms per image  same=%s" % (loop_cost * 1000, cost * 1000, same))
+    print("%dx%d cos: pairwise %.3f ms  cos_matrix %.3f ms  max diff %.2e" % (
+        count, count, pair_cost * 1000, matrix_cost * 1000, np.abs(pair_values - matrix_values).max()))
+    return same
+
+def benchmark_roi_cos(frame_count=20, box_count=10, workers=4, pair_limit=200):
+    """ all boxes of neighbouring frames compared pairwise, img_cos_for_labels against RoiCosEngine in pairs per second
+
+        :param pair_limit: number of pairs run through img_cos_for_labels, the engine compares them all
+    """
+    frame_dir = tempfile.mkdtemp()
+    try:
+        frames = make_roi_frames(frame_dir, frame_count, box_count)
+        pairs = [(frames[i - 1][0], frames[i][0], a, b) for i in range(1, len(frames)) for a in frames[i - 1][1] for b in frames[i][1]]
+        start = time.time()
+        pair_values = [IMG.img_cos_for_labels(*pair) for pair in pairs[:pair_limit]]
+        pair_cost = time.time() - start
+        engine = IMG.RoiCosEngine(workers=workers)
+        start = time.time()
+        matrices = engine.similarity_sequence(frames)
+        cold_cost = time.time() - start
+        start = time.time()
+        engine.similarity_sequence(frames)
+        warm_cost = time.time() - start
+        engine_values = np.concatenate([m.reshape(-1) for m in matrices])[:len(pair_values)]
+        diff = np.abs(np.array(pair_values) - engine_values).max()
+        print("img_cos_for_labels: %8.0f pairs/sec (%d pairs)" % (len(pair_values) / pair_cost, len(pair_values)))
+        print("RoiCosEngine cold:  %8.0f pairs/sec (%d pairs)" % (len(pairs) / cold_cost, len(pairs)))
+        print("RoiCosEngine warm:  %8.0f pairs/sec  max diff %.2e" % (len(pairs) / max(warm_cost, 1e-9), diff))
+        return diff
+    finally:
+        shutil.rmtree(frame_dir)
+
+if __name__ == "__main__":
+    benchmark_LBP()
+    benchmark_cos()
+    benchmark_roi_cos()
@@ -0,0 +1,48 @@
+#encoding=utf-8
+""" repeated cut_roi_for_labels with and without basicFun.IMGCACHE, and get_shape from the header against a full decode,
+    run from the repo root:
+
+    python -m benchmarks.bench_imgcache
+"""
+import shutil
+import tempfile
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from basicFun import IMG
+from basicFun import IMGCACHE
+from tests.synthetic import make_images
+
+def benchmark(count=20, repeat=3, size=(1920, 1080)):
+    """ ms per image on synthetic jpgs, every crop and every shape is compared """
+    image_dir = tempfile.mkdtemp()
+    try:
+        paths = make_images(image_dir, count, size)
+        roi = (100, 100, 300, 400)
+        cache = IMGCACHE.ImageCache()
+        costs = {}
+        crops = {}
+        for name, option in [('no cache', False), ('cache', cache)]:
+            start = time.time()
+            for r in range(repeat):
+                crops[name] = [np.asarray(IMG.cut_roi_for_labels(path, roi, cache=option)) for path in paths]
+            costs[name] = (time.time() - start) / (count * repeat)
+        same_crops = all(np.array_equal(a, b) for a, b in zip(crops['no cache'], crops['cache']))
+        start = time.time()
+        decoded = [cv2.cvtColor(np.array(Image.open(path)), cv2.COLOR_BGR2GRAY).shape for path in paths]
+        decode_cost = (time.time() - start) / count
+        start = time.time()
+        shapes = [IMG.get_shape(path) for path in paths]
+        header_cost = (time.time() - start) / count
+        print('cut_roi_for_labels x%d: no cache %.2f ms  cache %.2f ms per image  same=%s' % (
+            repeat, costs['no cache'] * 1000, costs['cache'] * 1000, same_crops))
+        print('get_shape: decode %.3f ms  header %.3f ms per image  same=%s' % (decode_cost * 1000, header_cost * 1000, decoded == shapes))
+        print(cache.summary())
+    finally:
+        shutil.rmtree(image_dir)
+
+if __name__ == "__main__":
+    benchmark()
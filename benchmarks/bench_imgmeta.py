@@ -0,0 +1,50 @@
+#encoding=utf-8
+""" full decode, PIL header and basicFun.IMGMETA header parsing per image, and scan_dir throughput,
+    run from the repo root:
+
+    python -m benchmarks.bench_imgmeta
+"""
+import os
+import shutil
+import tempfile
+import time
+
+import cv2
+from PIL import Image
+
+from basicFun import IMGMETA
+from tests.synthetic import make_images
+
+def benchmark(count=50, size=(1920, 1080), workers=8):
+    """ ms per image on synthetic jpg/png color/gray images, every result is compared with PIL and cv2 """
+    image_dir = tempfile.mkdtemp()
+    try:
+        make_images(image_dir, count, size, mixed=True)
+        paths = [os.path.join(image_dir, path) for path in IMGMETA.list_images(image_dir)]
+        start = time.time()
+        decoded = [cv2.imread(path).shape for path in paths]
+        decode_cost = (time.time() - start) / count
+        pil_metas = []
+        start = time.time()
+        for path in paths:
+            with Image.open(path) as img:
+                pil_metas.append((img.size[0], img.size[1], len(img.getbands()), img.mode))
+        pil_cost = (time.time() - start) / count
+        start = time.time()
+        metas = [IMGMETA.probe(path) for path in paths]
+        header_cost = (time.time() - start) / count
+        manifest_path = os.path.join(image_dir, 'manifest.csv')
+        start = time.time()
+        IMGMETA.scan_dir(image_dir, manifest_path, workers=workers)
+        scan_cost = time.time() - start
+        same = metas == pil_metas and all(meta[:2] == (shape[1], shape[0]) for meta, shape in zip(metas, decoded))
+        same = same and IMGMETA.read_manifest(manifest_path) == dict(zip(IMGMETA.list_images(image_dir), metas))
+        print('full decode %.3f ms  PIL header %.3f ms  header %.3f ms per image  same=%s' % (
+            decode_cost * 1000, pil_cost * 1000, header_cost * 1000, same))
+        print('scan_dir: %.0f images/sec with %d workers' % (count / scan_cost, workers))
+        return same
+    finally:
+        shutil.rmtree(image_dir)
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,61 @@
+#encoding=utf-8
+""" first and incremental basicFun.MANIFEST snapshots of a synthetic tree,
+    run from the repo root:
+
+    python -m benchmarks.bench_manifest
+"""
+import os
+import shutil
+import tempfile
+import time
+
+from basicFun import MANIFEST
+from tests.synthetic import make_tree
+
+def benchmark(root_dir, file_count=1000000, change_count=300, workers=1):
+    """ seconds of the first snapshot, of the snapshot and diff after change_count files were
+        modified, deleted and added, and of load + diff alone; the delta is compared with the changes
+
+        :param root_dir: empty folder, a tree generated by an earlier run is reused
+    """
+    if not os.listdir(root_dir):
+        make_tree(root_dir, file_count)
+    manifest_dir = tempfile.mkdtemp()
+    try:
+        manifest_path = os.path.join(manifest_dir, 'manifest.csv')
+        start = time.time()
+        current, delta = MANIFEST.snapshot_delta(root_dir, manifest_path, workers=workers)
+        scan_cost = time.time() - start
+        start = time.time()
+        MANIFEST.commit(manifest_path, current)
+        print('first snapshot: %.2f sec  %d files  save %.2f sec' % (scan_cost, len(current), time.time() - start))
+        keys = sorted(current.entries)[:change_count * 3]
+        root = os.path.normpath(root_dir)
+        for key in keys[:change_count]:
+            with open(os.path.join(*key), 'a') as f:
+                f.write('x')
+        for key in keys[change_count:change_count * 2]:
+            os.remove(os.path.join(*key))
+        for key in keys[change_count * 2:]:
+            open(os.path.join(*key) + '.new', 'w').close()
+        start = time.time()
+        current, delta = MANIFEST.snapshot_delta(root_dir, manifest_path, workers=workers)
+        print('incremental snapshot + diff: %.2f sec  added %d  deleted %d  modified %d' % (
+            time.time() - start, len(delta.added), len(delta.deleted), len(delta.modified)))
+        same = delta == MANIFEST.Delta(set((root, path + '.new') for root, path in keys[change_count * 2:]),
+                                       set(keys[change_count:change_count * 2]), set(keys[:change_count]))
+        start = time.time()
+        loaded = current.diff(MANIFEST.Manifest.load(manifest_path))
+        cost = time.time() - start
+        same = same and loaded == delta
+        print('load + diff only: %.2f sec  same=%s' % (cost, same))
+        return same
+    finally:
+        shutil.rmtree(manifest_dir)
+
+if __name__ == "__main__":
+    root_dir = tempfile.mkdtemp()
+    try:
+        benchmark(root_dir, file_count=100000)
+    finally:
+        shutil.rmtree(root_dir)
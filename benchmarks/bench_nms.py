@@ -0,0 +1,38 @@
+#encoding=utf-8
+""" nms_exclusive_boxes: the original loop against the NumPy engine, run from the repo root:
+
+    python -m benchmarks.bench_nms
+"""
+import time
+import numpy as np
+
+from basicFun import NMS
+from tests.synthetic import random_frame, NMS_LABELMAP, NMS_EXCLUSIVE_GROUPS, NMS_SPECIAL_THRESH
+
+def same_results(a, b):
+    return a[1] == b[1] and len(a[0]) == len(b[0]) and all(np.array_equal(x, y) for x, y in zip(a[0], b[0]))
+
+def benchmark(box_counts=(10, 50, 100, 500, 1000, 2000), repeat=3, loop_limit=500):
+    """ seconds per frame of both engines, every frame of the loop engine is compared with the NumPy one
+
+        :param loop_limit: above this many boxes only the NumPy engine runs, the loop is O(n^3)
+    """
+    for box_count in box_counts:
+        engines = ['loop', 'numpy'] if box_count <= loop_limit else ['numpy']
+        costs = {}
+        results = {}
+        for engine in engines:
+            frames = [random_frame(box_count, seed=r) for r in range(repeat)]
+            start = time.time()
+            results[engine] = [NMS.nms_exclusive_boxes(boxes, classes, NMS_LABELMAP, NMS_EXCLUSIVE_GROUPS, 0.3, NMS_SPECIAL_THRESH, engine)
+                               for boxes, classes in frames]
+            costs[engine] = (time.time() - start) / repeat
+        if 'loop' not in costs:
+            print('boxes %5d  loop    skipped  numpy %.4f sec' % (box_count, costs['numpy']))
+            continue
+        same = all(same_results(a, b) for a, b in zip(results['loop'], results['numpy']))
+        print('boxes %5d  loop %.4f sec  numpy %.4f sec  x%.1f  same=%s' % (
+            box_count, costs['loop'], costs['numpy'], costs['loop'] / max(costs['numpy'], 1e-9), same))
+
+if __name__ == "__main__":
+    benchmark()
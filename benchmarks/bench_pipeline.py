@@ -0,0 +1,34 @@
+#encoding=utf-8
+""" FramePipeline against the serial loop with a sleep-based fake model, CPU only, run from the repo root:
+
+    python -m benchmarks.bench_pipeline
+"""
+import time
+import numpy as np
+
+from basicFun.PIPELINE import FramePipeline
+
+def demo(frame_count=64, decode_cost=0.01, infer_cost=0.01, post_cost=0.005, workers=4):
+    """ each stage sleeps for its cost, every result of the pipeline is compared with the serial one """
+    frames = [np.full((8, 8, 3), i % 256, dtype=np.uint8) for i in range(frame_count)]
+    def preprocess(image):
+        time.sleep(decode_cost)
+        return image
+    def infer(image):
+        time.sleep(infer_cost)
+        return int(image[0, 0, 0])
+    def postprocess(image, raw):
+        time.sleep(post_cost)
+        return raw
+    start = time.time()
+    serial = [postprocess(frame, infer(preprocess(frame))) for frame in frames]
+    serial_cost = time.time() - start
+    pipeline = FramePipeline(infer, preprocess, postprocess, workers=workers)
+    start = time.time()
+    results = list(pipeline.run(frames))
+    pipeline_cost = time.time() - start
+    print('serial %.3f sec  pipeline %.3f sec  in order: %s' % (serial_cost, pipeline_cost, results == serial))
+    print(pipeline.summary())
+
+if __name__ == "__main__":
+    demo()
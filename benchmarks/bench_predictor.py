@@ -0,0 +1,73 @@
+#encoding=utf-8
+""" MBModel (maskrcnn-benchmark) benchmarks, run from the repo root with a maskrcnn-benchmark config:
+
+    python -m benchmarks.bench_predictor path/to/config.yaml
+
+    Leave MODEL.WEIGHT empty and set MODEL.DEVICE to "cpu" to run on a randomly initialised model.
+"""
+import sys
+import time
+import cv2
+import numpy as np
+
+from basicFun.TRANSFORMS import build_transform
+
+def benchmark(cfg, image_count=32, batch_size=8, image_size=(720, 1280)):
+    """ images/sec of compute_prediction called in a loop against compute_predictions on random frames
+
+    """
+    from basicFun.modelTool_mb.predictor import MBModel
+    model = MBModel(cfg)
+    rng = np.random.RandomState(0)
+    images = [rng.randint(0, 256, size=image_size + (3,), dtype=np.uint8) for _ in range(image_count)]
+    model.compute_prediction(images[0])  # warm up
+
+    start = time.time()
+    for image in images:
+        model.compute_prediction(image)
+    single_cost = time.time() - start
+
+    start = time.time()
+    model.compute_predictions(images, batch_size=batch_size)
+    batch_cost = time.time() - start
+
+    print("single: %.2f images/sec" % (image_count / single_cost))
+    print("batch_size=%d: %.2f images/sec" % (batch_size, image_count / batch_cost))
+    return image_count / single_cost, image_count / batch_cost
+
+def build_transforms(cfg):
+    """ (PIL transform, TensorTransform) of MBModel.build_transform, only cfg.INPUT is used and no model is built
+
+    """
+    return tuple(build_transform(cfg.INPUT.MIN_SIZE_TEST, cfg.INPUT.MAX_SIZE_TEST, cfg.INPUT.TO_BGR255,
+                                 cfg.INPUT.PIXEL_MEAN, cfg.INPUT.PIXEL_STD, tensor_transform)
+                 for tensor_transform in [False, True])
+
+def benchmark_transforms(cfg, image_sizes=((720, 1280), (1080, 1920)), repeat=20):
+    """ per-frame latency of the PIL transform against TensorTransform on random frames,
+        and the largest absolute difference of the normalised tensors
+
+    """
+    pil_transform, tensor_transform = build_transforms(cfg)
+    rng = np.random.RandomState(0)
+    for image_size in image_sizes:
+        image = rng.randint(0, 256, size=tuple(image_size) + (3,), dtype=np.uint8)
+        image = cv2.GaussianBlur(image, (9, 9), 0)  # keep it closer to a natural frame
+        costs = []
+        for transform in [pil_transform, tensor_transform]:
+            start = time.time()
+            for _ in range(repeat):
+                transform(image)
+            costs.append((time.time() - start) / repeat)
+        pil_output, tensor_output = pil_transform(image), tensor_transform(image)
+        diff = (pil_output - tensor_output).abs()
+        print("%dx%d: pil %.2f ms  tensor %.2f ms  mean diff %.4f  max diff %.4f" % (
+            image_size[0], image_size[1], costs[0] * 1000, costs[1] * 1000,
+            diff.mean().item(), diff.max().item()))
+
+if __name__ == "__main__":
+    from maskrcnn_benchmark.config import cfg
+    cfg.merge_from_file(sys.argv[1])
+    cfg.merge_from_list(sys.argv[2:])
+    benchmark_transforms(cfg)
+    benchmark(cfg)
@@ -0,0 +1,52 @@
+#encoding=utf-8
+""" per-xml os.path.isfile against basicFun.RECONCILE set matching, and the parallel delete of the orphan xml files,
+    run from the repo root:
+
+    python -m benchmarks.bench_reconcile
+"""
+import os
+import shutil
+import tempfile
+import time
+
+from basicFun import RECONCILE
+from tests.reference import matched_images_isfile, orphan_xmls_isfile
+from tests.synthetic import make_pairs
+
+def benchmark(work_dir=None, pair_count=200000, workers=8):
+    """ seconds of every matching, the orphans and the matched images are compared with the isfile loops
+
+        :param work_dir: [optional] parent of the work folder, tmpfs (/dev/shm) or the system temp folder by default
+    """
+    parent = work_dir if work_dir is not None else ('/dev/shm' if os.path.isdir('/dev/shm') else None)
+    work_dir = tempfile.mkdtemp(dir=parent)
+    try:
+        start = time.time()
+        xml_dir, image_dir = make_pairs(work_dir, pair_count)
+        print('make %d pairs: %.2f sec' % (pair_count, time.time() - start))
+        start = time.time()
+        orphans = orphan_xmls_isfile(xml_dir, image_dir)
+        isfile_cost = time.time() - start
+        start = time.time()
+        images = matched_images_isfile(xml_dir, image_dir)
+        isfile_cost2 = time.time() - start
+        start = time.time()
+        result = RECONCILE.Reconciliation(xml_dir, image_dir, ('.jpg',))
+        set_cost = time.time() - start
+        same = orphans == result.xml_only and images == sorted(result.matched_images())
+        # one stat per xml for the isfile loops, a round trip each on network storage; two listings for the sets
+        print('xml without image  isfile: %.2f sec  (%d stat calls)' % (isfile_cost, pair_count))
+        print('image with xml     isfile: %.2f sec  (%d stat calls)' % (isfile_cost2, pair_count))
+        print('Reconciliation (both at once): %.2f sec  %s  same=%s' % (set_cost, result.summary(), same))
+        start = time.time()
+        result, count = RECONCILE.reconcile(xml_dir, image_dir, 'xml_only', 'delete', imageSuffixes=('.jpg',), workers=workers)
+        cost = time.time() - start
+        deleted = count == len(orphans) and not any(os.path.exists(os.path.join(xml_dir, name)) for name in orphans)
+        same = same and deleted
+        print('reconcile + delete %d xml with %d workers: %.2f sec  same=%s' % (count, workers, cost, deleted))
+        return same
+    finally:
+        shutil.rmtree(work_dir)
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,26 @@
+#encoding=utf-8
+""" files per second of the etree and bs4 backends of basicFun.XML.read_objects, run from the repo root:
+
+    python -m benchmarks.bench_xml <xml folder>
+"""
+import os
+import sys
+import time
+
+from basicFun import XML
+
+def benchmark_readers(xml_dir, count=1000):
+    """ both backends read the same files, every file has to give the same objects """
+    xmls = [os.path.join(xml_dir, x) for x in sorted(os.listdir(xml_dir)) if x.endswith(".xml")][:count]
+    results = {}
+    for backend in ["bs4", "etree"]:
+        start = time.time()
+        results[backend] = [XML.read_objects(xml, backend) for xml in xmls]
+        cost = time.time() - start
+        print("%-5s %8.1f files/sec" % (backend, len(xmls) / max(cost, 1e-9)))
+    same = results["bs4"] == results["etree"]
+    print("same result: {}".format(same))
+    return same
+
+if __name__ == "__main__":
+    benchmark_readers(sys.argv[1])
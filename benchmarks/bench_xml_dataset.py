@@ -0,0 +1,38 @@
+#encoding=utf-8
+""" XML_Dataset build, load and queries on a generated corpus, run from the repo root:
+
+    python -m benchmarks.bench_xml_dataset <empty folder>
+"""
+import sys
+import time
+
+from XML_Dataset import XML_Dataset
+from XML_Tool import XML_Tool
+from tests.synthetic import make_corpus
+
+def benchmark(xml_dir, file_count=100000, workers=1, cache_path=None):
+    """ time building the arrays from a generated corpus, loading them back and a few queries
+
+        :param xml_dir: empty folder the corpus is generated into, reused if it is already filled
+        :param cache_path: .npz file or folder the arrays are saved to, default xml_dir + '.npy'
+    """
+    make_corpus(xml_dir, file_count)
+    cache_path = cache_path or xml_dir.rstrip('/\\') + '.npy'
+    start = time.time()
+    dataset = XML_Dataset.from_dir(xml_dir, workers=workers)
+    print('build: %.2f sec, %d files, %d boxes' % (time.time() - start, len(dataset), len(dataset.boxes)))
+    dataset.save(cache_path)
+    start = time.time()
+    dataset = XML_Dataset.load(cache_path)
+    print('load: %.4f sec' % (time.time() - start))
+    start = time.time()
+    classes = dataset.count_classes()
+    small = dataset.box_mask(['blue', 'yellow'], max_width=60, max_height=90).sum()
+    overlaps = (dataset.iou([0, 0, 50, 80]) > 0.5).sum()
+    print('histogram + size filter + iou query: %.4f sec (%d small boxes, %d overlaps)' % (time.time() - start, small, overlaps))
+    start = time.time()
+    same = XML_Tool(xml_dir, workers=workers).count_classes() == classes
+    print('XML_Tool.count_classes: %.2f sec  same=%s' % (time.time() - start, same))
+
+if __name__ == "__main__":
+    benchmark(sys.argv[1])
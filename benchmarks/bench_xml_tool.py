@@ -0,0 +1,58 @@
+#encoding=utf-8
+""" XML_Tool.count_classes on a generated corpus with different numbers of workers and with the sqlite index,
+    run from the repo root:
+
+    python -m benchmarks.bench_xml_tool <empty folder>
+"""
+import os
+import sys
+import time
+
+from XML_Tool import XML_Tool
+from tests.synthetic import make_corpus
+
+def benchmark(xml_dir, file_count=100000, workers=(1, 4, 8, 16), chunk_size=256):
+    """ time count_classes with different numbers of workers, every run has to give the serial result
+
+        :param xml_dir: empty folder the corpus is generated into, reused if it is already filled
+        :param file_count: number of xml files
+        :param workers: worker counts to compare, 1 is the serial path
+    """
+    make_corpus(xml_dir, file_count)
+    result = None
+    for worker in workers:
+        start = time.time()
+        classes = XML_Tool(xml_dir, workers=worker, chunk_size=chunk_size).count_classes()
+        print('workers %2d: %.2f sec  same=%s' % (worker, time.time() - start, result is None or classes == result))
+        result = result or classes
+    return result
+
+def benchmark_index(xml_dir, index_path, file_count=400000, workers=1, check_files=True):
+    """ time count_classes and get_xml_by_class with a cold and a warm index
+
+        :param xml_dir: empty folder the corpus is generated into, reused if it is already filled
+        :param index_path: sqlite index file, removed before the cold run
+        :param file_count: number of xml files
+    """
+    make_corpus(xml_dir, file_count)
+    if os.path.exists(index_path):
+        os.remove(index_path)
+    txt_path = index_path + '.txt'
+    for run in ['cold', 'warm']:
+        start = time.time()
+        tool = XML_Tool(xml_dir, workers=workers, index_path=index_path, index_check_files=check_files)
+        classes = tool.count_classes()
+        count_cost = time.time() - start
+        start = time.time()
+        tool.get_xml_by_class(['bus'], txt_path)
+        query_cost = time.time() - start
+        tool.index.close()
+        print('%s: count_classes %.2f sec  get_xml_by_class %.2f sec' % (run, count_cost, query_cost))
+    os.remove(txt_path)
+    start = time.time()
+    same = XML_Tool(xml_dir, workers=workers).count_classes() == classes
+    print('without index: count_classes %.2f sec  same=%s' % (time.time() - start, same))
+
+if __name__ == "__main__":
+    benchmark(sys.argv[1])
+    benchmark_index(sys.argv[1], sys.argv[1].rstrip('/\\') + '.sqlite')
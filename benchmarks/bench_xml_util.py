@@ -0,0 +1,85 @@
+#encoding=utf-8
+""" xml_util writers and converters on synthetic data, run from the repo root:
+
+    python -m benchmarks.bench_xml_util <empty folder>
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+import xml_util
+from tests.synthetic import voc_records, write_coco_json
+
+def benchmark_generate_xml(target_dir, count=10000, workers=4):
+    """ compare the minidom round-trip of make_xml with generate_xml and generate_xmls
+    
+    Args:
+        target_dir (str): empty dir the xml files are written to
+        count (int): the number of xml files
+        workers (int): the number of processes for generate_xmls
+    """
+    records = list(voc_records(count, labels=["person"]))
+    start = time.time()
+    for image_name, image_width, image_height, detections in records:
+        dom = xml_util.make_xml(image_name, image_width, image_height, detections)
+        with open(os.path.join(target_dir, image_name + '.xml'), 'wb+') as f:
+            f.write(dom.toprettyxml(indent='\t', encoding='utf-8'))
+    print("minidom: {:.1f} files/sec".format(count / (time.time() - start)))
+    start = time.time()
+    for record in records:
+        xml_util.generate_xml(target_dir, *record)
+    print("generate_xml: {:.1f} files/sec".format(count / (time.time() - start)))
+    start = time.time()
+    xml_util.generate_xmls(target_dir, records, workers=workers)
+    print("generate_xmls (workers={}): {:.1f} files/sec".format(workers, count / (time.time() - start)))
+
+def benchmark_xml_to_json(xml_dir, json_file, counts=(20000, 200000), workers=1):
+    """ throughput and peak python memory of xml_to_json for growing synthetic corpora
+    
+    Args:
+        xml_dir (str): empty dir the xml files are written to
+        json_file (str): json file
+        counts (tuple): corpus sizes, each one extends the previous corpus
+        workers (int): the number of processes
+    """
+    written = 0
+    for count in counts:
+        xml_util.generate_xmls(xml_dir, voc_records(count, labels=["car", "person"], start=written), workers=workers)
+        written = count
+        tracemalloc.start()
+        start = time.time()
+        xml_util.xml_to_json(xml_dir, json_file, workers=workers)
+        cost = time.time() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print("{} files: {:.1f} files/sec, peak memory {:.1f} MB".format(count, count / cost, peak / 1024.0 / 1024.0))
+
+def benchmark_json_to_xml(target_dir, json_file, annotation_count=1000000, image_count=100000, workers=1):
+    """ write a synthetic COCO json file and time json_to_xml with and without streaming
+    
+    Args:
+        target_dir (str): empty dir the xml files are written to
+        json_file (str): synthetic json file, reused if it exists
+        annotation_count (int): the number of annotations
+        image_count (int): the number of images
+        workers (int): the number of processes
+    """
+    if not os.path.exists(json_file):
+        write_coco_json(json_file, annotation_count, image_count)
+    modes = [False, True] if xml_util.ijson is not None else [False]
+    for streaming in modes:
+        start = time.time()
+        xml_util.json_to_xml(json_file, target_dir, workers=workers, streaming=streaming)
+        print("streaming={}: {:.1f} annotations/sec".format(streaming, annotation_count / (time.time() - start)))
+
+def sub_dir(root, name):
+    path = os.path.join(root, name)
+    if not os.path.exists(path):
+        os.makedirs(path)
+    return path
+
+if __name__ == "__main__":
+    benchmark_generate_xml(sub_dir(sys.argv[1], "generate"))
+    benchmark_xml_to_json(sub_dir(sys.argv[1], "xml"), os.path.join(sys.argv[1], "xml.json"))
+    benchmark_json_to_xml(sub_dir(sys.argv[1], "coco"), os.path.join(sys.argv[1], "coco.json"))
@@ -2,6 +2,7 @@ import os
 import re
 import cv2
 import json
+import locale
 import pandas
 import random
 import shutil
@@ -16,6 +17,9 @@ from tqdm import tqdm
 from urllib.parse import quote
 from translate import Translator
 
+from basicFun import COPY
+from basicFun import MANIFEST
+
 def check_dir(target_dir):
     """ if target dir is not exist, then create a new dir  
 
@@ -28,24 +32,34 @@ def check_dir(target_dir):
     else:
         print("Success: {} has existed".format(target_dir))
 
-def copy_files(target_dir, dest_dir, filter_str=None):
+def copy_files(target_dir, dest_dir, filter_str=None, workers=8, skip=None, mode="copy", manifest=None, since=None):
     """ copy files according to the filter string
     
     Args:
         target_dir (str): target dir
         dest_dir (str): destination dir
         filter_str (str): filter string
+        workers (int): number of copy threads
+        skip (str): [optional] skip unchanged files by "mtime" (size + mtime) or "hash", default None overwrites every file
+        mode (str): "copy", "hardlink", "reflink" or "symlink", falls back to copying when linking fails (e.g. across devices)
+        manifest (str): [optional] csv file recording whether each file was linked or copied
+        since (str): [optional] MANIFEST snapshot file of target_dir, only the files added or modified since it are copied,
+            the snapshot taken before the run is saved afterwards
     """
-    file_count = 0
-    for file in os.listdir(target_dir):
-        name = os.path.splitext(file)[0]
-        if filter_str is None:
-            file_count += 1
-            shutil.copyfile(os.path.join(target_dir, file), os.path.join(dest_dir, file))
-        elif filter_str in file:
-            file_count += 1
-            shutil.copyfile(os.path.join(target_dir, file), os.path.join(dest_dir, file))
-    print("Success: {} files have been copied.".format(file_count))
+    if since is not None:
+        current, delta = MANIFEST.snapshot_delta(target_dir, since, recursive=False)
+    files = os.listdir(target_dir)
+    if since is not None:
+        changed = MANIFEST.changed_paths(delta.added | delta.modified, target_dir)
+        files = [file for file in files if file in changed]
+    pairs = []
+    for file in files:
+        if filter_str is None or filter_str in file:
+            pairs.append((os.path.join(target_dir, file), os.path.join(dest_dir, file)))
+    engine = COPY.copy_pairs(pairs, workers=workers, skip=skip, mode=mode, manifest=manifest)
+    if since is not None:
+        MANIFEST.commit(since, current)
+    print("Success: {} files have been copied. {}".format(engine.transferred(), engine.summary()))
 
 def files_rename(target_dir, prefix=None):
     """ batch file rename within the target dir
@@ -66,21 +80,25 @@ def files_rename(target_dir, prefix=None):
         os.rename(os.path.join(target_dir, file), os.path.join(target_dir, new_file))
     print("Success: {} files have been processed.".format(image_id))
 
-def multiple_folders_to_one(src_dir, dest_dir):
+def multiple_folders_to_one(src_dir, dest_dir, workers=8, skip=None, mode="copy", manifest=None):
     """ combine files from multiple folders into one folder
         note that all files cannot have the same name, otherwise they will be overwritten
     
     Args:
         src_dir (str): there are multiple folders within the src_dir
         dest_dir (str): destination dir
+        workers (int): number of copy threads
+        skip (str): [optional] skip unchanged files by "mtime" (size + mtime) or "hash", default None overwrites every file
+        mode (str): "copy", "hardlink", "reflink" or "symlink", falls back to copying when linking fails (e.g. across devices)
+        manifest (str): [optional] csv file recording whether each file was linked or copied
     """
-    file_count = 0
+    pairs = []
     for root, dirs, files in os.walk(src_dir):
         files.sort()
         for file in files:
-            shutil.copyfile(os.path.join(root, file), os.path.join(dest_dir, file))
-            file_count += 1
-    print("Success: {} files have been processed.".format(file_count))
+            pairs.append((os.path.join(root, file), os.path.join(dest_dir, file)))
+    engine = COPY.copy_pairs(pairs, workers=workers, skip=skip, mode=mode, manifest=manifest) # a repeated name keeps the last file, as before
+    print("Success: {} files have been processed. {}".format(engine.transferred(), engine.summary()))
 
 def read_detection_result_from_txt(target_file):
     """ read detection result from txt
@@ -91,16 +109,127 @@ def read_detection_result_from_txt(target_file):
     """
     result = []
     with open(target_file, "r") as f:
-        lines = f.readlines()
-        for i, line in enumerate(lines):
-            detection = []
-            for le in line.split(";"):
-                if le[0] == "\n":
-                    continue
-                detection.append(le.split(",")) # correspond to one box
-            result.append(detection)
+        for line in f:
+            result.append(parse_detection_fields(line))
     return result
 
+def parse_detection_fields(line):
+    """ one line of a detection result txt -> [[xmin, ymin, xmax, ymax, label, score], ...] as strings
+    
+    Args:
+        line (str)
+    """
+    detection = []
+    for le in line.split(";"):
+        if le == "" or le[0] == "\n":
+            continue
+        detection.append(le.split(",")) # correspond to one box
+    return detection
+
+def parse_detection_line(line):
+    """ one line of a detection result txt -> typed arrays
+    
+    Args:
+        line (str)
+    Return:
+        boxes (numpy): (N, 4) float32 xmin, ymin, xmax, ymax
+        labels (numpy): (N,) str
+        scores (numpy): (N,) float32
+    """
+    detection = parse_detection_fields(line)
+    boxes = np.array([fields[:4] for fields in detection], dtype=np.float32).reshape(-1, 4)
+    labels = np.array([fields[-2] for fields in detection], dtype=str)
+    scores = np.array([fields[-1] for fields in detection], dtype=np.float32)
+    return boxes, labels, scores
+
+def iter_detection_results(target_file, typed=True):
+    """ yield the detection result of a txt frame by frame without loading the whole file
+    
+    Args:
+        target_file (str): txt file
+        typed (bool): yield parse_detection_line arrays, False yields the lists of read_detection_result_from_txt
+    """
+    parse = parse_detection_line if typed else parse_detection_fields
+    with open(target_file, "r") as f:
+        for line in f:
+            yield parse(line)
+
+def build_line_index(target_file, chunk_size=1 << 24):
+    """ byte offsets of the lines of a file, line i is [offsets[i], offsets[i + 1])
+    
+    Args:
+        target_file (str)
+        chunk_size (int): number of bytes read at a time
+    Return:
+        offsets (numpy): (lines + 1,) int64
+    """
+    starts = [np.zeros(1, dtype=np.int64)]
+    position = 0
+    with open(target_file, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            starts.append(np.flatnonzero(np.frombuffer(chunk, dtype=np.uint8) == 10).astype(np.int64) + position + 1)
+            position += len(chunk)
+    offsets = np.concatenate(starts)
+    if offsets[-1] != position: # last line without a newline
+        offsets = np.append(offsets, position)
+    return offsets
+
+class DetectionResultReader():
+    def __init__(self, target_file, index_file=None, typed=True, encoding=None):
+        """ random access to the frames of a detection result txt through a sidecar byte-offset index
+        
+        Args:
+            target_file (str): txt file
+            index_file (str): [optional] .npy offsets, default target_file + ".idx.npy", rebuilt when older than the txt
+            typed (bool): frames are parse_detection_line arrays, False gives the lists of read_detection_result_from_txt
+            encoding (str): [optional] encoding of the txt, default is the locale encoding like open(),
+                used by both the random access and the iteration
+        """
+        super(DetectionResultReader, self).__init__()
+        self.target_file = target_file
+        self.index_file = index_file or target_file + ".idx.npy"
+        self.parse = parse_detection_line if typed else parse_detection_fields
+        self.encoding = encoding or locale.getpreferredencoding(False)
+        self.offsets = self.load_index()
+
+    def load_index(self):
+        size = os.path.getsize(self.target_file)
+        if os.path.exists(self.index_file) and os.path.getmtime(self.index_file) >= os.path.getmtime(self.target_file):
+            offsets = np.load(self.index_file)
+            if len(offsets) > 0 and offsets[-1] == size:
+                return offsets
+        offsets = build_line_index(self.target_file)
+        try:
+            np.save(self.index_file, offsets)
+        except (IOError, OSError):
+            print("Warning: can not write index {}".format(self.index_file))
+        return offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def read_line(self, i):
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        with open(self.target_file, "rb") as f:
+            f.seek(start)
+            data = f.read(end - start)
+        return data.decode(self.encoding).replace("\r\n", "\n")
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if i < 0 or i >= len(self):
+            raise IndexError("frame index out of range")
+        return self.parse(self.read_line(i))
+
+    def __iter__(self):
+        with open(self.target_file, "r", encoding=self.encoding) as f:
+            for line in f:
+                yield self.parse(line)
+
 def read_excel(excel_path, coloum_name=None):
     """ read excel file and return the specified column
     
@@ -5,7 +5,9 @@ import json
 import pandas
 import random
 import shutil
+import itertools
 import urllib.request
+from multiprocessing import Pool
 import numpy as np
 try: 
     import xml.etree.cElementTree as ET 
@@ -16,65 +18,87 @@ from tqdm import tqdm
 from urllib.parse import quote
 from translate import Translator
 
-from file_util import read_detection_result_from_txt
+from file_util import check_dir, read_detection_result_from_txt, iter_detection_results
+from other_util import is_chinese, replace_underscore_with_space, translate_chinese_to_english
+from basicFun import IMGCACHE
+from basicFun import COPY
+from basicFun import DOWNLOAD
+from basicFun import MANIFEST
+from basicFun import RECONCILE
 
-def crawler_image_from_baidu(save_dir, keyword, page_count=1):
+BAIDU_SEARCH_URL = "https://image.baidu.com/search/index?tn=baiduimage&ipn=r&ct=201326592&cl=2&lm=-1&st=-1&fm=result&fr=&sf=1&fmq=1600411706254_R&pv=&ic=&nc=1&z=&hd=&latest=&copyright=&se=1&showtab=0&fb=0&width=&height=&face=0&istype=2&ie=utf-8&sid=&word="
+
+def crawler_image_from_baidu(save_dir, keyword, page_count=1, workers=8, base_url=BAIDU_SEARCH_URL, downloader=None):
     """ crawl images from baidu
+        the result pages are fetched one by one while their images are downloaded concurrently,
+        repeated urls and images with the same content are only saved once
     
     Args:
         save_dir (str): images dir
         keyword (str): the keyword of images
         page_count (int): the count of pages
+        workers (int): [optional] number of concurrent downloads
+        base_url (str): [optional] search url the quoted keyword is appended to, e.g. a local test server
+        downloader (DOWNLOAD.Downloader): [optional] shared downloader, closed by the caller
+    Return:
+        count (int): number of saved images
     """
     keyword_en = translate_chinese_to_english(keyword) if is_chinese(keyword) else keyword
     headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/70.0.3538.67 Safari/537.36",
         "referer": "https://image.baidu.com"
     }
-    base_url = "https://image.baidu.com/search/index?tn=baiduimage&ipn=r&ct=201326592&cl=2&lm=-1&st=-1&fm=result&fr=&sf=1&fmq=1600411706254_R&pv=&ic=&nc=1&z=&hd=&latest=&copyright=&se=1&showtab=0&fb=0&width=&height=&face=0&istype=2&ie=utf-8&sid=&word="
     keyword_utf8 = quote(keyword, encoding="utf-8")
     keyword_name = replace_underscore_with_space(keyword_en)
     check_dir(os.path.join(save_dir, keyword_name))
+    own_downloader = downloader is None
+    if own_downloader:
+        downloader = DOWNLOAD.Downloader(workers=workers, headers=headers)
+    key1 = re.compile(r'thumbURL":"(.+?)"')
+    futures = []
     num = 1
-    for i in range(page_count):
-        url = base_url + keyword_utf8 + "&pn=" + str(num)
-        req = urllib.request.Request(url, headers=headers)
-        f = urllib.request.urlopen(req).read().decode("utf-8")
-        key = r'thumbURL":"(.+?)"'
-        key1 = re.compile(key)
-        for string in re.findall(key1, f):
-            if "\\" in string:
-                continue  
-            print("Downloading {}".format(string))
-            f_req = urllib.request.Request(string, headers=headers)
-            f_url = urllib.request.urlopen(f_req).read()
-            image_path = os.path.join(save_dir, keyword_name, keyword_name + str("_%06d"%(num)) + ".jpg")
-            with open(image_path, "wb+") as fs:
-                fs.write(f_url)
-                fs.close()
-            num += 1
-
-def copy_image_by_xml(xml_dir, image_target_dir, image_dest_dir, image_suffix=".jpg"):
-    """ copy the image through the xml of the same name
+    try:
+        for i in range(page_count):
+            url = base_url + keyword_utf8 + "&pn=" + str(num)
+            f = downloader.fetch(url).decode("utf-8")
+            for string in re.findall(key1, f):
+                if "\\" in string:
+                    continue
+                image_path = os.path.join(save_dir, keyword_name, keyword_name + str("_%06d"%(num)) + ".jpg")
+                futures.append((image_path, downloader.submit(string, image_path)))
+                num += 1
+        count = sum(1 for image_path, future in tqdm(futures) if future.result() == image_path)
+    finally:
+        if own_downloader:
+            downloader.close()
+    print("Success: {} images have been downloaded. {}".format(count, downloader.summary()))
+    return count
+
+def copy_image_by_xml(xml_dir, image_target_dir, image_dest_dir, image_suffix=".jpg", workers=8, skip=None, mode="copy", manifest=None, dry_run=False):
+    """ copy the image through the xml of the same name, both dirs are listed once and matched as sets
     
     Args:
         xml_dir (str): xml dir
         image_target_dir (str): image target dir
         image_dest_dir (str): image destination dir
-        image_suffix (str): default .jpg
+        image_suffix (str or tuple): default .jpg, a tuple copies the images of every suffix, case insensitive
+        workers (int): number of copy threads
+        skip (str): [optional] skip unchanged images by "mtime" (size + mtime) or "hash", default None overwrites every image
+        mode (str): "copy", "hardlink", "reflink" or "symlink", falls back to copying when linking fails (e.g. across devices)
+        manifest (str): [optional] csv file recording whether each image was linked or copied
+        dry_run (bool): only count the images that would be copied
     """
-    file_count = 0
-    for file in os.listdir(xml_dir):
-        filename = os.path.splitext(file)[0]
-        suffix = os.path.splitext(file)[-1]
-        if suffix not in [".xml"]:
-            continue
-        image_target_path = os.path.join(image_target_dir, filename + image_suffix)
-        image_dest_path = os.path.join(image_dest_dir, filename + image_suffix)
-        if os.path.isfile(image_target_path):
-            shutil.copyfile(image_target_path, image_dest_path)
-            file_count += 1
-    print("Success: {} files have been copied.".format(file_count))
+    image_suffixes = (image_suffix,) if isinstance(image_suffix, str) else image_suffix
+    result = RECONCILE.Reconciliation(xml_dir, image_target_dir, image_suffixes)
+    pairs = [(os.path.join(image_target_dir, image), os.path.join(image_dest_dir, image)) for image in result.matched_images()]
+    if dry_run:
+        print("Dry run: {} files would be copied. {}".format(len(pairs), result.summary()))
+        return len(pairs)
+    if not os.path.exists(image_dest_dir):
+        os.makedirs(image_dest_dir)
+    engine = COPY.copy_pairs(pairs, workers=workers, skip=skip, mode=mode, manifest=manifest)
+    print("Success: {} files have been copied. {}".format(engine.transferred(), engine.summary()))
+    return engine.transferred()
 
 def download_image_by_url(url, save_dir):
     """ download images by url
@@ -88,23 +112,43 @@ def download_image_by_url(url, save_dir):
     check_dir(save_dir)
     filename = url.split("/")[-1]
     save_path = os.path.join(save_dir, filename)
+    # the shared downloader keeps the connection to each host open between calls
+    return DOWNLOAD.get_downloader().download(url, save_path) is not None
+
+def download_images_by_url(urls, save_dir, workers=8, dedupe=True):
+    """ download images by url concurrently
+    
+    Args:
+        urls (list)
+        save_dir (str)
+        workers (int): number of concurrent downloads
+        dedupe (bool): skip repeated urls and images with the same content
+    Return:
+        results (list): the saved path of every url, None if it failed
+    """
+    check_dir(save_dir)
+    downloader = DOWNLOAD.Downloader(workers=workers, dedupe=dedupe)
     try:
-        urllib.request.urlretrieve(url, filename=save_path)
-        return True
-    except Exception:
-        return False
+        return downloader.download_all([(url, os.path.join(save_dir, url.split("/")[-1])) for url in urls])
+    finally:
+        downloader.close()
 
-def is_3_channels(image_path):
+def is_3_channels(image_path, cache=False, full_check=True):
     """ whether the image is 3 channels
     
     Args:
         image_path (str)
+        cache (bool): [optional] read the image (or the header) through the shared IMGCACHE cache
+        full_check (bool): [optional] decode the whole image like cv2.imread, so that a corrupt body is False,
+            when False only the header is read and any image whose header parses is True
     """
-    img = cv2.imread(image_path)
+    if full_check:
+        img = IMGCACHE.imread(image_path, cache)
+        return img is not None and img.ndim == 3 and img.shape[2] == 3
+    # cv2.imread always decodes to 3 channels, so only the header is read to check that the image can be opened
     try:
-        h, w, c = img.shape
-        if c == 3:
-            return True
+        IMGCACHE.probe_image(image_path, cache)
+        return True
     except Exception:
         return False
 
@@ -133,7 +177,82 @@ def plot_one_box(img=None, x=None, label=None, color=None, line_thickness=None,
             cv2.rectangle(img, c1, c2, color, -1, cv2.LINE_AA)  # filled
         cv2.putText(img, label, (c1[0], c1[1] - 2), 0, tl / 3, (255, 255, 255), thickness=tf, lineType=cv2.LINE_AA)
 
-def plot_dir_box(image_dir, save_dir, txt_file=None, detection_result=[]):
+def plot_image_boxes(args):
+    """ draw the detections of one image and write it, the worker of plot_dir_box and plot_dirs_box
+    
+    Args:
+        args (tuple): (image_path, save_path, detections, cache)
+    """
+    image_path, save_path, detections, cache = args
+    img = IMGCACHE.imread(image_path, cache)
+    if cache:
+        img = img.copy() # cached images are read only
+    for detection in detections:
+        # text = detection[-2] + " " + detection[0] + "," + detection[1] + "," + detection[2] + "," + detection[3]
+        plot_one_box(img, detection[:4], detection[-2], color=(128, 0, 128), line_thickness=1)
+    cv2.imwrite(save_path, img)
+    return save_path
+
+def is_up_to_date(save_path, refer_paths):
+    """ whether save_path exists and is not older than any of refer_paths
+    
+    Args:
+        save_path (str)
+        refer_paths (list): input files of save_path, None is ignored
+    """
+    if not os.path.exists(save_path):
+        return False
+    save_mtime = os.path.getmtime(save_path)
+    return all(os.path.getmtime(path) <= save_mtime for path in refer_paths if path is not None)
+
+def plot_dir_box_tasks(image_dir, save_dir, result, cache=False, resume=False, txt_file=None, only=None):
+    """ yield the plot_image_boxes arguments of the images in the image dir, the i-th frame of result belongs to the i-th sorted file
+    
+    Args:
+        result (iterable): detection result of every file, read lazily in order
+        resume (bool): skip images whose output exists and is newer than the image and the txt file
+        only (set): [optional] names of the images to plot, the others are skipped
+    """
+    image_list = os.listdir(image_dir)
+    image_list.sort()
+    frames = iter(result)
+    for i, image in enumerate(image_list):
+        # one frame per sorted entry, like result[i], but only an image without a frame is an error
+        detections = next(frames, None)
+        suffix = os.path.splitext(image)[-1]
+        if suffix not in [".jpg", "jpeg", "png"]:
+            continue
+        if detections is None:
+            raise IndexError("no detection result for {}".format(os.path.join(image_dir, image)))
+        image_path = os.path.join(image_dir, image)
+        save_path = os.path.join(save_dir, image)
+        if only is not None and image not in only:
+            continue
+        if resume and is_up_to_date(save_path, [image_path, txt_file]):
+            continue
+        yield image_path, save_path, detections, cache
+
+def run_plot_tasks(tasks, workers=1, chunk_size=16, pool=None):
+    """ run plot_image_boxes over tasks, on pool if given, else on a new pool of workers processes
+    
+    Return:
+        count (int): number of written images
+    """
+    if pool is None and workers <= 1:
+        return sum(1 for _ in map(plot_image_boxes, tasks))
+    if pool is None:
+        with Pool(workers) as pool:
+            return run_plot_tasks(tasks, workers, chunk_size, pool)
+    # Pool.imap reads its whole input at once, so the tasks are sent in windows to keep few frames in memory
+    tasks = iter(tasks)
+    count = 0
+    while True:
+        window = list(itertools.islice(tasks, chunk_size * workers * 4))
+        if not window:
+            return count
+        count += sum(1 for _ in pool.imap_unordered(plot_image_boxes, window, chunksize=chunk_size))
+
+def plot_dir_box(image_dir, save_dir, txt_file=None, detection_result=[], cache=False, workers=1, chunk_size=16, resume=False, since=None):
     """ plot bounding boxes on images in the image dir
     
     Args:
@@ -141,22 +260,67 @@ def plot_dir_box(image_dir, save_dir, txt_file=None, detection_result=[]):
         save_dir (str): save dir
         txt_file (str): [optional] txt flie which storage detection result
         detection_result (list): [optional] enable use only when txt file is None
+        cache (bool): [optional] read the images through the shared IMGCACHE cache
+        workers (int): [optional] number of processes, 1 draws on the calling process
+        chunk_size (int): [optional] number of images sent to a process at a time
+        resume (bool): [optional] skip images whose output exists and is newer than the image and the txt file
+        since (str): [optional] MANIFEST snapshot file of the image dir and the txt file, only the images added or modified
+            since it are plotted (all of them when the txt file has changed), the snapshot taken before the run is saved afterwards
     """
     if txt_file is not None:
-        result = read_detection_result_from_txt(txt_file)
+        result = iter_detection_results(txt_file, typed=False)
     else:
         result = detection_result
-    image_list = os.listdir(image_dir)
-    image_list.sort()
-    for i, image in enumerate(image_list):
-        suffix = os.path.splitext(image)[-1]
-        if suffix not in [".jpg", "jpeg", "png"]:
-            continue
-        img = cv2.imread(os.path.join(image_dir, image))
-        for detection in result[i]:
-            # text = detection[-2] + " " + detection[0] + "," + detection[1] + "," + detection[2] + "," + detection[3]
-            plot_one_box(img, detection[:4], detection[-2], color=(128, 0, 128), line_thickness=1)
-        cv2.imwrite(os.path.join(save_dir, image), img)
+    only = None
+    if since is not None:
+        roots = [image_dir] + ([txt_file] if txt_file is not None else [])
+        current, delta = MANIFEST.snapshot_delta(roots, since, recursive=False)
+        if txt_file is None or not MANIFEST.changed_paths(delta.added | delta.modified, txt_file):
+            only = MANIFEST.changed_paths(delta.added | delta.modified, image_dir)
+    tasks = plot_dir_box_tasks(image_dir, save_dir, result, cache, resume, txt_file, only)
+    count = run_plot_tasks(tasks, workers, chunk_size)
+    if since is not None:
+        MANIFEST.commit(since, current)
+    return count
+
+def plot_dirs_box(images_dir, txt_dir, save_dir, workers=None, chunk_size=16, resume=True, cache=False):
+    """ plot_dir_box on every sub dir of images_dir with one process pool,
+        the detection result of images_dir/xxx/ is txt_dir/xxx.txt and the images are written to save_dir/xxx/
+    
+    Args:
+        images_dir (str): dir of image dirs
+        txt_dir (str): dir of detection result txt files
+        save_dir (str): save dir
+        workers (int): [optional] number of processes, default os.cpu_count()
+        chunk_size (int): [optional] number of images sent to a process at a time
+        resume (bool): [optional] skip images whose output exists and is newer than the image and the txt file
+        cache (bool): [optional] read the images through the IMGCACHE cache of each process
+    Return:
+        count (int): number of written images
+    """
+    workers = workers or os.cpu_count() or 1
+    image_dirs = sorted(x for x in os.listdir(images_dir) if os.path.isdir(os.path.join(images_dir, x)))
+    pool = Pool(workers) if workers > 1 else None
+    count = 0
+    try:
+        pbar = tqdm(image_dirs)
+        for image_dir in pbar:
+            pbar.set_description("Processing {}/{}".format(images_dir, image_dir))
+            txt_file = os.path.join(txt_dir, image_dir + ".txt")
+            if not os.path.exists(txt_file):
+                print("Warning: {} does not exist, skip {}".format(txt_file, image_dir))
+                continue
+            dir_save = os.path.join(save_dir, image_dir)
+            os.makedirs(dir_save, exist_ok=True)
+            result = iter_detection_results(txt_file, typed=False)
+            tasks = plot_dir_box_tasks(os.path.join(images_dir, image_dir), dir_save, result, cache, resume, txt_file)
+            count += run_plot_tasks(tasks, workers, chunk_size, pool)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    print("Success: {} images have been plotted.".format(count))
+    return count
 
 def png_to_jpg(png_path, jpg_path):
     """ convert image format: png -> jpg, then save picture with jpg
@@ -180,22 +344,40 @@ def png_to_jpg(png_path, jpg_path):
     except Exception:
         return False
 
-def remove_xml_without_image(xml_dir, image_dir):
-    """ remove xml files without corresponding images
+def remove_xml_without_image(xml_dir, image_dir, since=None, image_suffixes=(".jpg",), workers=8, dry_run=False, report_path=None):
+    """ remove xml files without corresponding images, both dirs are listed once and matched as sets
     
     Args:
         xml_dir (str): xml files dir
         image_dir (str): images dir
+        since (str): [optional] MANIFEST snapshot file of both dirs, only the xml files added or modified since it
+            and the ones whose image has been deleted since it are checked, the snapshot taken before the run
+            (without the removed xml files) is saved afterwards
+        image_suffixes (tuple): suffixes of the images an xml file can belong to, case insensitive
+        workers (int): number of delete threads
+        dry_run (bool): only count the xml files that would be removed
+        report_path (str): [optional] csv report of the matched and orphan files
     """
-    file_count = 0
-    for file in os.listdir(xml_dir):
-        portion = os.path.splitext(file)
-        if portion[-1] == ".xml":
-            image_path = os.path.join(image_dir, portion[0] + ".jpg")
-            if not os.path.isfile(image_path):
-                file_count += 1
-                os.remove(os.path.join(xml_dir, file))
+    if since is not None:
+        # the snapshot is taken before listing, so that a file added meanwhile is still new next time
+        current, delta = MANIFEST.snapshot_delta([xml_dir, image_dir], since, recursive=False)
+    result = RECONCILE.Reconciliation(xml_dir, image_dir, image_suffixes)
+    orphans = result.xml_only
+    if since is not None:
+        changed = MANIFEST.changed_paths(delta.added | delta.modified, xml_dir)
+        changed.update(os.path.splitext(image)[0] + ".xml" for image in MANIFEST.changed_paths(delta.deleted, image_dir))
+        orphans = [file for file in orphans if file in changed]
+    if report_path is not None:
+        result.write_report(report_path)
+    file_count = RECONCILE.apply(orphans, xml_dir, "delete", workers=workers, dryRun=dry_run)
+    if dry_run:
+        print("Dry run: {} xml files would be removed. {}".format(file_count, result.summary()))
+        return file_count
+    if since is not None:
+        current.refresh(xml_dir, orphans)
+        MANIFEST.commit(since, current)
     print("Success: {} xml files have been removed.".format(file_count))
+    return file_count
 
 def svg_to_jpg(svg_path, save_path, fmt=None):
     """ convert image format: svg -> jpg, then save picture with jpg
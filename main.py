@@ -1,10 +1,11 @@
 import os
+import argparse
 
 from tqdm import tqdm
 
 from xml_util import xml_to_json
 from file_util import check_dir
-from image_util import plot_dir_box
+from image_util import plot_dir_box, plot_dirs_box
 
 def temporary_storage():
     """ temporary storage
@@ -56,19 +57,18 @@ def temporary_storage():
     #         check_dir(os.path.join(save_dir, image_dir))
     #         cv2.imwrite(os.path.join(save_dir, image_dir, image), img)
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="plot detection results onto the images of every sub dir of images_dir")
+    parser.add_argument("--images-dir", required=True, help="dir of image dirs, e.g. scenario_data/image/")
+    parser.add_argument("--txt-dir", required=True, help="dir of detection result txt files, images_dir/xxx/ uses txt_dir/xxx.txt")
+    parser.add_argument("--save-dir", required=True, help="output dir, images_dir/xxx/ is written to save_dir/xxx/")
+    parser.add_argument("--workers", type=int, default=None, help="number of processes, default is the number of cpus")
+    parser.add_argument("--chunk-size", type=int, default=16, help="number of images sent to a process at a time")
+    parser.add_argument("--no-resume", action="store_true", help="redraw images whose output is already up to date")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
     # add bboxes onto images
-    txt_dir = "F:/Data/kairos/data/scenario_data/original-detect-result/ocr-2/"
-    images_dir = "F:/Data/kairos/data/scenario_data/image/"
-    save_dir = "F:/Data/kairos/data/scenario_data/visualization-ocr/"
-
-    # category_list = ["obj-v", "obj-v", "obj-v", "obj-v", "obj-v", "obj-v"]
-
-    pbar = tqdm(os.listdir(images_dir))
-    for image_dir in pbar:
-        pbar.set_description("Processing {}/{}".format(images_dir, image_dir))
-        if not os.path.isdir(os.path.join(images_dir, image_dir)):
-            continue
-        txt_file = os.path.join(txt_dir, image_dir+".txt")
-        check_dir(os.path.join(save_dir, image_dir))
-        plot_dir_box(os.path.join(images_dir, image_dir), os.path.join(save_dir, image_dir), txt_file)
+    # e.g. python main.py --images-dir F:/Data/kairos/data/scenario_data/image/ --txt-dir F:/Data/kairos/data/scenario_data/original-detect-result/ocr-2/ --save-dir F:/Data/kairos/data/scenario_data/visualization-ocr/
+    args = parse_args()
+    plot_dirs_box(args.images_dir, args.txt_dir, args.save_dir, workers=args.workers, chunk_size=args.chunk_size, resume=not args.no_resume)
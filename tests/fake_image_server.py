@@ -0,0 +1,95 @@
+#encoding=utf-8
+import re
+import time
+import random
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+class FakeImageServer(object):
+    def __init__(self, image_count=300, image_size=20000, per_page=30, duplicate_every=10, fail_every=0, delay=0.0):
+        """ local stand-in of the baidu image search for the tests and the benchmarks, nothing goes out to the network
+
+            /search/index?word=xx&pn=N: a page with the thumbURL of per_page images from the N-th one
+            /img/K.jpg: the K-th image, the same content as image 0 when K is a multiple of duplicate_every
+            /redirect/K.jpg: a 302 to /img/K.jpg
+            :param fail_every: > 0 answers 503 to the first request of every fail_every-th image
+            :param delay: simulated network latency of every request (sec)
+        """
+        self.image_count = image_count
+        self.image_size = image_size
+        self.per_page = per_page
+        self.duplicate_every = duplicate_every
+        self.fail_every = fail_every
+        self.delay = delay
+        self.failed = set()
+        self.lock = threading.Lock()
+        self.requests = 0
+        # Authorization header of every request, None when there is none
+        self.authorizations = []
+        self.server = None
+    def image(self, index):
+        if self.duplicate_every and index % self.duplicate_every == 0:
+            index = 0
+        rng = random.Random(index)
+        return bytes(rng.getrandbits(8) for _ in range(64)) * (self.image_size // 64)
+    def start(self):
+        fake = self
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            def setup(self):
+                BaseHTTPRequestHandler.setup(self)
+                # headers and body are written separately, without TCP_NODELAY keep-alive requests wait for the delayed ACK
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            def log_message(self, *args):
+                pass
+            def reply(self, status, body, content_type='image/jpeg'):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            def do_GET(self):
+                with fake.lock:
+                    fake.requests += 1
+                    fake.authorizations.append(self.headers.get('Authorization'))
+                if fake.delay:
+                    time.sleep(fake.delay)
+                parts = urlsplit(self.path)
+                if parts.path == '/search/index':
+                    query = parse_qs(parts.query)
+                    start = int(query.get('pn', ['1'])[0])
+                    host = 'http://%s:%d' % self.server.server_address[:2]
+                    urls = ['{"thumbURL":"%s/img/%d.jpg"}' % (host, i) for i in range(start - 1, min(start - 1 + fake.per_page, fake.image_count))]
+                    return self.reply(200, ('<html><script>var data=[%s];</script></html>' % ','.join(urls)).encode('utf-8'), 'text/html')
+                match = re.match(r'^/redirect/(\d+)\.jpg$', parts.path)
+                if match is not None:
+                    self.send_response(302)
+                    self.send_header('Location', '/img/%s.jpg' % match.group(1))
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                match = re.match(r'^/img/(\d+)\.jpg$', parts.path)
+                if match is None or int(match.group(1)) >= fake.image_count:
+                    return self.reply(404, b'')
+                index = int(match.group(1))
+                if fake.fail_every and index % fake.fail_every == 0:
+                    with fake.lock:
+                        first = index not in fake.failed
+                        fake.failed.add(index)
+                    if first:
+                        return self.reply(503, b'')
+                self.reply(200, fake.image(index))
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
+    @property
+    def url(self):
+        return 'http://%s:%d' % self.server.server_address[:2]
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
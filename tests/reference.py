@@ -0,0 +1,119 @@
+#encoding=utf-8
+""" the original implementations the library code is checked against """
+import os
+
+import numpy as np
+
+from basicFun import IMG
+
+def get_LBP_featrue_loop(rgb):
+    # basicFun.IMG.get_LBP_featrue原来的逐像素实现
+    gray=IMG.rgb2gray(rgb)
+    img_feature = np.zeros(gray.shape,np.uint8) 
+    H,W=gray.shape
+    for h in range(H):
+        for w in range(W):
+            ## h-1,w-1
+            Sum=0
+            if h==0 or w==0:
+                Sum+=0
+            else:
+                Sum+=(gray[h-1,w-1] > gray[h,w])
+            ## h-1,w
+            if h==0:
+                Sum*=2
+            else:
+                Sum*=2
+                Sum+=(gray[h-1,w] > gray[h,w])
+            ## h-1,w+1
+            if h==0 or w==W-1:
+                Sum*=2
+            else:
+                Sum*=2
+                Sum+=(gray[h-1,w+1] > gray[h,w])
+            ## h,w+1
+            if w==W-1:
+                Sum*=2
+            else:
+                Sum*=2###
+                Sum+=(gray[h,w+1] > gray[h,w])
+            ## h+1,w+1
+            if h==H-1 or w==W-1:
+                Sum*=2
+            else:
+                Sum*=2###
+                Sum+=(gray[h+1,w+1] > gray[h,w])
+            ## h+1,w
+            if h==H-1:
+                Sum*=2
+            else:
+                Sum*=2###
+                Sum+=(gray[h+1,w] > gray[h,w])
+            ## h+1,w-1
+            if h==H-1 or w==0:
+                Sum*=2
+            else:
+                Sum*=2###
+                Sum+=(gray[h+1,w-1] > gray[h,w])
+            ## h,w-1
+            if w==0:
+                Sum*=2
+            else:
+                Sum*=2###
+                Sum+=(gray[h,w-1] > gray[h,w])
+            img_feature[h,w]=Sum
+    # return (sum(img_feature.reshape(-1)>4)/(H*W*1.0))
+    return(img_feature)
+def gray2array_ave_loop(grayImg):
+    # basicFun.IMG.gray2array_ave原来的逐像素实现；item()避免NumPy 2下uint8标量累加溢出
+    height, width = grayImg.shape
+    pixCount=0
+    pixSum=0
+    pixList=[]
+    for line in range(height):
+        for pixel in range(width):
+            pixCount+=1
+            pixSum+=grayImg[line][pixel].item()
+    pixAve = pixSum /pixCount
+    for line in range(height):
+        for pixel in range(width):
+            pixList.append(grayImg[line][pixel]-pixAve)
+    return np.array(pixList)
+def gray2array_raw_loop(grayImg):
+    # basicFun.IMG.gray2array_raw原来的逐像素实现
+    height, width = grayImg.shape
+    pixList=[]
+    for line in range(height):
+        for pixel in range(width):
+            pixList.append(grayImg[line][pixel])
+    return np.array(pixList)
+
+def list_all_files_listdir(rootdir):
+    # basicFun.FILES.list_all_files原来的listdir+isdir/isfile实现
+    _files = []
+    list = os.listdir(rootdir) #列出文件夹下所有的目录与文件
+    for i in range(0,len(list)):
+           path = os.path.join(rootdir,list[i])
+           if os.path.isdir(path):
+              _files.extend(list_all_files_listdir(path))
+           if os.path.isfile(path):
+              _files.append(list[i])
+    return _files
+
+def orphan_xmls_isfile(xmlDir,imageDir,imageSuffix='.jpg'):
+    # image_util.remove_xml_without_image原来的逐个isfile检查
+    orphans=[]
+    for name in os.listdir(xmlDir):
+        stem,suffix=os.path.splitext(name)
+        if suffix=='.xml' and not os.path.isfile(os.path.join(imageDir,stem+imageSuffix)):
+            orphans.append(name)
+    return sorted(orphans)
+
+def matched_images_isfile(xmlDir,imageDir,imageSuffix='.jpg'):
+    # image_util.copy_image_by_xml原来的逐个isfile检查
+    images=[]
+    for name in os.listdir(xmlDir):
+        stem,suffix=os.path.splitext(name)
+        if suffix=='.xml' and os.path.isfile(os.path.join(imageDir,stem+imageSuffix)):
+            images.append(stem+imageSuffix)
+    return sorted(images)
@@ -0,0 +1,167 @@
+#encoding=utf-8
+""" synthetic inputs shared by the tests and the benchmarks """
+import os
+import json
+import cv2
+import numpy as np
+
+NMS_LABELMAP = {1: 'blue', 2: 'yellow', 3: 'other', 4: 'red', 5: 'car', 6: 'truck', 7: 'bus', 8: 'motorcycle', 9: 'tube'}
+NMS_EXCLUSIVE_GROUPS = [['truck', 'car', 'tanker', 'bus', 'motorcycle'], ['blue', 'yellow', 'red', 'gray', 'security', 'other']]
+NMS_SPECIAL_THRESH = {'tube': 0.6, 'def': 0.6}
+
+def random_frame(box_count, labelmap=NMS_LABELMAP, seed=0, width=1920, height=1080):
+    """ one frame of detections for nms_exclusive_boxes, boxes are clustered like a crowded scene
+
+        :return: ([array([x1, y1, x2, y2, score]), ...], [class id, ...])
+    """
+    rng = np.random.RandomState(seed)
+    centers = rng.rand(max(box_count // 5, 1), 2) * [width, height]
+    boxes = []
+    classes = []
+    for i in range(box_count):
+        cx, cy = centers[rng.randint(len(centers))] + rng.randn(2) * 8
+        w, h = rng.rand(2) * [120, 240] + 20
+        boxes.append(np.array([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2, rng.rand()]))
+        classes.append(rng.randint(1, len(labelmap) + 1))
+    return boxes, classes
+
+def make_corpus(xml_dir, file_count):
+    """ write file_count synthetic VOC xml files into xml_dir for the tests and the benchmarks
+
+    """
+    if not os.path.exists(xml_dir):
+        os.makedirs(xml_dir)
+    names = ['blue', 'yellow', 'red', 'other', 'car', 'truck', 'bus']
+    if len(os.listdir(xml_dir)) < file_count:
+        for i in range(file_count):
+            objects = ''.join(
+                '<object><name>%s</name><pose>Unspecified</pose><truncated>0</truncated><difficult>0</difficult>'
+                '<bndbox><xmin>%d</xmin><ymin>%d</ymin><xmax>%d</xmax><ymax>%d</ymax></bndbox></object>'
+                % (names[(i + j) % len(names)], j * 10, j * 10, j * 10 + 50, j * 10 + 80) for j in range(i % 8 + 1))
+            with open(os.path.join(xml_dir, '%08d.xml' % i), 'w') as f:
+                f.write('<annotation><folder>VOC</folder><filename>%08d.jpg</filename>'
+                        '<size><width>1920</width><height>1080</height><depth>3</depth></size>%s</annotation>' % (i, objects))
+
+def voc_records(count, labels=("person", "car"), start=0):
+    """ (image_name, width, height, detections) records for xml_util.generate_xmls, i % 8 + 1 boxes per image
+
+    """
+    for i in range(start, count):
+        yield ("%08d" % i, 1920, 1080, [[j * 10, j * 10, j * 10 + 50, j * 10 + 80, labels[j % len(labels)]]
+                                       for j in range(i % 8 + 1)])
+
+def write_coco_json(json_file, annotation_count, image_count, category_count=5):
+    """ COCO detections in the detector layout (images, annotations, then categories), boxes are spread
+        over the images out of order and have float coordinates
+
+    """
+    with open(json_file, "w") as f:
+        f.write('{"images": [')
+        f.write(", ".join(json.dumps({"file_name": "%08d.jpg" % i, "height": 1080, "width": 1920, "id": i})
+                          for i in range(image_count)))
+        f.write('], "annotations": [')
+        for i in range(annotation_count):
+            annotation = {"image_id": (i * 7919) % image_count, "bbox": [i % 1800, i % 1000, 50.5, 80.25],
+                          "category_id": i % category_count, "id": i, "score": 0.9}
+            f.write((", " if i > 0 else "") + json.dumps(annotation))
+        f.write('], "categories": ' + json.dumps([{"id": i, "name": "class%d" % i} for i in range(category_count)]) + '}')
+
+def make_roi_frames(frame_dir, frame_count=20, box_count=10, size=(1280, 720), seed=0):
+    """ write frame_count synthetic jpg frames with box_count random boxes that move a little between frames
+
+        :return: [(image path, [(xmin, ymin, xmax, ymax), ...]), ...]
+    """
+    rng = np.random.RandomState(seed)
+    base = rng.randint(0, 256, (size[1] // 8, size[0] // 8, 3)).astype(np.uint8)
+    base = cv2.resize(base, size)
+    centers = rng.rand(box_count, 2) * [size[0] - 200, size[1] - 200] + 100
+    frames = []
+    for i in range(frame_count):
+        image_path = os.path.join(frame_dir, "%06d.jpg" % i)
+        noise = rng.randint(-8, 9, base.shape)
+        cv2.imwrite(image_path, np.clip(base + noise, 0, 255).astype(np.uint8))
+        centers = centers + rng.randn(box_count, 2) * 3
+        rois = [(int(cx - 40), int(cy - 60), int(cx + 40), int(cy + 60)) for cx, cy in centers]
+        frames.append((image_path, rois))
+    return frames
+
+def make_images(image_dir, count=50, size=(1920, 1080), mixed=False, seed=0):
+    """ write count synthetic images, jpg only or alternating jpg/png and color/gray when mixed
+
+        :return: paths of the images in name order
+    """
+    rng = np.random.RandomState(seed)
+    base = cv2.resize(rng.randint(0, 256, (size[1] // 8, size[0] // 8, 3)).astype(np.uint8), size)
+    gray = cv2.cvtColor(base, cv2.COLOR_BGR2GRAY)
+    paths = []
+    for i in range(count):
+        suffix = '.png' if mixed and i % 2 == 1 else '.jpg'
+        path = os.path.join(image_dir, '%06d%s' % (i, suffix))
+        cv2.imwrite(path, gray if mixed and i % 4 >= 2 else base)
+        paths.append(path)
+    return paths
+
+def make_detection_txt(txt_file, box_count, boxes_per_frame=20, labels=('face', 'person', 'car', 'text'), max_coord=1000, seed=0):
+    """ write a detection result txt, one line "xmin,ymin,xmax,ymax,label,score;..." per frame,
+        scores are written in their shortest form like Detection_Result.format_number
+    """
+    rng = np.random.RandomState(seed)
+    with open(txt_file, 'w') as f:
+        for start in range(0, box_count, boxes_per_frame):
+            count = min(boxes_per_frame, box_count - start)
+            boxes = np.sort(rng.randint(0, max_coord, (count, 2, 2)), axis=1).reshape(count, 4)
+            classes = rng.randint(0, len(labels), count)
+            # 0.0001 is the only 4 digit score that format_number writes in scientific notation
+            scores = rng.randint(2, 10000, count)
+            f.write(''.join('%d,%d,%d,%d,%s,%s;' % (b[0], b[1], b[2], b[3], labels[c], ('%.4f' % (s / 10000.0)).rstrip('0').rstrip('.'))
+                            for b, c, s in zip(boxes, classes, scores)) + '\n')
+
+def make_files(src_dir, file_count=2000, file_size=256 * 1024):
+    """ write file_count random files of file_size bytes, every one a different rotation of the same data """
+    if not os.path.exists(src_dir):
+        os.makedirs(src_dir)
+    data = os.urandom(file_size)
+    paths = []
+    for i in range(file_count):
+        path = os.path.join(src_dir, '%06d.jpg' % i)
+        if not os.path.exists(path):
+            with open(path, 'wb') as f:
+                f.write(data[i % file_size:] + data[:i % file_size])
+        paths.append(path)
+    return paths
+
+def make_tree(root_dir, file_count=1000000, files_per_dir=1000, branch=10):
+    """ write file_count empty files, files_per_dir per folder, alternating .jpg and .xml,
+        the folders are nested as a branch-ary tree
+    """
+    dir_count = (file_count + files_per_dir - 1) // files_per_dir
+    for d in range(dir_count):
+        parts = []
+        n = d
+        while True:
+            parts.append('d%d' % (n % branch))
+            n //= branch
+            if n == 0:
+                break
+        dir_path = os.path.join(root_dir, *parts[::-1]) + '_%d' % d
+        os.makedirs(dir_path, exist_ok=True)
+        for i in range(min(files_per_dir, file_count - d * files_per_dir)):
+            open(os.path.join(dir_path, '%08d%s' % (d * files_per_dir + i, '.jpg' if i % 2 == 0 else '.xml')), 'w').close()
+
+def make_pairs(work_dir, pair_count=200000, orphan_every=50):
+    """ write pair_count empty xml/jpg pairs, one in every orphan_every has an xml without its image
+        and another one an image without its xml
+
+        :return: (xml_dir, image_dir)
+    """
+    xml_dir = os.path.join(work_dir, 'xml')
+    image_dir = os.path.join(work_dir, 'image')
+    for path in (xml_dir, image_dir):
+        if not os.path.exists(path):
+            os.makedirs(path)
+    for i in range(pair_count):
+        if i % orphan_every != 1:
+            open(os.path.join(xml_dir, '%08d.xml' % i), 'w').close()
+        if i % orphan_every != 0:
+            open(os.path.join(image_dir, '%08d.jpg' % i), 'w').close()
+    return xml_dir, image_dir
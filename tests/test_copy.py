@@ -0,0 +1,184 @@
+#encoding=utf-8
+import csv
+import os
+import stat
+
+import pytest
+
+from basicFun import COPY
+from tests.synthetic import make_files
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+@pytest.fixture
+def pairs(tmp_path):
+    paths = make_files(str(tmp_path / 'src'), 50, 4096)
+    os.makedirs(str(tmp_path / 'dst'))
+    return [(path, str(tmp_path / 'dst' / os.path.basename(path))) for path in paths]
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_copies_content_and_mtime(pairs, workers):
+    engine = COPY.copy_pairs(pairs, workers=workers, progress=False)
+    for src, dst in pairs:
+        assert read(dst) == read(src)
+        assert os.stat(dst).st_mtime_ns == os.stat(src).st_mtime_ns
+    assert engine.stats['copied'] == 50
+    assert engine.stats['bytes'] == 50 * 4096
+    assert not [name for name in os.listdir(os.path.dirname(pairs[0][1])) if name.endswith('.tmp')]
+
+def test_unchanged_files_are_skipped(pairs):
+    COPY.copy_pairs(pairs, progress=False)
+    src, dst = pairs[3]
+    with open(src, 'ab') as f:
+        f.write(b'x')
+    engine = COPY.copy_pairs(pairs, progress=False)
+    assert engine.stats['copied'] == 1
+    assert engine.stats['skipped'] == 49
+    assert read(dst) == read(src)
+
+def test_skip_hash_ignores_touched_files(pairs):
+    COPY.copy_pairs(pairs, progress=False)
+    os.utime(pairs[0][0], ns=(0, 0))
+    src, dst = pairs[1]
+    with open(dst, 'r+b') as f:
+        f.write(b'changed')
+    os.utime(dst, ns=(os.stat(src).st_atime_ns, os.stat(src).st_mtime_ns))
+    engine = COPY.copy_pairs(pairs, skip='hash', progress=False)
+    assert engine.stats['copied'] == 1
+    assert engine.stats['skipped'] == 49
+    assert read(dst) == read(src)
+
+def test_skip_none_copies_everything(pairs):
+    COPY.copy_pairs(pairs, progress=False)
+    engine = COPY.copy_pairs(pairs, skip=None, progress=False)
+    assert engine.stats['copied'] == 50
+    assert engine.stats['skipped'] == 0
+
+def test_repeated_destination_keeps_the_last_source(pairs, tmp_path):
+    dst = str(tmp_path / 'dst' / 'same.jpg')
+    engine = COPY.copy_pairs([(src, dst) for src, _ in pairs], workers=4, progress=False)
+    assert read(dst) == read(pairs[-1][0])
+    assert engine.stats['copied'] == 1
+
+def test_preserve_mode(pairs):
+    src, dst = pairs[0]
+    os.chmod(src, 0o600)
+    COPY.copy_pairs(pairs[:1], preserve_mode=True, progress=False)
+    assert stat.S_IMODE(os.stat(dst).st_mode) == 0o600
+
+def test_errors_ignore_records_failures(pairs, tmp_path):
+    missing = (str(tmp_path / 'src' / 'missing.jpg'), str(tmp_path / 'dst' / 'missing.jpg'))
+    engine = COPY.copy_pairs(pairs + [missing], errors='ignore', progress=False)
+    assert engine.stats['copied'] == 50
+    assert engine.stats['failed'] == 1
+    assert [(src, dst) for src, dst, exception in engine.failures] == [missing]
+    assert isinstance(engine.failures[0][2], FileNotFoundError)
+    assert not os.path.exists(missing[1])
+
+def test_errors_raise(pairs, tmp_path):
+    missing = (str(tmp_path / 'src' / 'missing.jpg'), str(tmp_path / 'dst' / 'missing.jpg'))
+    with pytest.raises(FileNotFoundError):
+        COPY.copy_pairs([missing] + pairs, progress=False)
+
+def test_copy_file_returns_size(pairs):
+    src, dst = pairs[0]
+    assert COPY.copy_file(src, dst) == 4096
+    assert read(dst) == read(src)
+
+def read_manifest(path):
+    with open(path, 'r', newline='') as f:
+        return list(csv.reader(f))
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_hardlink(pairs, workers):
+    engine = COPY.copy_pairs(pairs, workers=workers, progress=False, mode='hardlink')
+    for src, dst in pairs:
+        assert os.path.samefile(src, dst)
+    assert engine.stats['hardlink'] == 50
+    assert engine.stats['bytes'] == 0
+    again = COPY.copy_pairs(pairs, progress=False, mode='hardlink')
+    assert again.stats['skipped'] == 50
+
+def test_symlink(pairs):
+    engine = COPY.copy_pairs(pairs, progress=False, mode='symlink')
+    for src, dst in pairs:
+        assert os.path.islink(dst)
+        assert os.readlink(dst) == os.path.abspath(src)
+        assert read(dst) == read(src)
+    assert engine.stats['symlink'] == 50
+    again = COPY.copy_pairs(pairs, progress=False, mode='symlink')
+    assert again.stats['skipped'] == 50
+
+def test_reflink_falls_back_to_copy(pairs):
+    # reflink is only supported on btrfs/xfs, anywhere else every file is copied
+    engine = COPY.copy_pairs(pairs, progress=False, mode='reflink')
+    for src, dst in pairs:
+        assert read(dst) == read(src)
+        assert not os.path.samefile(src, dst)
+    assert engine.stats['reflink'] + engine.stats['copied'] == 50
+
+def test_copy_over_links_does_not_write_to_the_source(pairs):
+    COPY.copy_pairs(pairs[:2], progress=False, mode='symlink')
+    COPY.copy_pairs(pairs[2:4], progress=False, mode='hardlink')
+    sources = [read(src) for src, dst in pairs[:4]]
+    with open(pairs[0][0], 'r+b') as f:
+        f.write(b'changed')
+    engine = COPY.copy_pairs(pairs[:4], progress=False)
+    # the symlink is replaced by a copy even when it still resolves to an unchanged file, the hardlink is already the same file
+    assert engine.stats['copied'] == 2
+    assert engine.stats['skipped'] == 2
+    for src, dst in pairs[:4]:
+        assert not os.path.islink(dst)
+        assert read(dst) == read(src)
+    assert [read(src) for src, dst in pairs[1:4]] == sources[1:]
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        COPY.CopyEngine(mode='move')
+
+def test_manifest_records_the_method(pairs, tmp_path):
+    missing = (str(tmp_path / 'src' / 'missing.jpg'), str(tmp_path / 'dst' / 'missing.jpg'))
+    manifest = str(tmp_path / 'manifest.csv')
+    COPY.copy_pairs(pairs[:5], progress=False, mode='symlink')
+    COPY.copy_pairs(pairs + [missing], progress=False, mode='symlink', errors='ignore', manifest=manifest)
+    rows = read_manifest(manifest)
+    assert rows[0] == ['src', 'dst', 'method']
+    assert rows[1:] == [[src, dst, 'skipped' if i < 5 else 'symlink'] for i, (src, dst) in enumerate(pairs)] + [list(missing) + ['failed']]
+
+def stale_copy(pairs):
+    """ a destination with the size and mtime of its source but other content """
+    src, dst = pairs[0]
+    with open(dst, 'wb') as f:
+        f.write(b'\0' * os.path.getsize(src))
+    os.utime(dst, ns=(os.stat(src).st_atime_ns, os.stat(src).st_mtime_ns))
+    return src, dst
+
+def test_copy_utilities_overwrite_by_default(pairs, tmp_path, capsys):
+    file_util = pytest.importorskip("file_util")
+    image_util = pytest.importorskip("image_util")
+    src_dir = os.path.dirname(pairs[0][0])
+    dst_dir = os.path.dirname(pairs[0][1])
+    COPY.copy_pairs(pairs[1:], progress=False)
+    src, dst = stale_copy(pairs)
+    file_util.copy_files(src_dir, dst_dir)
+    assert read(dst) == read(src)
+    assert 'Success: 50 files have been copied.' in capsys.readouterr().out
+    src, dst = stale_copy(pairs)
+    file_util.copy_files(src_dir, dst_dir, skip='mtime')
+    assert read(dst) != read(src)
+    # only the files actually copied are reported
+    assert 'Success: 0 files have been copied.' in capsys.readouterr().out
+    file_util.multiple_folders_to_one(src_dir, dst_dir)
+    assert read(dst) == read(src)
+    assert 'Success: 50 files have been processed.' in capsys.readouterr().out
+    xml_dir = tmp_path / 'xml'
+    xml_dir.mkdir()
+    for name in ['000000.xml', '000001.xml']:
+        (xml_dir / name).write_text('<annotation/>')
+    src, dst = stale_copy(pairs)
+    assert image_util.copy_image_by_xml(str(xml_dir), src_dir, dst_dir, skip='mtime') == 0
+    assert read(dst) != read(src)
+    assert image_util.copy_image_by_xml(str(xml_dir), src_dir, dst_dir) == 2
+    assert read(dst) == read(src)
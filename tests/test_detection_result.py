@@ -0,0 +1,109 @@
+#encoding=utf-8
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("file_util")
+from Detection_Result import Detection_Result
+from file_util import read_detection_result_from_txt
+from tests.synthetic import make_detection_txt
+
+def assert_same_result(a, b):
+    assert len(a) == len(b)
+    np.testing.assert_array_equal(a.offsets, b.offsets)
+    for (boxes, labels, scores), (other_boxes, other_labels, other_scores) in zip(a, b):
+        np.testing.assert_array_equal(boxes, other_boxes)
+        assert list(labels) == list(other_labels)
+        np.testing.assert_array_equal(scores, other_scores)
+    assert list(a.names) == list(b.names)
+
+@pytest.fixture
+def txt_file(tmp_path):
+    path = str(tmp_path / 'result.txt')
+    make_detection_txt(path, 2000, boxes_per_frame=7)
+    with open(path, 'a') as f:
+        f.write('\n') # a frame without detections
+    return path
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_txt_binary_txt_round_trip(txt_file, tmp_path, mmap):
+    result = Detection_Result.from_txt(txt_file)
+    bin_file = str(tmp_path / 'result.det')
+    result.save(bin_file)
+    opened = Detection_Result.open(bin_file, mmap=mmap)
+    assert_same_result(opened, result)
+    legacy = read_detection_result_from_txt(txt_file)
+    assert len(opened) == len(legacy) == 287
+    for i in range(len(opened)):
+        assert opened.frame_fields(i) == legacy[i]
+    txt_copy = str(tmp_path / 'copy.txt')
+    opened.to_txt(txt_copy)
+    with open(txt_file) as a, open(txt_copy) as b:
+        assert a.read() == b.read()
+
+def test_xml_round_trip(txt_file, tmp_path):
+    result = Detection_Result.from_txt(txt_file)
+    xml_dir = tmp_path / 'xml'
+    xml_dir.mkdir()
+    sizes = np.tile([[1920, 1080]], (len(result), 1))
+    assert result.to_xml_dir(str(xml_dir), sizes, workers=2) == len(result)
+    xml_result, xml_sizes = Detection_Result.from_xml_dir(str(xml_dir))
+    np.testing.assert_array_equal(xml_sizes, sizes)
+    assert list(xml_result.names) == ['%06d' % i for i in range(len(result))]
+    assert len(xml_result) == len(result)
+    for (boxes, labels, scores), (xml_boxes, xml_labels, xml_scores) in zip(result, xml_result):
+        np.testing.assert_array_equal(boxes, xml_boxes)
+        assert list(labels) == list(xml_labels)
+        assert (xml_scores == 1).all()
+    # xml -> binary -> xml keeps everything
+    bin_file = str(tmp_path / 'xml.det')
+    xml_result.save(bin_file)
+    assert_same_result(Detection_Result.open(bin_file), xml_result)
+
+@pytest.mark.parametrize("labels, names", [([], []), ([''], []), ([], ['']), (['', 'car'], ['', 'b']), (['红色'], ['图片'])])
+def test_tables_with_empty_strings(tmp_path, labels, names):
+    # one box per label, all of them in the last frame, one frame per name
+    frame_count = max(len(names), 1)
+    result = Detection_Result(np.array([0] * frame_count + [len(labels)], dtype=np.int64),
+                              np.arange(4 * len(labels), dtype=np.float32).reshape(-1, 4),
+                              np.ones(len(labels), dtype=np.float32),
+                              np.arange(len(labels), dtype=np.int32),
+                              np.array(labels, dtype=str), np.array(names, dtype=str))
+    path = str(tmp_path / 'tables.det')
+    result.save(path)
+    opened = Detection_Result.open(path)
+    assert list(opened.labels) == labels
+    assert list(opened.names) == names
+    assert_same_result(opened, result)
+
+def test_newline_in_a_label_is_rejected(tmp_path):
+    result = Detection_Result.from_frames([([[1, 2, 3, 4]], ['a\nb'], [0.5])])
+    with pytest.raises(ValueError):
+        result.save(str(tmp_path / 'bad.det'))
+
+def test_not_a_detection_result_file(tmp_path):
+    path = str(tmp_path / 'other.det')
+    with open(path, 'wb') as f:
+        f.write(b'\0' * 64)
+    with pytest.raises(ValueError):
+        Detection_Result.open(path)
+
+def test_negative_and_out_of_range_index(txt_file, tmp_path):
+    result = Detection_Result.from_txt(txt_file)
+    path = str(tmp_path / 'result.det')
+    result.save(path)
+    for frames in [result, Detection_Result.open(path)]:
+        for i in [1, len(frames) - 1]:
+            boxes, labels, scores = frames[i - len(frames)]
+            other_boxes, other_labels, other_scores = frames[i]
+            np.testing.assert_array_equal(boxes, other_boxes)
+            assert list(labels) == list(other_labels)
+            np.testing.assert_array_equal(scores, other_scores)
+        # the last frame is the empty line, the one before it has the 2000 % 7 remaining boxes
+        assert len(frames[-1][0]) == 0 and len(frames[-2][0]) == 5
+        for i in [len(frames), -len(frames) - 1]:
+            with pytest.raises(IndexError):
+                frames[i]
+    with pytest.raises(IndexError):
+        Detection_Result.from_frames([])[0]
@@ -0,0 +1,196 @@
+#encoding=utf-8
+import base64
+import os
+import threading
+
+import pytest
+
+from basicFun.DOWNLOAD import Downloader
+from tests.fake_image_server import FakeImageServer
+
+@pytest.fixture
+def server():
+    server = FakeImageServer(image_count=60, image_size=4096, per_page=30, duplicate_every=10).start()
+    yield server
+    server.stop()
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def items(server, save_dir, indexes):
+    return [('%s/img/%d.jpg' % (server.url, i), str(save_dir / ('%03d.jpg' % i))) for i in indexes]
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_download_all_saves_every_image(tmp_path, workers):
+    server = FakeImageServer(image_count=40, image_size=4096, duplicate_every=0).start()
+    try:
+        downloader = Downloader(workers=workers, per_host=workers)
+        jobs = items(server, tmp_path, range(40))
+        results = downloader.download_all(jobs)
+        downloader.close()
+    finally:
+        server.stop()
+    assert results == [path for url, path in jobs]
+    for i, path in enumerate(results):
+        assert read(path) == server.image(i)
+    assert downloader.stats['downloaded'] == 40
+    assert downloader.stats['bytes'] == 40 * len(server.image(1))
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.part')]
+
+def test_same_content_is_saved_once(server, tmp_path):
+    downloader = Downloader(workers=4)
+    jobs = items(server, tmp_path, range(30))
+    results = downloader.download_all(jobs)
+    downloader.close()
+    # 0, 10 and 20 serve the same bytes, the later ones point at whichever finished first
+    first = [results[i] for i in (0, 10, 20)]
+    assert len(set(first)) == 1 and first[0] in [jobs[i][1] for i in (0, 10, 20)]
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(path) for path in set(results))
+    for i, path in enumerate(results):
+        assert read(path) == server.image(i)
+    assert downloader.stats['downloaded'] == 28
+    assert downloader.stats['duplicates'] == 2
+
+def test_repeated_url_is_downloaded_once(server, tmp_path):
+    downloader = Downloader(workers=4)
+    url = server.url + '/img/3.jpg'
+    jobs = [(url, str(tmp_path / ('%d.jpg' % i))) for i in range(8)]
+    results = downloader.download_all(jobs)
+    downloader.close()
+    assert len(set(results)) == 1
+    assert os.listdir(tmp_path) == [os.path.basename(results[0])]
+    assert read(results[0]) == server.image(3)
+    assert downloader.stats['downloaded'] == 1
+    assert downloader.stats['duplicates'] == 7
+    assert server.requests == 1
+
+def test_without_dedupe_every_item_is_saved(server, tmp_path):
+    downloader = Downloader(workers=4, dedupe=False)
+    jobs = items(server, tmp_path, range(30)) + [(server.url + '/img/3.jpg', str(tmp_path / 'again.jpg'))]
+    results = downloader.download_all(jobs)
+    downloader.close()
+    assert results == [path for url, path in jobs]
+    assert read(str(tmp_path / 'again.jpg')) == server.image(3)
+    assert downloader.stats['downloaded'] == 31
+    assert downloader.stats['duplicates'] == 0
+
+@pytest.mark.parametrize("dedupe", [False, True])
+def test_concurrent_downloads_to_one_path(tmp_path, dedupe):
+    server = FakeImageServer(image_count=16, image_size=256 * 1024, duplicate_every=0).start()
+    try:
+        downloader = Downloader(workers=8, per_host=8, dedupe=dedupe, chunk_size=1024)
+        path = str(tmp_path / 'same.jpg')
+        results = downloader.download_all([('%s/img/%d.jpg' % (server.url, i), path) for i in range(16)])
+        downloader.close()
+    finally:
+        server.stop()
+    assert results == [path] * 16
+    assert read(path) in [server.image(i) for i in range(16)]
+    assert os.listdir(str(tmp_path)) == ['same.jpg']
+
+def test_5xx_is_retried(tmp_path):
+    server = FakeImageServer(image_count=20, image_size=1024, duplicate_every=0, fail_every=5).start()
+    try:
+        downloader = Downloader(workers=4, backoff=0.01)
+        jobs = items(server, tmp_path, range(20))
+        results = downloader.download_all(jobs)
+        downloader.close()
+    finally:
+        server.stop()
+    assert results == [path for url, path in jobs]
+    for i, path in enumerate(results):
+        assert read(path) == server.image(i)
+    assert downloader.stats['retries'] == 4
+    assert downloader.stats['failed'] == 0
+
+def test_4xx_is_not_retried(server, tmp_path):
+    downloader = Downloader(retries=3, backoff=0.01)
+    assert downloader.download(server.url + '/img/999.jpg', str(tmp_path / 'missing.jpg')) is None
+    downloader.close()
+    assert downloader.stats['failed'] == 1
+    assert downloader.stats['retries'] == 0
+    assert server.requests == 1
+    assert os.listdir(tmp_path) == []
+
+def test_failure_after_retries_returns_none(tmp_path):
+    downloader = Downloader(retries=2, backoff=0.01, timeout=1)
+    # nothing listens on a port that was just released
+    server = FakeImageServer().start()
+    url = server.url + '/img/1.jpg'
+    server.stop()
+    assert downloader.download(url, str(tmp_path / '1.jpg')) is None
+    downloader.close()
+    assert downloader.stats['failed'] == 1
+    assert downloader.stats['retries'] == 2
+    assert os.listdir(tmp_path) == []
+
+def test_waiting_callers_share_a_failure(server, tmp_path):
+    downloader = Downloader(retries=0)
+    url = server.url + '/img/999.jpg'
+    started = threading.Event()
+    release = threading.Event()
+    download_file = downloader.download_file
+    def slow_download_file(url, save_path):
+        started.set()
+        release.wait(5)
+        return download_file(url, save_path)
+    downloader.download_file = slow_download_file
+    first = downloader.submit(url, str(tmp_path / 'a.jpg'))
+    started.wait(5)
+    # the url is in flight now, this call waits for the first one
+    threading.Timer(0.1, release.set).start()
+    assert downloader.download(url, str(tmp_path / 'b.jpg')) is None
+    assert first.result() is None
+    # the failed url is forgotten, a later call tries again
+    assert url not in downloader.urls
+    downloader.close()
+    assert server.requests == 1
+    assert downloader.stats['duplicates'] == 0
+
+def test_redirect_is_followed(server, tmp_path):
+    downloader = Downloader()
+    path = downloader.download(server.url + '/redirect/7.jpg', str(tmp_path / '7.jpg'))
+    downloader.close()
+    assert path == str(tmp_path / '7.jpg')
+    assert read(path) == server.image(7)
+    assert server.requests == 2
+
+def test_fetch_returns_the_body(server):
+    downloader = Downloader()
+    page = downloader.fetch(server.url + '/search/index?word=cat&pn=31').decode('utf-8')
+    downloader.close()
+    assert page.count('thumbURL') == 30
+    assert '/img/30.jpg' in page and '/img/59.jpg' in page
+
+def test_crawler_saves_deduped_images(server, tmp_path):
+    image_util = pytest.importorskip("image_util")
+    count = image_util.crawler_image_from_baidu(str(tmp_path), 'cat', page_count=2, workers=4,
+        base_url=server.url + '/search/index?word=')
+    # 60 images, 0/10/.../50 share their content
+    assert count == 55
+    names = sorted(os.listdir(str(tmp_path / 'cat')))
+    assert len(names) == 55
+    contents = set(read(str(tmp_path / 'cat' / name)) for name in names)
+    assert contents == set(server.image(i) for i in range(60))
+
+def test_userinfo_is_sent_as_basic_auth(server, tmp_path):
+    downloader = Downloader()
+    host = server.url[len('http://'):]
+    path = downloader.download('http://user:p%%40ss@%s/img/5.jpg' % host, str(tmp_path / '5.jpg'))
+    downloader.close()
+    assert read(path) == server.image(5)
+    assert server.authorizations == ['Basic ' + base64.b64encode(b'user:p@ss').decode('ascii')]
+
+def test_other_schemes_go_through_urllib(tmp_path):
+    src = tmp_path / 'src.jpg'
+    src.write_bytes(b'local image')
+    downloader = Downloader(retries=0)
+    assert read(downloader.download(src.as_uri(), str(tmp_path / 'a.jpg'))) == b'local image'
+    assert read(downloader.download('data:image/jpeg;base64,' + base64.b64encode(b'inline').decode('ascii'), str(tmp_path / 'b.jpg'))) == b'inline'
+    assert downloader.download(str(src), str(tmp_path / 'c.jpg')) is None
+    assert downloader.download((tmp_path / 'missing.jpg').as_uri(), str(tmp_path / 'd.jpg')) is None
+    downloader.close()
+    assert downloader.stats['downloaded'] == 2
+    assert downloader.stats['failed'] == 2
+    assert sorted(os.listdir(str(tmp_path))) == ['a.jpg', 'b.jpg', 'src.jpg']
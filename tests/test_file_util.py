@@ -0,0 +1,84 @@
+#encoding=utf-8
+import os
+
+import numpy as np
+import pytest
+
+file_util = pytest.importorskip("file_util")
+from tests.synthetic import make_detection_txt
+
+def write_lines(path, lines, newline='\n'):
+    with open(path, 'w', newline='') as f:
+        f.write(newline.join(lines))
+
+def assert_same_frames(typed, fields):
+    boxes, labels, scores = typed
+    assert boxes.shape == (len(fields), 4)
+    np.testing.assert_array_equal(boxes, np.array([f[:4] for f in fields], dtype=np.float32).reshape(-1, 4))
+    assert list(labels) == [f[-2] for f in fields]
+    np.testing.assert_array_equal(scores, np.array([f[-1] for f in fields], dtype=np.float32))
+
+@pytest.fixture
+def txt_file(tmp_path):
+    path = str(tmp_path / 'result.txt')
+    make_detection_txt(path, 200, boxes_per_frame=7)
+    with open(path, 'a') as f:
+        f.write('\n1,2,3,4,face,0.5;') # a frame without detections and a last line without a newline
+    return path
+
+def test_readers_match_the_full_read_on_every_frame(txt_file):
+    legacy = file_util.read_detection_result_from_txt(txt_file)
+    assert len(legacy) == 31
+    assert legacy[-2] == [] and legacy[-1] == [['1', '2', '3', '4', 'face', '0.5']]
+    assert list(file_util.iter_detection_results(txt_file, typed=False)) == legacy
+    for typed, fields in zip(file_util.iter_detection_results(txt_file), legacy):
+        assert_same_frames(typed, fields)
+    for typed_flag in [False, True]:
+        reader = file_util.DetectionResultReader(txt_file, typed=typed_flag)
+        assert len(reader) == len(legacy)
+        for i in list(range(len(legacy))) + [-1, -len(legacy)]:
+            if typed_flag:
+                assert_same_frames(reader[i], legacy[i])
+            else:
+                assert reader[i] == legacy[i]
+        assert len(list(reader)) == len(legacy)
+        with pytest.raises(IndexError):
+            reader[len(legacy)]
+
+def test_line_index(tmp_path):
+    path = str(tmp_path / 'lines.txt')
+    write_lines(path, ['ab', '', 'c'])
+    np.testing.assert_array_equal(file_util.build_line_index(path), [0, 3, 4, 5])
+    np.testing.assert_array_equal(file_util.build_line_index(path, chunk_size=2), [0, 3, 4, 5])
+    write_lines(path, ['ab', ''])
+    np.testing.assert_array_equal(file_util.build_line_index(path), [0, 3])
+
+def test_crlf_file(tmp_path):
+    path = str(tmp_path / 'crlf.txt')
+    write_lines(path, ['1,2,3,4,a,0.5;5,6,7,8,b,0.25;', '9,9,9,9,c,1;', ''], newline='\r\n')
+    reader = file_util.DetectionResultReader(path, typed=False)
+    assert [reader[i] for i in range(len(reader))] == file_util.read_detection_result_from_txt(path)
+
+def test_index_is_rebuilt_when_the_txt_changes(txt_file):
+    reader = file_util.DetectionResultReader(txt_file)
+    assert os.path.exists(txt_file + '.idx.npy')
+    with open(txt_file, 'a') as f:
+        f.write('\n5,6,7,8,car,0.25;\n')
+    later = os.path.getmtime(txt_file + '.idx.npy') + 10
+    os.utime(txt_file, (later, later))
+    reader = file_util.DetectionResultReader(txt_file, typed=False)
+    assert len(reader) == 32
+    assert reader[-1] == [['5', '6', '7', '8', 'car', '0.25']]
+
+@pytest.mark.parametrize("encoding", [None, 'gbk', 'utf-8'])
+def test_random_access_and_iteration_decode_alike(tmp_path, monkeypatch, encoding):
+    path = str(tmp_path / 'labels.txt')
+    lines = [u'1,2,3,4,行人,0.5;', u'5,6,7,8,汽车,0.25;']
+    with open(path, 'w', encoding=encoding or 'gbk') as f:
+        f.write('\n'.join(lines) + '\n')
+    # a gbk locale, the default of open() the reader has to follow
+    monkeypatch.setattr(file_util.locale, 'getpreferredencoding', lambda do_setlocale=True: 'gbk')
+    reader = file_util.DetectionResultReader(path, typed=False, encoding=encoding)
+    assert reader.encoding == (encoding or 'gbk')
+    assert [reader[i] for i in range(len(reader))] == list(reader)
+    assert reader[1] == [['5', '6', '7', '8', u'\u6c7d\u8f66', '0.25']]
@@ -0,0 +1,92 @@
+#encoding=utf-8
+import os
+
+import pytest
+
+from basicFun import FILES
+from tests.reference import list_all_files_listdir
+from tests.synthetic import make_files, make_tree
+
+@pytest.fixture
+def tree(tmp_path):
+    root = str(tmp_path / 'tree')
+    make_tree(root, 2000, 30, branch=3)
+    # files right under the root and an upper case suffix
+    open(os.path.join(root, 'top.JPG'), 'w').close()
+    open(os.path.join(root, 'top.txt'), 'w').close()
+    return root
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_list_all_files_matches_listdir_walk(tree, workers):
+    reference = list_all_files_listdir(tree)
+    assert len(reference) == 2002
+    assert FILES.list_all_files(tree, workers=workers) == reference
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_suffixes_ignore_case(tree, workers):
+    paths = FILES.list_all_filePaths(tree, suffixes=('.jpg',), workers=workers)
+    expected = [name for name in list_all_files_listdir(tree) if name.lower().endswith('.jpg')]
+    assert [os.path.basename(path) for path in paths] == expected
+    assert all(os.path.isfile(path) for path in paths)
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_dirs_are_listed_before_their_files(tree, workers):
+    entries = list(FILES.scan_entries(tree, dirs=True, workers=workers))
+    seen = set([tree])
+    for entry in entries:
+        assert os.path.dirname(entry.path) in seen
+        if entry.is_dir():
+            seen.add(entry.path)
+    expected_dirs = set(os.path.join(root, name) for root, dirs, files in os.walk(tree) for name in dirs)
+    assert seen - set([tree]) == expected_dirs
+
+def test_not_recursive(tree):
+    assert sorted(entry.name for entry in FILES.scan_entries(tree, recursive=False, workers=4)) == ['top.JPG', 'top.txt']
+
+@pytest.mark.parametrize("followlinks", [True, False])
+def test_followlinks(tmp_path, followlinks):
+    root = tmp_path / 'root'
+    target = tmp_path / 'target'
+    make_files(str(target), 3, 16)
+    os.makedirs(str(root))
+    os.symlink(str(target), str(root / 'link'))
+    names = [entry.name for entry in FILES.scan_entries(str(root), followlinks=followlinks)]
+    assert sorted(names) == (['000000.jpg', '000001.jpg', '000002.jpg'] if followlinks else [])
+
+def test_first_level_matches_os_walk(tree):
+    walked = next(os.walk(tree))
+    assert FILES.first_level(tree) == (walked[1], walked[2])
+    assert FILES.get_sub_dirs(tree) == walked[1]
+    assert FILES.get_files(tree) == walked[2]
+    assert FILES.get_sorted_files(tree) == ['top.JPG', 'top.txt']
+
+def test_missing_folder_is_empty(tmp_path):
+    assert FILES.first_level(str(tmp_path / 'missing')) == ([], [])
+
+def test_copy_files_refer_dir(tmp_path):
+    src_dir = str(tmp_path / 'src')
+    refer_dir = str(tmp_path / 'refer')
+    tar_dir = str(tmp_path / 'tar')
+    make_files(src_dir, 5, 64)
+    os.makedirs(refer_dir)
+    os.makedirs(tar_dir)
+    for name in ['000001.xml', '000003.xml', '000009.xml']:
+        open(os.path.join(refer_dir, name), 'w').close()
+    stats = FILES.copy_files_refer_dir(src_dir, '.jpg', refer_dir, tar_dir)
+    # the missing 000009.jpg is ignored
+    assert stats['copied'] == 2 and stats['failed'] == 1
+    assert sorted(os.listdir(tar_dir)) == ['000001.jpg', '000003.jpg']
+
+def test_shutil_by_refer(tmp_path):
+    src_dir = str(tmp_path / 'src')
+    refer_dir = str(tmp_path / 'refer')
+    tar_dir = str(tmp_path / 'tar')
+    make_files(src_dir, 5, 64)
+    os.makedirs(refer_dir)
+    os.makedirs(tar_dir)
+    for name in ['000000.xml', '000004.xml', 'notes.txt']:
+        open(os.path.join(refer_dir, name), 'w').close()
+    stats = FILES.shutil_by_refer(refer_dir, '.xml', '.jpg', src_dir, tar_dir, mode='hardlink')
+    assert stats['hardlink'] == 2
+    assert sorted(os.listdir(tar_dir)) == ['000000.jpg', '000004.jpg']
+    assert os.path.samefile(os.path.join(src_dir, '000004.jpg'), os.path.join(tar_dir, '000004.jpg'))
@@ -0,0 +1,106 @@
+#encoding=utf-8
+import numpy as np
+import pytest
+
+from basicFun import IMG
+from tests.synthetic import make_roi_frames
+from tests.reference import get_LBP_featrue_loop, gray2array_ave_loop, gray2array_raw_loop
+
+def random_crops(count, height, width, seed=0, levels=256):
+    rng = np.random.RandomState(seed)
+    # few levels give many equal neighbours, the comparison is strict
+    return (rng.randint(0, levels, (count, height, width, 3)) * (255 // max(levels - 1, 1))).astype(np.uint8)
+
+@pytest.mark.parametrize("height, width", [(1, 1), (1, 7), (7, 1), (2, 2), (3, 5), (64, 128), (128, 64)])
+@pytest.mark.parametrize("levels", [2, 256])
+def test_LBP_matches_the_loop_on_every_crop(height, width, levels):
+    crops = random_crops(5, height, width, seed=height * 1000 + width, levels=levels)
+    for crop in crops:
+        expected = get_LBP_featrue_loop(crop)
+        actual = IMG.get_LBP_featrue(crop)
+        assert actual.dtype == np.uint8
+        np.testing.assert_array_equal(actual, expected)
+    np.testing.assert_array_equal(IMG.get_LBP_featrue_batch(crops), np.stack([get_LBP_featrue_loop(crop) for crop in crops]))
+
+def test_LBP_flat_and_single_peak():
+    flat = np.full((4, 4, 3), 100, dtype=np.uint8)
+    assert not IMG.get_LBP_featrue(flat).any()
+    peak = flat.copy()
+    peak[1, 1] = 200
+    feature = IMG.get_LBP_featrue(peak)
+    np.testing.assert_array_equal(feature, get_LBP_featrue_loop(peak))
+    # (0, 0) sees the peak at its (1, 1) neighbour, bit 3 counting from the lowest
+    assert feature[0, 0] == 1 << 3
+    assert feature[1, 1] == 0
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.int32, np.float32, np.float64])
+def test_gray2array_matches_the_loop_on_every_image(dtype):
+    rng = np.random.RandomState(1)
+    grays = [rng.randint(0, 256, (h, w)).astype(dtype) for h, w in [(1, 1), (1, 9), (9, 1), (64, 64), (64, 128)]]
+    grays.append(np.full((8, 8), 255, dtype=dtype))
+    for gray in grays:
+        np.testing.assert_array_equal(IMG.gray2array_ave(gray), gray2array_ave_loop(gray))
+        np.testing.assert_array_equal(IMG.gray2array_raw(gray), gray2array_raw_loop(gray))
+
+def test_gray2array_ave_batch_matches_per_image():
+    grays = np.random.RandomState(2).randint(0, 256, (6, 16, 32)).astype(np.uint8)
+    batch = IMG.gray2array_ave_batch(grays)
+    assert batch.shape == (6, 16 * 32)
+    for row, gray in zip(batch, grays):
+        np.testing.assert_array_equal(row, IMG.gray2array_ave(gray))
+
+def test_cos_matrix_matches_pairwise_cos():
+    rng = np.random.RandomState(3)
+    base = rng.randint(0, 256, (5, 64, 64)).astype(np.uint8)
+    check = np.concatenate([base[:2], rng.randint(0, 256, (4, 64, 64)).astype(np.uint8)])
+    matrix = IMG.cos_matrix(base, check)
+    assert matrix.shape == (5, 6)
+    for i, a in enumerate(base):
+        for j, b in enumerate(check):
+            assert matrix[i, j] == pytest.approx(IMG.cos(gray2array_ave_loop(a), gray2array_ave_loop(b)), abs=1e-12)
+    np.testing.assert_allclose(np.diag(matrix[:2, :2]), 1.0)
+    features = IMG.gray2array_ave_batch(base)
+    np.testing.assert_allclose(IMG.cos_features(features, features), IMG.cos_matrix(base, base))
+
+@pytest.fixture(scope="module")
+def roi_frames(tmp_path_factory):
+    return make_roi_frames(str(tmp_path_factory.mktemp('frames')), frame_count=6, box_count=3, size=(320, 240))
+
+def expected_sequence(frames):
+    return [np.array([[IMG.img_cos_for_labels(frames[i - 1][0], frames[i][0], a, b) for b in frames[i][1]]
+                      for a in frames[i - 1][1]]) for i in range(1, len(frames))]
+
+@pytest.mark.parametrize("workers, window, max_bytes", [(1, None, 256 * 1024 * 1024), (4, 2, 256 * 1024 * 1024),
+                                                        (2, 1, 2 * 64 * 64 * 8), (2, 3, 0)])
+def test_roi_cos_engine_matches_img_cos_for_labels(roi_frames, workers, window, max_bytes):
+    expected = expected_sequence(roi_frames)
+    engine = IMG.RoiCosEngine(workers=workers, window=window, max_bytes=max_bytes)
+    for _ in range(2):
+        matrices = engine.similarity_sequence(roi_frames)
+        assert len(matrices) == len(expected)
+        for actual, wanted in zip(matrices, expected):
+            np.testing.assert_allclose(actual, wanted, rtol=0, atol=1e-9)
+        assert engine.bytes <= max_bytes
+        assert engine.bytes == sum(feature.nbytes for feature in engine.features.values())
+
+def test_roi_cos_engine_similarity_and_get(roi_frames):
+    (base_path, base_rois), (check_path, check_rois) = roi_frames[0], roi_frames[1]
+    engine = IMG.RoiCosEngine(workers=2)
+    np.testing.assert_allclose(engine.similarity(base_path, check_path, base_rois, check_rois), expected_sequence(roi_frames[:2])[0],
+                               rtol=0, atol=1e-9)
+    assert engine.get(base_path, []).shape == (0, 64 * 64)
+    features = engine.get(base_path, base_rois + base_rois[:1])
+    np.testing.assert_array_equal(features[0], features[-1])
+    assert len(engine.features) == len(base_rois) + len(check_rois)
+    engine.clear()
+    assert engine.bytes == 0 and len(engine.features) == 0
+
+def test_iter_similarity_sequence_is_lazy(roi_frames):
+    pulled = []
+    def frames():
+        for frame in roi_frames:
+            pulled.append(frame)
+            yield frame
+    sequence = IMG.RoiCosEngine(workers=1, window=2).iter_similarity_sequence(frames())
+    next(sequence)
+    assert len(pulled) == 2
@@ -0,0 +1,70 @@
+#encoding=utf-8
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from basicFun import IMGCACHE
+from tests.synthetic import make_images
+
+@pytest.fixture
+def images(tmp_path):
+    return make_images(str(tmp_path), count=4, size=(64, 48), mixed=True)
+
+def test_cached_reads_match_the_uncached_ones(images):
+    cache = IMGCACHE.ImageCache()
+    for path in images:
+        for _ in range(2):
+            img = IMGCACHE.imread(path, cache)
+            np.testing.assert_array_equal(img, cv2.imread(path))
+            assert not img.flags.writeable
+            assert np.array_equal(np.asarray(IMGCACHE.open_image(path, cache)), np.asarray(IMGCACHE.open_image(path)))
+            assert IMGCACHE.probe_image(path, cache) == IMGCACHE.probe_image(path)
+    assert cache.stats['misses'] == 3 * len(images)
+    assert cache.stats['hits'] == 3 * len(images)
+    assert IMGCACHE.imread(images[0], True) is IMGCACHE.get_cache().imread(images[0])
+
+def test_modified_file_is_read_again(images):
+    cache = IMGCACHE.ImageCache()
+    path = images[0]
+    first = cache.imread(path)
+    cv2.imwrite(path, np.zeros((10, 20, 3), dtype=np.uint8))
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10 ** 9))
+    second = cache.imread(path)
+    assert first.shape == (48, 64, 3)
+    assert second.shape == (10, 20, 3)
+
+def test_eviction_keeps_bytes_under_the_limit(images):
+    nbytes = 64 * 48 * 3
+    cache = IMGCACHE.ImageCache(max_bytes=2 * nbytes)
+    for path in images:
+        cache.imread(path)
+        assert cache.bytes <= cache.max_bytes
+    assert len(cache.entries) == 2
+    assert cache.stats['evictions'] == len(images) - 2
+    cache.set_max_bytes(nbytes - 1)
+    assert len(cache.entries) == 0 and cache.bytes == 0
+    cache.imread(images[0])
+    assert len(cache.entries) == 0
+
+def test_missing_file_is_not_cached(tmp_path):
+    cache = IMGCACHE.ImageCache()
+    assert cache.imread(str(tmp_path / 'missing.jpg')) is None
+    assert len(cache.entries) == 0
+
+def test_is_3_channels_decodes_the_whole_image(images, tmp_path):
+    image_util = pytest.importorskip("image_util")
+    with open(images[0], 'rb') as f:
+        data = f.read()
+    truncated = str(tmp_path / 'truncated.jpg')
+    with open(truncated, 'wb') as f:
+        # headers only, the scan data is cut off
+        f.write(data[:data.index(b'\xff\xda')])
+    assert image_util.is_3_channels(images[0])
+    assert image_util.is_3_channels(images[0], cache=True)
+    assert image_util.is_3_channels(truncated, full_check=False)
+    assert cv2.imread(truncated) is None
+    assert not image_util.is_3_channels(truncated)
+    assert not image_util.is_3_channels(str(tmp_path / 'missing.jpg'))
+    assert not image_util.is_3_channels(str(tmp_path / 'missing.jpg'), full_check=False)
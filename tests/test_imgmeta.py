@@ -0,0 +1,76 @@
+#encoding=utf-8
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from basicFun import IMGMETA
+from tests.synthetic import make_images
+
+def pil_meta(path):
+    with Image.open(path) as img:
+        return img.size[0], img.size[1], len(img.getbands()), img.mode
+
+@pytest.fixture
+def pil_images(tmp_path):
+    rng = np.random.RandomState(0)
+    rgb = Image.fromarray(rng.randint(0, 256, (30, 50, 3)).astype(np.uint8))
+    images = {
+        'rgb.jpg': (rgb, {}),
+        'gray.jpg': (rgb.convert('L'), {}),
+        'cmyk.jpg': (rgb.convert('CMYK'), {}),
+        'progressive.jpg': (rgb, {'progressive': True}),
+        'exif.jpg': (rgb, {'exif': Image.Exif()}),
+        'rgb.png': (rgb, {}),
+        'gray.png': (rgb.convert('L'), {}),
+        'rgba.png': (rgb.convert('RGBA'), {}),
+        'la.png': (rgb.convert('LA'), {}),
+        'palette.png': (rgb.convert('P'), {}),
+        'bilevel.png': (rgb.convert('1'), {}),
+        'deep.png': (Image.fromarray(rng.randint(0, 65536, (30, 50)).astype(np.uint16)), {}),
+        'rgb.bmp': (rgb, {}),
+    }
+    paths = []
+    for name, (img, kwargs) in images.items():
+        path = str(tmp_path / name)
+        img.save(path, **kwargs)
+        paths.append(path)
+    return paths
+
+def test_probe_matches_pil(pil_images):
+    for path in pil_images:
+        assert IMGMETA.probe(path) == pil_meta(path), path
+        if not path.endswith('.bmp'):
+            assert IMGMETA.read_header(path) is not None, path
+    assert IMGMETA.read_header(pil_images[-1]) is None
+
+def test_broken_images(tmp_path):
+    path = str(tmp_path / 'broken.jpg')
+    with open(path, 'wb') as f:
+        f.write(b'\xff\xd8\xff\xe0\x00')
+    assert IMGMETA.read_header(path) is None
+    with pytest.raises(Exception):
+        IMGMETA.probe(path)
+    assert IMGMETA.probe_entry(path) is None
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_scan_dir_and_manifest(tmp_path, workers):
+    image_dir = tmp_path / 'images'
+    (image_dir / 'sub').mkdir(parents=True)
+    make_images(str(image_dir), count=6, size=(40, 30), mixed=True)
+    make_images(str(image_dir / 'sub'), count=2, size=(20, 10))
+    with open(str(image_dir / 'sub' / 'broken.png'), 'wb') as f:
+        f.write(b'not an image')
+    (image_dir / 'notes.txt').write_text('x')
+    manifest_path = str(tmp_path / 'manifest.csv')
+    results = IMGMETA.scan_dir(str(image_dir), manifest_path, workers=workers)
+    names = [path for path, meta in results]
+    assert names == sorted(names)
+    assert len(names) == 9
+    for path, meta in results:
+        if path.endswith('broken.png'):
+            assert meta is None
+        else:
+            assert meta == pil_meta(os.path.join(str(image_dir), path))
+    assert IMGMETA.read_manifest(manifest_path) == dict(results)
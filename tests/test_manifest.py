@@ -0,0 +1,164 @@
+#encoding=utf-8
+import os
+
+import pytest
+
+from basicFun import MANIFEST
+from XML_Tool import XML_Tool
+from tests.synthetic import make_corpus, make_files, make_tree
+
+@pytest.fixture
+def tree(tmp_path):
+    root = str(tmp_path / 'tree')
+    make_tree(root, 300, 20, branch=3)
+    return root
+
+def write(path, data, mtime_ns):
+    with open(path, 'w') as f:
+        f.write(data)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_scan_records_every_file(tree, workers):
+    manifest = MANIFEST.Manifest.scan(tree, workers=workers)
+    expected = {}
+    for root, dirs, files in os.walk(tree):
+        for name in files:
+            path = os.path.join(root, name)
+            stat = os.stat(path)
+            expected[(tree, os.path.relpath(path, tree))] = (stat.st_size, stat.st_mtime_ns, None)
+    assert manifest.entries == expected
+    jpgs = MANIFEST.Manifest.scan(tree, suffixes=('.jpg',), workers=workers)
+    assert set(jpgs.entries) == set(key for key in expected if key[1].endswith('.jpg'))
+
+def test_scan_single_file_and_missing_root(tmp_path):
+    path = str(tmp_path / 'a.txt')
+    write(path, 'abc', 10 ** 18)
+    manifest = MANIFEST.Manifest.scan([path, str(tmp_path / 'missing')])
+    assert manifest.entries == {(path, ''): (3, 10 ** 18, None)}
+
+def test_diff(tmp_path):
+    root = str(tmp_path)
+    for name in 'abcd':
+        write(os.path.join(root, name), 'x', 10 ** 18)
+    before = MANIFEST.Manifest.scan(root)
+    write(os.path.join(root, 'a'), 'xy', 10 ** 18)
+    write(os.path.join(root, 'b'), 'x', 10 ** 18 + 1)
+    os.remove(os.path.join(root, 'c'))
+    write(os.path.join(root, 'e'), 'x', 10 ** 18)
+    delta = MANIFEST.Manifest.scan(root).diff(before)
+    assert delta == MANIFEST.Delta(set([(root, 'e')]), set([(root, 'c')]), set([(root, 'a'), (root, 'b')]))
+    assert MANIFEST.Manifest.scan(root).diff(None).added == set((root, name) for name in 'abde')
+
+def test_touched_file_is_unchanged_with_hash(tmp_path):
+    root = str(tmp_path)
+    write(os.path.join(root, 'a'), 'x', 10 ** 18)
+    write(os.path.join(root, 'b'), 'x', 10 ** 18)
+    before = MANIFEST.Manifest.scan(root, hash=True)
+    os.utime(os.path.join(root, 'a'), ns=(1, 1))
+    write(os.path.join(root, 'b'), 'y', 1)
+    assert MANIFEST.Manifest.scan(root, hash=True).diff(before).modified == set([(root, 'b')])
+    assert MANIFEST.Manifest.scan(root).diff(before).modified == set([(root, 'a'), (root, 'b')])
+
+def test_hash_is_reused_from_previous(tmp_path, monkeypatch):
+    root = str(tmp_path / 'src')
+    make_files(root, 10, 256)
+    before = MANIFEST.Manifest.scan(root, hash=True, workers=4)
+    assert before.entries[(root, '000003.jpg')][2] == MANIFEST.file_hash(os.path.join(root, '000003.jpg'))
+    write(os.path.join(root, '000003.jpg'), 'changed', 1)
+    hashed = []
+    file_hash = MANIFEST.file_hash
+    monkeypatch.setattr(MANIFEST, 'file_hash', lambda path: hashed.append(path) or file_hash(path))
+    after = MANIFEST.Manifest.scan(root, hash=True, previous=before)
+    assert hashed == [os.path.join(root, '000003.jpg')]
+    assert after.entries[(root, '000003.jpg')][2] == file_hash(os.path.join(root, '000003.jpg'))
+
+def test_save_and_load_round_trip(tmp_path):
+    root = str(tmp_path / 'with, comma')
+    make_files(root, 5, 32)
+    write(os.path.join(root, 'quote " name.jpg'), 'x', 1)
+    manifest = MANIFEST.Manifest.scan(root, hash=True)
+    manifest.entries[(root, '000001.jpg')] = manifest.entries[(root, '000001.jpg')][:2] + (None,)
+    path = str(tmp_path / 'manifest.csv')
+    manifest.save(path)
+    assert MANIFEST.Manifest.load(path).entries == manifest.entries
+    assert not os.path.exists(path + '.tmp')
+
+def test_refresh(tmp_path):
+    root = str(tmp_path)
+    write(os.path.join(root, 'a'), 'x', 1)
+    write(os.path.join(root, 'b'), 'x', 1)
+    manifest = MANIFEST.Manifest.scan(root)
+    write(os.path.join(root, 'a'), 'xyz', 2)
+    os.remove(os.path.join(root, 'b'))
+    manifest.refresh(root, ['a', 'b'])
+    assert manifest.entries == {(root, 'a'): (3, 2, None)}
+
+def test_snapshot_delta_and_commit(tree, tmp_path):
+    since = str(tmp_path / 'since.csv')
+    current, delta = MANIFEST.snapshot_delta(tree, since)
+    assert delta.added == set(current.entries) and len(current) == 300
+    assert MANIFEST.commit(since, current) is current
+    current, delta = MANIFEST.snapshot_delta(tree, since)
+    assert delta == MANIFEST.Delta(set(), set(), set())
+    # a Manifest since is only compared with, never written
+    assert MANIFEST.load_since(current) is current
+    assert MANIFEST.commit(current, current) is None
+    assert MANIFEST.changed_paths(set([(tree, 'a'), (tree, 'b'), ('other', 'c')]), tree + '/') == set(['a', 'b'])
+
+def xml_classes(xml_dir):
+    classes = {}
+    for name in sorted(os.listdir(xml_dir)):
+        with open(os.path.join(xml_dir, name)) as f:
+            classes[name] = set(part.split('</name>')[0] for part in f.read().split('<name>')[1:])
+    return classes
+
+def test_xml_tool_since_only_processes_changed_files(tmp_path):
+    xml_dir = str(tmp_path / 'xml')
+    since = str(tmp_path / 'since.csv')
+    make_corpus(xml_dir, 20)
+    XML_Tool(xml_dir, since=since).replace_all_classes('a')
+    assert all(classes == set(['a']) for classes in xml_classes(xml_dir).values())
+    # the files the tool rewrote itself are not changed for the next run
+    XML_Tool(xml_dir, since=since).replace_all_classes('b')
+    assert all(classes == set(['a']) for classes in xml_classes(xml_dir).values())
+    path = os.path.join(xml_dir, '00000003.xml')
+    with open(path) as f:
+        text = f.read()
+    write(path, text.replace('<name>a</name>', '<name>z</name>'), os.stat(path).st_mtime_ns + 1)
+    XML_Tool(xml_dir, since=since).replace_all_classes('c')
+    classes = xml_classes(xml_dir)
+    assert classes.pop('00000003.xml') == set(['c'])
+    assert all(value == set(['a']) for value in classes.values())
+
+def write_objects(path, boxes, mtime_ns):
+    objects = ''.join('<object><name>%s</name><bndbox><xmin>%d</xmin><ymin>%d</ymin><xmax>%d</xmax><ymax>%d</ymax></bndbox></object>'
+                      % box for box in boxes)
+    write(path, '<annotation><filename>x.jpg</filename>%s</annotation>' % objects, mtime_ns)
+
+def object_names(path):
+    with open(path) as f:
+        return sorted(part.split('</name>')[0] for part in f.read().split('<name>')[1:])
+
+def test_xml_tool_since_follows_refer_xmls(tmp_path):
+    xml_dir = str(tmp_path / 'xml')
+    refer_dir = str(tmp_path / 'refer')
+    since = str(tmp_path / 'since.csv')
+    make_corpus(xml_dir, 10)
+    os.makedirs(refer_dir)
+    refer_path = os.path.join(refer_dir, '00000001.xml')
+    write_objects(refer_path, [('flag', 1, 2, 30, 40), ('car', 5, 5, 9, 9)], 10 ** 18)
+    before = dict((name, object_names(os.path.join(xml_dir, name))) for name in os.listdir(xml_dir))
+    XML_Tool(xml_dir, since=since).add_new_classes(refer_dir, ['flag'])
+    assert object_names(os.path.join(xml_dir, '00000001.xml')) == sorted(before['00000001.xml'] + ['flag'])
+    # only the refer xml is edited, the target xml is unchanged since the last run
+    write_objects(refer_path, [('flag', 1, 2, 30, 40), ('flag', 100, 100, 200, 200)], 10 ** 18 + 1)
+    write_objects(os.path.join(refer_dir, '00000002.xml'), [('flag', 7, 7, 70, 70)], 10 ** 18)
+    XML_Tool(xml_dir, since=since).add_new_classes(refer_dir, ['flag'])
+    after = dict((name, object_names(os.path.join(xml_dir, name))) for name in os.listdir(xml_dir))
+    assert after.pop('00000001.xml') == sorted(before.pop('00000001.xml') + ['flag', 'flag'])
+    assert after.pop('00000002.xml') == sorted(before.pop('00000002.xml') + ['flag'])
+    assert after == before
+    # nothing changed, nothing is merged again
+    XML_Tool(xml_dir, since=since).add_new_classes(refer_dir, ['flag'])
+    assert object_names(os.path.join(xml_dir, '00000001.xml')).count('flag') == 2
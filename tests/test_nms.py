@@ -0,0 +1,61 @@
+#encoding=utf-8
+import numpy as np
+import pytest
+
+from basicFun import NMS
+from tests.synthetic import random_frame, NMS_LABELMAP, NMS_EXCLUSIVE_GROUPS, NMS_SPECIAL_THRESH
+
+def run_both(boxes_factory, thresh=0.3, special_thresh=NMS_SPECIAL_THRESH, groups=NMS_EXCLUSIVE_GROUPS):
+    """ run both engines on fresh copies of the same frame, the engines update the scores of the input boxes in place """
+    outputs = {}
+    for engine in ['loop', 'numpy']:
+        boxes, classes = boxes_factory()
+        post_boxes, post_classes = NMS.nms_exclusive_boxes(boxes, classes, NMS_LABELMAP, groups, thresh, special_thresh, engine)
+        outputs[engine] = (post_boxes, post_classes, boxes)
+    return outputs['loop'], outputs['numpy']
+
+def assert_same(loop, vectorized):
+    loop_boxes, loop_classes, loop_inputs = loop
+    numpy_boxes, numpy_classes, numpy_inputs = vectorized
+    assert numpy_classes == loop_classes
+    assert len(numpy_boxes) == len(loop_boxes)
+    for a, b in zip(loop_boxes, numpy_boxes):
+        np.testing.assert_array_equal(a, b)
+    # the in-place score updates of the inputs match as well
+    for a, b in zip(loop_inputs, numpy_inputs):
+        np.testing.assert_array_equal(a, b)
+
+@pytest.mark.parametrize("box_count", [0, 1, 2, 10, 50, 120])
+@pytest.mark.parametrize("thresh", [0.0, 0.3, 0.8])
+def test_engines_match_on_every_frame(box_count, thresh):
+    for seed in range(10):
+        assert_same(*run_both(lambda: random_frame(box_count, seed=seed), thresh=thresh))
+
+def test_special_thresh_and_groups():
+    for seed in range(10):
+        assert_same(*run_both(lambda: random_frame(50, seed=seed), special_thresh={'tube': 0.1, 'car': 0.9, 'blue': 0.5}))
+        assert_same(*run_both(lambda: random_frame(50, seed=seed), groups=[]))
+
+def test_score_sum_is_capped():
+    def frame():
+        boxes = [np.array([10.0, 10.0, 110.0, 210.0, 0.6]), np.array([11.0, 10.0, 111.0, 210.0, 0.7]),
+                 np.array([500.0, 500.0, 600.0, 700.0, 0.4])]
+        return boxes, [5, 6, 9]
+    loop, vectorized = run_both(frame)
+    assert_same(loop, vectorized)
+    assert vectorized[1] == [6]
+    assert vectorized[0][0][4] == 1.0
+
+def test_identical_boxes_fall_back_to_the_loop():
+    def frame():
+        boxes, classes = random_frame(20, seed=3)
+        return boxes + [boxes[0].copy(), boxes[5].copy()], classes + [classes[0], classes[5]]
+    assert_same(*run_both(frame))
+
+def test_iou_matrix_matches_get_iou():
+    boxes, _ = random_frame(60, seed=1)
+    coords = np.array([box[:4] for box in boxes])
+    matrix = NMS.get_iou_matrix(coords)
+    for i in range(len(coords)):
+        for j in range(len(coords)):
+            assert matrix[i, j] == NMS.get_iou(coords[i], coords[j])
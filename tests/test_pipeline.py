@@ -0,0 +1,111 @@
+#encoding=utf-8
+import random
+import threading
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from basicFun.PIPELINE import FramePipeline
+
+def make_frames(count):
+    return [np.full((4, 4, 3), i % 256, dtype=np.uint8) for i in range(count)]
+
+def jittered_preprocess(seed=0):
+    """ preprocess that finishes out of order across the pool threads """
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    def preprocess(image):
+        with lock:
+            delay = rng.random() * 0.005
+        time.sleep(delay)
+        return int(image[0, 0, 0])
+    return preprocess
+
+@pytest.mark.parametrize("workers", [1, 4])
+@pytest.mark.parametrize("queue_size", [1, 8])
+def test_results_match_serial_loop_in_order(workers, queue_size):
+    frames = make_frames(100)
+    preprocess = jittered_preprocess()
+    infer = lambda value: value * 3
+    postprocess = lambda image, raw: (image.shape, raw + 1)
+    expected = [postprocess(frame, infer(int(frame[0, 0, 0]))) for frame in frames]
+    pipeline = FramePipeline(infer, preprocess, postprocess, workers=workers, queue_size=queue_size)
+    assert list(pipeline.run(frames)) == expected
+
+def test_without_preprocess_and_postprocess_returns_raw():
+    frames = make_frames(10)
+    pipeline = FramePipeline(lambda image: image.sum())
+    assert list(pipeline.run(frames)) == [frame.sum() for frame in frames]
+
+def test_infer_runs_on_one_thread_only():
+    threads = set()
+    def infer(value):
+        threads.add(threading.current_thread().ident)
+        return value
+    pipeline = FramePipeline(infer, jittered_preprocess(), workers=4)
+    assert list(pipeline.run(make_frames(50))) == list(range(50))
+    assert len(threads) == 1
+
+def test_stats_count_every_stage():
+    pipeline = FramePipeline(lambda value: value, jittered_preprocess(), lambda image, raw: raw, workers=4)
+    list(pipeline.run(make_frames(30)))
+    for stage in ['decode', 'preprocess', 'infer', 'postprocess']:
+        assert pipeline.stats[stage]['count'] == 30
+        assert pipeline.stats[stage]['time'] >= 0.0
+    assert 'postprocess' in pipeline.summary()
+    pipeline.reset_stats()
+    assert all(stat['count'] == 0 for stat in pipeline.stats.values())
+
+def test_back_pressure_bounds_frames_in_flight():
+    # the consumer does not pull any result, the input generator must stop being drained
+    # once the bounded queues and the pool are full
+    pulled = []
+    def inputs():
+        for frame in make_frames(1000):
+            pulled.append(frame)
+            yield frame
+    queue_size = 2
+    pipeline = FramePipeline(lambda image: image, workers=2, queue_size=queue_size)
+    results = pipeline.run(inputs())
+    next(results)
+    time.sleep(0.3)
+    # three queues, one item held by each of the feeder, infer and postprocess threads, one yielded result
+    assert len(pulled) <= 3 * queue_size + 4
+    results.close()
+
+def test_early_close_stops_the_threads():
+    before = threading.active_count()
+    pipeline = FramePipeline(lambda image: image, workers=2, queue_size=2)
+    results = pipeline.run(make_frames(1000))
+    for _ in range(5):
+        next(results)
+    results.close()
+    assert threading.active_count() <= before
+
+@pytest.mark.parametrize("stage", ["preprocess", "infer", "postprocess"])
+def test_errors_are_raised_in_the_caller(stage):
+    def fail_on_7(value):
+        if int(np.asarray(value).flat[0]) == 7:
+            raise ValueError(stage)
+        return value
+    kwargs = {'infer': lambda value: value}
+    if stage == 'postprocess':
+        kwargs['postprocess'] = lambda image, raw: fail_on_7(raw)
+    else:
+        kwargs[stage] = fail_on_7
+    pipeline = FramePipeline(workers=2, **kwargs)
+    results = []
+    with pytest.raises(ValueError, match=stage):
+        for result in pipeline.run(make_frames(20)):
+            results.append(result)
+    assert len(results) == 7
+
+def test_unreadable_path_raises_ioerror(tmp_path):
+    good = str(tmp_path / 'good.png')
+    cv2.imwrite(good, np.zeros((4, 4, 3), dtype=np.uint8))
+    pipeline = FramePipeline(lambda image: image.shape)
+    assert list(pipeline.run([good])) == [(4, 4, 3)]
+    with pytest.raises(IOError):
+        list(pipeline.run([good, str(tmp_path / 'missing.png')]))
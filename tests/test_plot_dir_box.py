@@ -0,0 +1,77 @@
+#encoding=utf-8
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+image_util = pytest.importorskip("image_util")
+from file_util import read_detection_result_from_txt
+from tests.synthetic import make_images, make_detection_txt
+
+def make_dir(root, name, count, seed=0):
+    image_dir = os.path.join(root, 'images', name)
+    os.makedirs(image_dir)
+    make_images(image_dir, count, size=(96, 64), seed=seed)
+    txt_dir = os.path.join(root, 'txt')
+    if not os.path.exists(txt_dir):
+        os.makedirs(txt_dir)
+    txt_file = os.path.join(txt_dir, name + '.txt')
+    make_detection_txt(txt_file, count * 3, boxes_per_frame=3, max_coord=64, seed=seed)
+    return image_dir, txt_file
+
+def read_outputs(save_dir):
+    return dict((name, cv2.imread(os.path.join(save_dir, name))) for name in sorted(os.listdir(save_dir)))
+
+def test_workers_match_serial(tmp_path):
+    image_dir, txt_file = make_dir(str(tmp_path), 'a', 12)
+    outputs = []
+    for workers in [1, 2]:
+        save_dir = str(tmp_path / ('out%d' % workers))
+        os.makedirs(save_dir)
+        assert image_util.plot_dir_box(image_dir, save_dir, txt_file, workers=workers, chunk_size=2) == 12
+        outputs.append(read_outputs(save_dir))
+    assert sorted(outputs[0]) == sorted(os.listdir(image_dir))
+    for name in outputs[0]:
+        np.testing.assert_array_equal(outputs[0][name], outputs[1][name])
+        # the boxes have been drawn
+        assert not np.array_equal(outputs[0][name], cv2.imread(os.path.join(image_dir, name)))
+
+def test_detection_result_list_matches_txt(tmp_path):
+    image_dir, txt_file = make_dir(str(tmp_path), 'a', 4)
+    for name, kwargs in [('from_txt', {'txt_file': txt_file}), ('from_list', {'detection_result': read_detection_result_from_txt(txt_file)})]:
+        os.makedirs(str(tmp_path / name))
+        image_util.plot_dir_box(image_dir, str(tmp_path / name), cache=True, **kwargs)
+    txt_outputs, list_outputs = read_outputs(str(tmp_path / 'from_txt')), read_outputs(str(tmp_path / 'from_list'))
+    for name in txt_outputs:
+        np.testing.assert_array_equal(txt_outputs[name], list_outputs[name])
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_plot_dirs_box_resume(tmp_path, workers):
+    root = str(tmp_path)
+    make_dir(root, 'a', 5)
+    make_dir(root, 'b', 3, seed=1)
+    os.makedirs(os.path.join(root, 'images', 'no_txt'))
+    images_dir, txt_dir, save_dir = os.path.join(root, 'images'), os.path.join(root, 'txt'), os.path.join(root, 'out')
+    assert image_util.plot_dirs_box(images_dir, txt_dir, save_dir, workers=workers, chunk_size=2) == 8
+    assert sorted(os.listdir(save_dir)) == ['a', 'b']
+    assert image_util.plot_dirs_box(images_dir, txt_dir, save_dir, workers=workers) == 0
+    # a newer txt redraws its whole dir, a newer image only itself
+    later = os.path.getmtime(os.path.join(save_dir, 'a', '000000.jpg')) + 10
+    os.utime(os.path.join(txt_dir, 'a.txt'), (later, later))
+    os.utime(os.path.join(images_dir, 'b', '000001.jpg'), (later, later))
+    assert image_util.plot_dirs_box(images_dir, txt_dir, save_dir, workers=workers) == 6
+    assert image_util.plot_dirs_box(images_dir, txt_dir, save_dir, workers=workers, resume=False) == 8
+
+def test_entries_without_a_frame(tmp_path):
+    # every sorted entry takes one frame, only an image without a frame is an error
+    image_dir, txt_file = make_dir(str(tmp_path), 'a', 2)
+    (tmp_path / 'images' / 'a' / 'notes.txt').write_text('x')
+    save_dir = str(tmp_path / 'out')
+    os.makedirs(save_dir)
+    for workers in [1, 2]:
+        assert image_util.plot_dir_box(image_dir, save_dir, txt_file, workers=workers) == 2
+    make_detection_txt(txt_file, 3, boxes_per_frame=3, max_coord=64)
+    for workers in [1, 2]:
+        with pytest.raises(IndexError):
+            image_util.plot_dir_box(image_dir, save_dir, txt_file, workers=workers)
@@ -0,0 +1,22 @@
+#encoding=utf-8
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("maskrcnn_benchmark")
+from basicFun.modelTool_mb.predictor import MBModel
+from basicFun.TRANSFORMS import TensorTransform
+
+def make_cfg():
+    return SimpleNamespace(INPUT=SimpleNamespace(MIN_SIZE_TEST=800, MAX_SIZE_TEST=1333, TO_BGR255=True,
+                                                 PIXEL_MEAN=[102.9801, 115.9465, 122.7717], PIXEL_STD=[1.0, 1.0, 1.0]))
+
+def test_build_transform_follows_tensor_transform():
+    """ MBModel.build_transform without building a model """
+    model = MBModel.__new__(MBModel)
+    model.cfg = make_cfg()
+    model.min_image_size = 800
+    model.max_image_size = 1333
+    for tensor_transform in [False, True]:
+        model.tensor_transform = tensor_transform
+        assert isinstance(model.build_transform(), TensorTransform) == tensor_transform
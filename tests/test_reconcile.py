@@ -0,0 +1,106 @@
+#encoding=utf-8
+import csv
+import os
+
+import pytest
+
+from basicFun import RECONCILE
+from tests.reference import matched_images_isfile, orphan_xmls_isfile
+from tests.synthetic import make_pairs
+
+def touch(path):
+    open(path, 'w').close()
+
+@pytest.fixture
+def pairs(tmp_path):
+    return make_pairs(str(tmp_path), 500, orphan_every=7)
+
+def test_matches_isfile_loops(pairs):
+    xml_dir, image_dir = pairs
+    result = RECONCILE.Reconciliation(xml_dir, image_dir, ('.jpg',))
+    assert result.xml_only == orphan_xmls_isfile(xml_dir, image_dir)
+    assert sorted(result.matched_images()) == matched_images_isfile(xml_dir, image_dir)
+    assert result.image_only == ['%08d.jpg' % i for i in range(500) if i % 7 == 1]
+    assert result.summary() == 'matched: %d  xml without image: %d  image without xml: %d' % (
+        len(result.matched), len(result.xml_only), len(result.image_only))
+
+def test_suffixes_order_and_case(tmp_path):
+    xml_dir = str(tmp_path / 'xml')
+    image_dir = str(tmp_path / 'image')
+    os.makedirs(xml_dir)
+    os.makedirs(image_dir)
+    for name in ['a.xml', 'b.xml', 'c.xml', 'notes.txt', '.xml']:
+        touch(os.path.join(xml_dir, name))
+    for name in ['a.PNG', 'a.jpg', 'a.jpeg', 'b.bmp', 'd.JPG', '.jpg']:
+        touch(os.path.join(image_dir, name))
+    os.makedirs(os.path.join(image_dir, 'c.jpg'))
+    result = RECONCILE.Reconciliation(xml_dir, image_dir)
+    assert result.matched == {'a.xml': ['a.jpg', 'a.jpeg', 'a.PNG']}
+    assert result.xml_only == ['b.xml', 'c.xml']
+    assert result.image_only == ['d.JPG']
+    assert RECONCILE.Reconciliation(xml_dir, image_dir, ('.PNG',)).matched == {'a.xml': ['a.PNG']}
+
+def test_missing_dirs_are_empty(tmp_path):
+    result = RECONCILE.Reconciliation(str(tmp_path / 'xml'), str(tmp_path / 'image'))
+    assert (result.matched, result.xml_only, result.image_only) == ({}, [], [])
+
+def test_write_report(pairs, tmp_path):
+    xml_dir, image_dir = pairs
+    result = RECONCILE.Reconciliation(xml_dir, image_dir, ('.jpg',))
+    report = str(tmp_path / 'report.csv')
+    result.write_report(report)
+    with open(report, newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['kind', 'xml', 'image']
+    assert rows[1:] == ([['matched', xml, images[0]] for xml, images in result.matched.items()]
+                        + [['xml_only', xml, ''] for xml in result.xml_only]
+                        + [['image_only', '', image] for image in result.image_only])
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_delete_orphan_xmls(pairs, workers):
+    xml_dir, image_dir = pairs
+    orphans = orphan_xmls_isfile(xml_dir, image_dir)
+    result, count = RECONCILE.reconcile(xml_dir, image_dir, 'xml_only', 'delete', imageSuffixes=('.jpg',), workers=workers)
+    assert count == len(orphans) == 72
+    assert orphan_xmls_isfile(xml_dir, image_dir) == []
+    assert len(os.listdir(xml_dir)) == 500 - 72 - 72
+
+def test_dry_run_and_report_change_nothing(pairs, tmp_path):
+    xml_dir, image_dir = pairs
+    before = (sorted(os.listdir(xml_dir)), sorted(os.listdir(image_dir)))
+    report = str(tmp_path / 'report.csv')
+    result, count = RECONCILE.reconcile(xml_dir, image_dir, 'image_only', 'delete', dryRun=True, reportPath=report)
+    assert count == len(result.image_only) == 72
+    assert os.path.exists(report)
+    result, count = RECONCILE.reconcile(xml_dir, image_dir, 'matched', 'report')
+    assert count == len(result.matched)
+    assert (sorted(os.listdir(xml_dir)), sorted(os.listdir(image_dir))) == before
+
+def test_move_images_without_xml(pairs, tmp_path):
+    xml_dir, image_dir = pairs
+    target_dir = str(tmp_path / 'moved')
+    result, count = RECONCILE.reconcile(xml_dir, image_dir, 'image_only', 'move', targetDir=target_dir)
+    assert count == 72
+    assert sorted(os.listdir(target_dir)) == result.image_only
+    assert not set(os.listdir(image_dir)) & set(result.image_only)
+
+def test_copy_matched_images(pairs, tmp_path):
+    xml_dir, image_dir = pairs
+    target_dir = str(tmp_path / 'copied')
+    manifest = str(tmp_path / 'manifest.csv')
+    result, count = RECONCILE.reconcile(xml_dir, image_dir, 'matched', 'copy', targetDir=target_dir, mode='hardlink', manifest=manifest)
+    assert count == len(result.matched) == 500 - 72 - 72
+    assert sorted(os.listdir(target_dir)) == matched_images_isfile(xml_dir, image_dir)
+    assert os.path.samefile(os.path.join(image_dir, '00000002.jpg'), os.path.join(target_dir, '00000002.jpg'))
+    assert os.path.exists(manifest)
+
+def test_apply_arguments(tmp_path):
+    with pytest.raises(ValueError):
+        RECONCILE.apply(['a.xml'], str(tmp_path), 'rename')
+    with pytest.raises(ValueError):
+        RECONCILE.apply(['a.xml'], str(tmp_path), 'move')
+    with pytest.raises(ValueError):
+        RECONCILE.reconcile(str(tmp_path), str(tmp_path), target='both')
+    # a file that is already gone is not counted
+    touch(str(tmp_path / 'a.xml'))
+    assert RECONCILE.apply(['a.xml', 'b.xml'], str(tmp_path), 'delete') == 1
@@ -0,0 +1,57 @@
+#encoding=utf-8
+import cv2
+import numpy as np
+import pytest
+
+pytest.importorskip("torchvision")
+from basicFun.TRANSFORMS import TensorTransform, build_transform
+
+BGR255 = dict(to_bgr255=True, pixel_mean=[102.9801, 115.9465, 122.7717], pixel_std=[1.0, 1.0, 1.0])
+RGB = dict(to_bgr255=False, pixel_mean=[0.485, 0.456, 0.406], pixel_std=[0.229, 0.224, 0.225])
+
+def build_transforms(to_bgr255, min_size=800, max_size=1333):
+    """ (PIL pipeline, TensorTransform) with the maskrcnn-benchmark test defaults """
+    options = BGR255 if to_bgr255 else RGB
+    return [build_transform(min_size, max_size, tensor_transform=tensor_transform, **options) for tensor_transform in [False, True]]
+
+def frame(height, width, seed=0):
+    image = np.random.RandomState(seed).randint(0, 256, size=(height, width, 3), dtype=np.uint8)
+    return cv2.GaussianBlur(image, (9, 9), 0)
+
+def pixel_diff(to_bgr255, a, b):
+    """ absolute difference of two normalised tensors in 0-255 pixel units """
+    options = BGR255 if to_bgr255 else RGB
+    std = np.array(options['pixel_std'], dtype=np.float32).reshape(-1, 1, 1)
+    scale = 1.0 if to_bgr255 else 255.0
+    return np.abs((a - b).numpy()) * std * scale
+
+def test_build_transform_selects_the_mode():
+    pil_transform, tensor_transform = build_transforms(True)
+    assert isinstance(tensor_transform, TensorTransform)
+    assert not isinstance(pil_transform, TensorTransform)
+
+@pytest.mark.parametrize("to_bgr255", [True, False])
+@pytest.mark.parametrize("size", [(720, 1280), (1080, 1920), (1280, 720), (600, 800), (333, 500)])
+def test_tensor_transform_matches_the_pil_pipeline(to_bgr255, size):
+    pil_transform, tensor_transform = build_transforms(to_bgr255)
+    image = frame(*size)
+    expected, actual = pil_transform(image), tensor_transform(image)
+    assert actual.shape == expected.shape
+    assert actual.dtype == expected.dtype
+    diff = pixel_diff(to_bgr255, expected, actual)
+    # resampling differs slightly between PIL and OpenCV
+    assert diff.mean() < 1.0
+    assert diff.max() <= 8.0
+
+@pytest.mark.parametrize("to_bgr255", [True, False])
+def test_tensor_transform_is_exact_without_resize(to_bgr255):
+    pil_transform, tensor_transform = build_transforms(to_bgr255)
+    image = frame(800, 1200)
+    expected, actual = pil_transform(image), tensor_transform(image)
+    assert actual.shape == expected.shape == (3, 800, 1200)
+    assert pixel_diff(to_bgr255, expected, actual).max() < 1e-3
+
+def test_max_size_caps_the_long_side():
+    pil_transform, tensor_transform = build_transforms(True, min_size=800, max_size=1000)
+    image = frame(400, 1600)
+    assert tensor_transform(image).shape == pil_transform(image).shape == (3, 250, 1000)
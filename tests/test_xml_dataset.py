@@ -0,0 +1,66 @@
+#encoding=utf-8
+import os
+
+import numpy as np
+import pytest
+
+from basicFun import XML
+from XML_Dataset import XML_Dataset
+from XML_Tool import XML_Tool
+from tests.synthetic import make_corpus
+
+@pytest.fixture
+def corpus(tmp_path):
+    xml_dir = str(tmp_path / 'xml')
+    make_corpus(xml_dir, 100)
+    with open(os.path.join(xml_dir, 'broken.xml'), 'w') as f:
+        f.write('<annotation><object>')
+    return xml_dir
+
+def test_every_file_matches_the_xml_reader(corpus):
+    dataset = XML_Dataset.from_dir(corpus)
+    assert len(dataset) == 101
+    for i, name in enumerate(dataset.files):
+        boxes, names = dataset.get_boxes(i)
+        if name == 'broken.xml':
+            assert len(boxes) == 0
+            continue
+        objects = XML.read_objects(os.path.join(corpus, name))
+        assert list(names) == [obj['name'] for obj in objects]
+        assert boxes.tolist() == [[int(obj[key]) for key in ['xmin', 'ymin', 'xmax', 'ymax']] for obj in objects]
+    assert dataset.sizes[0].tolist() == [1920, 1080]
+
+def test_workers_and_queries_match_xml_tool(corpus, tmp_path):
+    dataset = XML_Dataset.from_dir(corpus, workers=2, chunk_size=8)
+    serial = XML_Dataset.from_dir(corpus)
+    for key in XML_Dataset.ARRAYS:
+        np.testing.assert_array_equal(getattr(dataset, key), getattr(serial, key))
+    os.remove(os.path.join(corpus, 'broken.xml'))
+    assert dataset.count_classes() == XML_Tool(corpus).count_classes()
+    txt_path = str(tmp_path / 'bus.txt')
+    XML_Tool(corpus).get_xml_by_class(['bus', 'red'], txt_path)
+    with open(txt_path) as f:
+        expected = f.read().splitlines()
+    assert [os.path.splitext(name)[0] for name in dataset.files_with_classes(['bus', 'red'])] == expected
+
+def test_box_mask_and_iou():
+    dataset = XML_Dataset(np.array(['a.xml', 'b.xml']), np.zeros((2, 2), dtype=np.int32), np.array([0, 2, 3]),
+                          np.array([[0, 0, 10, 10], [0, 0, 100, 200], [5, 0, 15, 10]], dtype=np.int32),
+                          np.array([0, 1, 0], dtype=np.uint16), np.array(['red', 'car']))
+    assert dataset.box_mask(['red']).tolist() == [True, False, True]
+    assert dataset.box_mask(min_width=50).tolist() == [False, True, False]
+    assert dataset.box_mask(max_height=10).tolist() == [True, False, True]
+    assert list(dataset.files_with_boxes(dataset.box_mask(['car']))) == ['a.xml']
+    assert dataset.file_ids().tolist() == [0, 0, 1]
+    np.testing.assert_allclose(dataset.iou([0, 0, 10, 10]), [1.0, 100.0 / 20000, 50.0 / 150])
+    np.testing.assert_allclose(dataset.iou([0, 0, 10, 10], dataset.box_mask(['red'])), [1.0, 50.0 / 150])
+
+@pytest.mark.parametrize("suffix", [".npz", ".npy"])
+def test_save_load_round_trip(corpus, tmp_path, suffix):
+    dataset = XML_Dataset.from_dir(corpus)
+    path = str(tmp_path / ('cache' + suffix))
+    dataset.save(path)
+    loaded = XML_Dataset.load(path)
+    for key in XML_Dataset.ARRAYS:
+        np.testing.assert_array_equal(getattr(loaded, key), getattr(dataset, key))
+    assert loaded.count_classes() == dataset.count_classes()
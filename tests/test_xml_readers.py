@@ -0,0 +1,84 @@
+#encoding=utf-8
+import pytest
+
+from basicFun import XML
+from tests.synthetic import make_corpus
+
+pytest.importorskip("bs4")
+pytest.importorskip("lxml")
+# the bs4 backend parses the xml with the lxml html parser on purpose, it is the original reader
+pytestmark = pytest.mark.filterwarnings("ignore:It looks like you're using an HTML parser to parse an XML document")
+
+READERS = [XML.read_objects, XML.read_objects_exclude_minsize, XML.read_boxes]
+
+def write(tmp_path, name, text):
+    path = str(tmp_path / name)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return path
+
+def assert_backends_match(path):
+    for reader in READERS:
+        assert reader(path, "etree") == reader(path, "bs4")
+
+def test_every_file_of_the_corpus_matches(tmp_path):
+    xml_dir = tmp_path / 'xml'
+    make_corpus(str(xml_dir), 64)
+    for path in sorted(xml_dir.iterdir()):
+        assert_backends_match(str(path))
+    objects = XML.read_objects(str(xml_dir / '00000007.xml'))
+    assert len(objects) == 8
+    assert objects[0] == {"name": "blue", "xmin": "0", "ymin": "0", "xmax": "50", "ymax": "80"}
+
+def test_first_descendant_whitespace_and_entities(tmp_path):
+    # nested part boxes come after the object box, names keep their whitespace and entities are decoded
+    path = write(tmp_path, 'nested.xml', '''<?xml version="1.0" encoding="utf-8"?>
+<annotation>
+    <filename>a.jpg</filename>
+    <object>
+        <name> person &amp; bag </name>
+        <bndbox><xmin>10</xmin><ymin>20</ymin><xmax>110</xmax><ymax>220</ymax></bndbox>
+        <part><name>head</name><bndbox><xmin>30</xmin><ymin>20</ymin><xmax>60</xmax><ymax>50</ymax></bndbox></part>
+    </object>
+    <object><name>红色</name><bndbox><xmin>1</xmin><ymin>2</ymin><xmax>3</xmax><ymax>4</ymax></bndbox></object>
+</annotation>''')
+    assert_backends_match(path)
+    assert [obj["name"] for obj in XML.read_objects(path)] == [" person & bag ", "红色"]
+    assert XML.read_boxes(path)[0] == [10.0, 20.0, 110.0, 220.0, 1.0]
+
+def test_no_objects(tmp_path):
+    path = write(tmp_path, 'empty.xml', '<annotation><filename>a.jpg</filename></annotation>')
+    assert_backends_match(path)
+    assert XML.read_objects(path) == []
+
+def test_missing_tag_raises_index_error_on_both_backends(tmp_path):
+    path = write(tmp_path, 'missing.xml', '<annotation><object><name>car</name>'
+                 '<bndbox><xmin>1</xmin><ymin>2</ymin><xmax>3</xmax></bndbox></object></annotation>')
+    for backend in ["etree", "bs4"]:
+        with pytest.raises(IndexError):
+            XML.read_objects(path, backend)
+
+def test_small_lights_are_excluded(tmp_path):
+    path = write(tmp_path, 'small.xml', '<annotation>'
+                 '<object><name>red</name><bndbox><xmin>0</xmin><ymin>0</ymin><xmax>40</xmax><ymax>90</ymax></bndbox></object>'
+                 '<object><name>red</name><bndbox><xmin>0</xmin><ymin>0</ymin><xmax>60</xmax><ymax>90</ymax></bndbox></object>'
+                 '<object><name>car</name><bndbox><xmin>0</xmin><ymin>0</ymin><xmax>10</xmax><ymax>10</ymax></bndbox></object>'
+                 '</annotation>')
+    assert_backends_match(path)
+    assert [(obj["name"], obj["xmax"]) for obj in XML.read_objects_exclude_minsize(path)] == [("red", "60"), ("car", "10")]
+
+def test_malformed_xml_falls_back_to_bs4(tmp_path):
+    path = write(tmp_path, 'broken.xml', '<annotation><object><name>car</name>'
+                 '<bndbox><xmin>1</xmin><ymin>2</ymin><xmax>3</xmax><ymax>4</ymax></bndbox></object>')
+    assert XML.read_objects(path, "etree") == XML.read_objects(path, "bs4")
+    assert XML.read_objects(path) == [{"name": "car", "xmin": "1", "ymin": "2", "xmax": "3", "ymax": "4"}]
+
+def test_mixed_case_tags_match_bs4(tmp_path):
+    # the lxml html parser of the bs4 backend lowercases tag names, the etree backend has to find them too
+    path = write(tmp_path, 'mixed.xml', '<Annotation>'
+                 '<Object><Name>Car</Name><BndBox><XMin>1</XMin><ymin>2</ymin><XMAX>3</XMAX><YMax>4</YMax></BndBox></Object>'
+                 '<object><name>bus</name><bndbox><xmin>5</xmin><ymin>6</ymin><xmax>7</xmax><ymax>8</ymax></bndbox></object>'
+                 '</Annotation>')
+    assert_backends_match(path)
+    assert XML.read_objects(path, "etree") == [{"name": "Car", "xmin": "1", "ymin": "2", "xmax": "3", "ymax": "4"},
+                                               {"name": "bus", "xmin": "5", "ymin": "6", "xmax": "7", "ymax": "8"}]
@@ -0,0 +1,65 @@
+#encoding=utf-8
+import os
+import stat
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from basicFun import XML
+from XML_Tool import XML_Tool
+from tests.synthetic import make_corpus
+
+def read_lines(path):
+    with open(path) as f:
+        return f.read().splitlines()
+
+@pytest.fixture
+def corpus(tmp_path):
+    xml_dir = str(tmp_path / 'xml')
+    make_corpus(xml_dir, 200)
+    return xml_dir
+
+def test_workers_match_serial(corpus, tmp_path):
+    serial = XML_Tool(corpus).count_classes()
+    assert sum(serial.values()) == sum(i % 8 + 1 for i in range(200))
+    assert XML_Tool(corpus, workers=2, chunk_size=16).count_classes() == serial
+    for workers in [1, 2]:
+        txt_path = str(tmp_path / ('bus_%d.txt' % workers))
+        XML_Tool(corpus, workers=workers, chunk_size=16).get_xml_by_class(['bus'], txt_path)
+    assert read_lines(str(tmp_path / 'bus_1.txt')) == read_lines(str(tmp_path / 'bus_2.txt'))
+
+def test_index_matches_scan_and_follows_edits(corpus, tmp_path):
+    index_path = str(tmp_path / 'index.sqlite')
+    tool = XML_Tool(corpus, index_path=index_path)
+    assert tool.count_classes() == XML_Tool(corpus).count_classes()
+    XML_Tool(corpus).replace_class(['bus'], 'coach')
+    os.remove(os.path.join(corpus, '00000000.xml'))
+    expected = XML_Tool(corpus).count_classes()
+    assert 'bus' not in expected
+    assert tool.count_classes() == expected
+    for name, tool_ in [('index', tool), ('scan', XML_Tool(corpus))]:
+        tool_.get_xml_by_class(['coach', 'red'], str(tmp_path / (name + '.txt')))
+    assert read_lines(str(tmp_path / 'index.txt')) == read_lines(str(tmp_path / 'scan.txt'))
+    tool.index.close()
+
+def test_write_xml_atomic_temp_name_and_mode(corpus, monkeypatch):
+    path = os.path.join(corpus, '00000001.xml')
+    os.chmod(path, 0o640)
+    tree = ET.ElementTree(file=path)
+    written = []
+    write = tree.write
+    def spy(tmp_path, **kwargs):
+        written.append(tmp_path)
+        write(tmp_path, **kwargs)
+        # a listing taken while the temp file exists does not see it as an annotation
+        assert len(os.listdir(corpus)) == 201
+        assert sorted(x for x in os.listdir(corpus) if ".xml" in x) == ['%08d.xml' % i for i in range(200)]
+    monkeypatch.setattr(tree, 'write', spy)
+    XML.write_xml_atomic(tree, path)
+    assert os.path.dirname(written[0]) == corpus
+    assert ".xml" not in os.path.basename(written[0])
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+    assert sorted(os.listdir(corpus)) == ['%08d.xml' % i for i in range(200)]
+    new_path = os.path.join(corpus, 'new.xml')
+    XML.write_xml_atomic(tree, new_path)
+    assert ET.parse(new_path).getroot().find('filename').text == '00000001.jpg'
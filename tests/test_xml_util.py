@@ -0,0 +1,159 @@
+#encoding=utf-8
+import os
+import json
+import xml.etree.ElementTree as ET
+
+import pytest
+
+import xml_util
+from tests.synthetic import voc_records, write_coco_json
+
+def tree_items(element):
+    """ (tag, stripped text, children) of an element tree, ignoring the indentation """
+    return (element.tag, (element.text or '').strip(), [tree_items(child) for child in element])
+
+def test_make_xml_string_matches_make_xml():
+    records = list(voc_records(20)) + [("a&b<c>", 640, 480, [[1, 2, 3, 4, 'x"y\'&<z>'], [5, 6, 7, 8, '红色']]),
+                                        ("empty", 1, 1, [])]
+    for record in records:
+        dom = xml_util.make_xml(*record)
+        expected = ET.fromstring(dom.toxml(encoding='utf-8'))
+        actual = ET.fromstring(xml_util.make_xml_string(*record).encode('utf-8'))
+        assert tree_items(actual) == tree_items(expected)
+
+def test_generate_xmls_workers_match_serial(tmp_path):
+    records = list(voc_records(50))
+    for workers in [1, 2]:
+        target_dir = tmp_path / str(workers)
+        target_dir.mkdir()
+        assert xml_util.generate_xmls(str(target_dir), iter(records), workers=workers, chunk_size=4) == 50
+    for name in sorted(os.listdir(str(tmp_path / '1'))):
+        assert (tmp_path / '1' / name).read_bytes() == (tmp_path / '2' / name).read_bytes()
+    width, height, objects = xml_util.parse_voc_xml(str(tmp_path / '1' / '00000003.xml'))
+    assert (width, height) == ('1920', '1080')
+    assert objects == [(d[4], d[0], d[1], d[2], d[3]) for d in records[3][3]]
+
+@pytest.fixture
+def xml_dir(tmp_path):
+    path = tmp_path / 'xml'
+    path.mkdir()
+    xml_util.generate_xmls(str(path), voc_records(30))
+    return str(path)
+
+def test_xml_to_json_matches_the_xml_files(xml_dir, tmp_path):
+    json_file = str(tmp_path / 'out.json')
+    xml_util.xml_to_json(xml_dir, json_file)
+    with open(json_file) as f:
+        coco = json.load(f)
+    names = sorted(os.listdir(xml_dir))
+    assert [image['id'] for image in coco['image']] == [os.path.splitext(name)[0] for name in names]
+    assert coco['categories'] == [{'supercategory': 'none', 'id': 0, 'name': 'person'},
+                                  {'supercategory': 'none', 'id': 1, 'name': 'car'}]
+    annotations = iter(coco['annotations'])
+    for bnd_id, annotation in enumerate(coco['annotations']):
+        assert annotation['id'] == bnd_id
+    for name in names:
+        width, height, objects = xml_util.parse_voc_xml(os.path.join(xml_dir, name))
+        for category, xmin, ymin, xmax, ymax in objects:
+            annotation = next(annotations)
+            assert annotation['image_id'] == os.path.splitext(name)[0]
+            assert annotation['bbox'] == [xmin, ymin, xmax - xmin, ymax - ymin]
+            assert coco['categories'][annotation['category_id']]['name'] == category
+    assert next(annotations, None) is None
+
+def test_xml_to_json_workers_match_serial(xml_dir, tmp_path):
+    xml_util.xml_to_json(xml_dir, str(tmp_path / 'serial.json'))
+    xml_util.xml_to_json(xml_dir, str(tmp_path / 'pool.json'), workers=2, chunk_size=4)
+    assert (tmp_path / 'serial.json').read_bytes() == (tmp_path / 'pool.json').read_bytes()
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_xml_to_json_failure_keeps_the_previous_output(xml_dir, tmp_path, workers):
+    json_file = str(tmp_path / 'out.json')
+    xml_util.xml_to_json(xml_dir, json_file)
+    previous = (tmp_path / 'out.json').read_bytes()
+    with open(os.path.join(xml_dir, '00000010.xml'), 'w') as f:
+        f.write('<annotation><size>')
+    with pytest.raises(ET.ParseError):
+        xml_util.xml_to_json(xml_dir, json_file, workers=workers, chunk_size=1)
+    assert (tmp_path / 'out.json').read_bytes() == previous
+    assert sorted(os.listdir(str(tmp_path))) == ['out.json', 'xml']
+
+def read_xml_dir(xml_dir):
+    return dict((name, xml_util.parse_voc_xml(os.path.join(xml_dir, name))) for name in sorted(os.listdir(xml_dir)))
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_json_to_xml_round_trip(xml_dir, tmp_path, streaming):
+    if streaming:
+        pytest.importorskip("ijson")
+    json_file = str(tmp_path / 'out.json')
+    xml_util.xml_to_json(xml_dir, json_file)
+    target_dir = tmp_path / 'back'
+    target_dir.mkdir()
+    assert xml_util.json_to_xml(json_file, str(target_dir), streaming=streaming) == 30
+    assert read_xml_dir(str(target_dir)) == read_xml_dir(xml_dir)
+
+def test_json_to_xml_detector_layout(tmp_path):
+    pytest.importorskip("ijson")
+    json_file = str(tmp_path / 'coco.json')
+    write_coco_json(json_file, 500, 40)
+    with open(json_file) as f:
+        coco = json.load(f)
+    expected = dict(("%08d.xml" % image['id'], ('1920', '1080', [])) for image in coco['images'])
+    for annotation in coco['annotations']:
+        x, y, w, h = annotation['bbox']
+        expected["%08d.xml" % annotation['image_id']][2].append(
+            ('class%d' % annotation['category_id'], int(round(x)), int(round(y)), int(round(x + w)), int(round(y + h))))
+    outputs = []
+    for streaming, workers in [(False, 1), (True, 1), (True, 2)]:
+        target_dir = tmp_path / ('%s_%d' % (streaming, workers))
+        target_dir.mkdir()
+        xml_util.json_to_xml(json_file, str(target_dir), workers=workers, chunk_size=4, streaming=streaming)
+        outputs.append(read_xml_dir(str(target_dir)))
+    for output in outputs:
+        assert output == expected
+
+def test_json_to_xml_unknown_images_and_empty_images(tmp_path, capsys):
+    json_file = str(tmp_path / 'coco.json')
+    with open(json_file, 'w') as f:
+        json.dump({"annotations": [{"image_id": 1, "bbox": [1, 2, 3, 4], "category_id": 7},
+                                   {"image_id": 9, "bbox": [1, 2, 3, 4], "category_id": 7}],
+                   "images": [{"file_name": "a.jpg", "width": 10, "height": 20, "id": 1},
+                              {"file_name": "b.png", "width": 30, "height": 40, "id": 2}],
+                   "categories": [{"id": 7, "name": "car"}]}, f)
+    for streaming in ([False, True] if xml_util.ijson is not None else [False]):
+        target_dir = tmp_path / str(streaming)
+        target_dir.mkdir()
+        assert xml_util.json_to_xml(json_file, str(target_dir), streaming=streaming) == 2
+        assert "1 annotations refer to unknown images" in capsys.readouterr().out
+        assert read_xml_dir(str(target_dir)) == {'a.xml': ('10', '20', [('car', 1, 2, 4, 6)]), 'b.xml': ('30', '40', [])}
+
+def test_json_to_xml_streaming_without_ijson(tmp_path, monkeypatch):
+    json_file = str(tmp_path / 'coco.json')
+    write_coco_json(json_file, 10, 4)
+    monkeypatch.setattr(xml_util, 'ijson', None)
+    with pytest.raises(ImportError, match='ijson'):
+        xml_util.json_to_xml(json_file, str(tmp_path), streaming=True)
+    target_dir = tmp_path / 'default'
+    target_dir.mkdir()
+    assert xml_util.json_to_xml(json_file, str(target_dir)) == 4
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_json_to_xml_round_trip_keeps_dotted_names(tmp_path, streaming):
+    if streaming:
+        pytest.importorskip("ijson")
+    xml_dir = tmp_path / 'xml'
+    xml_dir.mkdir()
+    records = [(name,) + record[1:] for name, record in zip(['a.b', 'c.d.e', 'f.JPG.g', 'plain'], voc_records(4))]
+    xml_util.generate_xmls(str(xml_dir), records)
+    json_file = str(tmp_path / 'out.json')
+    xml_util.xml_to_json(str(xml_dir), json_file)
+    target_dir = tmp_path / 'back'
+    target_dir.mkdir()
+    assert xml_util.json_to_xml(json_file, str(target_dir), streaming=streaming) == 4
+    assert sorted(os.listdir(str(target_dir))) == ['a.b.xml', 'c.d.e.xml', 'f.JPG.g.xml', 'plain.xml']
+    assert read_xml_dir(str(target_dir)) == read_xml_dir(str(xml_dir))
+
+def test_image_stem():
+    assert xml_util.image_stem('a.b') == 'a.b'
+    assert xml_util.image_stem('a.b.JPG') == 'a.b'
+    assert xml_util.image_stem('dir.v2/00001.png') == 'dir.v2/00001'
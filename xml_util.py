@@ -10,6 +10,43 @@ except ImportError:
     import xml.etree.ElementTree as ET
 
 from tqdm import tqdm
+from collections import defaultdict
+from lxml.etree import Element, SubElement, tostring
+from multiprocessing import Pool
+from xml.dom.minidom import parseString
+from xml.sax.saxutils import escape
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# suffixes stripped from a COCO file_name to get the xml name, xml_to_json writes the bare stem
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".bmp", ".gif", ".tif", ".tiff", ".webp")
+
+VOC_HEADER = """<?xml version="1.0" encoding="utf-8"?>
+<annotation>
+\t<folder>VOC</folder>
+\t<filename>%s.jpg</filename>
+\t<object_num>%d</object_num>
+\t<size>
+\t\t<width>%s</width>
+\t\t<height>%s</height>
+\t\t<depth>3</depth>
+\t</size>
+"""
+VOC_OBJECT = """\t<object>
+\t\t<name>%s</name>
+\t\t<pose>Unspecified</pose>
+\t\t<truncated>1</truncated>
+\t\t<difficult>0</difficult>
+\t\t<bndbox>
+\t\t\t<xmin>%s</xmin>
+\t\t\t<ymin>%s</ymin>
+\t\t\t<xmax>%s</xmax>
+\t\t\t<ymax>%s</ymax>
+\t\t</bndbox>
+\t</object>
+"""
 
 def generate_xml(target_dir, image_name, image_width, image_height, detections):
     """ generate xml file
@@ -21,10 +58,31 @@ def generate_xml(target_dir, image_name, image_width, image_height, detections):
         image_height (int): the height of image
         detections (list): e.g. [[xmin, ymin, xmax, ymax, label]...]
     """
-    dom = make_xml(image_name, image_width, image_height, detections)
     xml_save_path = os.path.join(target_dir, image_name + '.xml')
     with open(xml_save_path, 'wb+') as f:
-        f.write(dom.toprettyxml(indent='\t', encoding='utf-8'))
+        f.write(make_xml_string(image_name, image_width, image_height, detections).encode('utf-8'))
+
+def generate_xml_record(args):
+    target_dir, record = args
+    generate_xml(target_dir, *record)
+    return record[0]
+
+def generate_xmls(target_dir, records, workers=1, chunk_size=64):
+    """ generate many xml files, in parallel when workers > 1
+    
+    Args:
+        target_dir (str): target xml dir
+        records (iterable): e.g. [(image_name, image_width, image_height, detections)...]
+        workers (int): the number of processes
+        chunk_size (int): the number of records sent to a process at a time
+    Return:
+        count (int): the number of xml files written
+    """
+    args = ((target_dir, record) for record in records)
+    if workers <= 1:
+        return sum(1 for _ in map(generate_xml_record, args))
+    with Pool(workers) as pool:
+        return sum(1 for _ in pool.imap_unordered(generate_xml_record, args, chunksize=chunk_size))
 
 def get_w_h_from_xml(target_file):
     """ get width and height from xml file
@@ -39,6 +97,22 @@ def get_w_h_from_xml(target_file):
     height = size.find("height").text
     return width, height
 
+def make_xml_string(image_name, image_width, image_height, detections):
+    """ make the VOC xml text directly, the same elements as make_xml without building a dom
+    
+    Args:
+        image_name (str): the name of image
+        image_width (int): the width of image
+        image_height (int): the height of image
+        detections (list): e.g. [[xmin, ymin, xmax, ymax, label]...]
+    """
+    parts = [VOC_HEADER % (escape(image_name), len(detections), escape(str(image_width)), escape(str(image_height)))]
+    for detection in detections:
+        parts.append(VOC_OBJECT % (escape(str(detection[-1])), escape(str(detection[0])), escape(str(detection[1])),
+                                   escape(str(detection[2])), escape(str(detection[3]))))
+    parts.append('</annotation>\n')
+    return ''.join(parts)
+
 def make_xml(image_name, image_width, image_height, detections):
     """ make a xml dom
     
@@ -87,52 +161,174 @@ def make_xml(image_name, image_width, image_height, detections):
     dom = parseString(xml)
     return dom
 
-def xml_to_json(xml_dir, json_file, predefined_categories=None):
+def parse_voc_xml(xml_path):
+    """ parse a VOC xml once into (width, height, [(name, xmin, ymin, xmax, ymax)...])
+        width and height are kept as the text in the xml
+    
+    Args:
+        xml_path (str): xml file
+    """
+    root = ET.parse(xml_path).getroot()
+    size = root.find("size")
+    width = size.find("width").text
+    height = size.find("height").text
+    objects = []
+    for obj in root.findall("object"):
+        bndbox = obj.find("bndbox")
+        objects.append((obj.find("name").text,
+                        int(bndbox.find("xmin").text), int(bndbox.find("ymin").text),
+                        int(bndbox.find("xmax").text), int(bndbox.find("ymax").text)))
+    return width, height, objects
+
+def xml_to_json(xml_dir, json_file, predefined_categories=None, workers=1, chunk_size=256):
     """ convert xml files to json file
         cruuently we do not support segmentation
+        xml files are parsed once each (in a process pool when workers > 1) in sorted order,
+        so that image, annotation and category ids do not depend on the listing order.
+        images are written to a temporary file beside json_file and annotations to a spool file as they come,
+        memory does not grow with the number of files. json_file is replaced only when every xml has been
+        converted, a failure leaves any previous json_file untouched
     
     Args:
         xml_dir (str): xml dir
         json_file (str): json file
         predefined_categories (dict): default None
+        workers (int): the number of processes used to parse xml files
+        chunk_size (int): the number of xml files sent to a process at a time
     """
-    json_dict = {"image": [], "type": "instance", "annotations": [], "categories": []}
     categories = predefined_categories if predefined_categories is not None else {}
     bnd_id = 0
     xml_list = os.listdir(xml_dir)
-    for file in xml_list:
-        filename = os.path.splitext(file)[0]
-        suffix = os.path.splitext(file)[-1]
-        if suffix not in [".xml"]:
-            continue
-        tree = ET.parse(os.path.join(xml_dir, file))
-        root = tree.getroot()
-        image_file = filename + ".jpg"
-        image_id = filename
-        width, height = get_w_h_from_xml(os.path.join(xml_dir, file))
-        image_info = {"file_name": filename, "height": height, "width": width, "id":image_id}
-        json_dict["image"].append(image_info)
-        for obj in root.findall("object"):
-            category = obj.find("name").text
-            if category not in categories.keys():
-                categories[category] = len(categories) # defualt start from 0
-            category_id = categories[category]
-            bndbox = obj.find("bndbox")
-            xmin = int(bndbox.find("xmin").text)
-            ymin = int(bndbox.find("ymin").text)
-            xmax = int(bndbox.find("xmax").text)
-            ymax = int(bndbox.find("ymax").text)
-            bnd_width, bnd_height = abs(xmax -xmin), abs(ymax - ymin)
-            anntation_info = {
-                'area': bnd_width*bnd_height, 'iscrowd': 0, 'image_id': image_id, 
-                'bbox':[xmin, ymin, bnd_width, bnd_height],
-                'category_id': category_id, 'id': bnd_id, 'ignore': 0,'segmentation': []
-            }
-            json_dict["annotations"].append(anntation_info)
-            bnd_id += 1
-    for (cate_id, cate) in enumerate(categories):
-        cat = {'supercategory': 'none', 'id': cate_id, 'name': cate}
-        json_dict["categories"].append(cat)
-    with open(json_file, "w") as f:
-        json.dump(json_dict, f)
-    print("Success: {} xml files have been converted.".format(len(xml_list)))
\ No newline at end of file
+    files = sorted(file for file in xml_list if os.path.splitext(file)[-1] in [".xml"])
+    xml_paths = [os.path.join(xml_dir, file) for file in files]
+    pool = Pool(workers) if workers > 1 else None
+    parsed = pool.imap(parse_voc_xml, xml_paths, chunksize=chunk_size) if pool is not None else map(parse_voc_xml, xml_paths)
+    spool_file = json_file + ".annotations"
+    temp_file = json_file + ".tmp"
+    succeeded = False
+    try:
+        with open(temp_file, "w") as f, open(spool_file, "w+") as spool:
+            f.write('{"image": [')
+            for i, (file, (width, height, objects)) in enumerate(zip(files, parsed)):
+                image_id = os.path.splitext(file)[0]
+                image_info = {"file_name": image_id, "height": height, "width": width, "id":image_id}
+                f.write((", " if i > 0 else "") + json.dumps(image_info))
+                for category, xmin, ymin, xmax, ymax in objects:
+                    if category not in categories.keys():
+                        categories[category] = len(categories) # defualt start from 0
+                    category_id = categories[category]
+                    bnd_width, bnd_height = abs(xmax -xmin), abs(ymax - ymin)
+                    anntation_info = {
+                        'area': bnd_width*bnd_height, 'iscrowd': 0, 'image_id': image_id, 
+                        'bbox':[xmin, ymin, bnd_width, bnd_height],
+                        'category_id': category_id, 'id': bnd_id, 'ignore': 0,'segmentation': []
+                    }
+                    spool.write((", " if bnd_id > 0 else "") + json.dumps(anntation_info))
+                    bnd_id += 1
+            f.write('], "type": "instance", "annotations": [')
+            spool.seek(0)
+            shutil.copyfileobj(spool, f)
+            cats = [{'supercategory': 'none', 'id': cate_id, 'name': cate} for (cate_id, cate) in enumerate(categories)]
+            f.write('], "categories": ' + json.dumps(cats) + '}')
+        os.replace(temp_file, json_file)
+        succeeded = True
+    finally:
+        if pool is not None:
+            if succeeded:
+                pool.close()
+            else:
+                # do not wait for the remaining files to be parsed before the error propagates
+                pool.terminate()
+            pool.join()
+        for path in [spool_file, temp_file]:
+            if os.path.exists(path):
+                os.remove(path)
+    print("Success: {} xml files have been converted.".format(len(xml_list)))
+
+def iter_json_sections(json_file, keys):
+    """ yield (key, item) for the items of the top level lists json_file[key], key in keys, in file order,
+        the file is tokenized once and only the current item is held in memory
+    
+    Args:
+        json_file (str): json file
+        keys (list): e.g. ["categories", "images", "annotations"]
+    """
+    item_prefixes = dict((key + ".item", key) for key in keys)
+    builder = None
+    with open(json_file, "rb") as f:
+        for prefix, event, value in ijson.parse(f, use_float=True):
+            if builder is not None:
+                builder.event(event, value)
+                if prefix == item_prefix and event in ("end_map", "end_array"):
+                    yield item_prefixes[item_prefix], builder.value
+                    builder = None
+            elif prefix in item_prefixes:
+                if event in ("start_map", "start_array"):
+                    item_prefix = prefix
+                    builder = ijson.ObjectBuilder()
+                    builder.event(event, value)
+                else:
+                    yield item_prefixes[prefix], value
+
+def image_stem(file_name):
+    """ file_name without its image suffix, a name without one (e.g. a.b written by xml_to_json) is kept whole
+
+    """
+    stem, suffix = os.path.splitext(file_name)
+    return stem if suffix.lower() in IMAGE_SUFFIXES else file_name
+
+def json_to_xml(json_file, target_dir, workers=1, chunk_size=64, streaming=None):
+    """ convert a COCO json file (e.g. written by xml_to_json or a detector) to VOC xml files,
+        one per image, images without annotations get an xml without objects.
+        categories, images and annotations are read in one pass, whatever their order in the file;
+        the annotations are grouped by image before any xml is written, so memory grows with
+        the number of annotations (one small list per box), the json itself is never loaded whole when streaming
+    
+    Args:
+        json_file (str): json file
+        target_dir (str): target xml dir
+        workers (int): the number of processes used to write xml files
+        chunk_size (int): the number of xml files sent to a process at a time
+        streaming (bool): parse the json incrementally with ijson, default is True when ijson is installed,
+            True without ijson raises ImportError
+    Return:
+        count (int): the number of xml files written
+    """
+    if streaming is None:
+        streaming = ijson is not None
+    elif streaming and ijson is None:
+        raise ImportError("json_to_xml(streaming=True) needs ijson, install it or pass streaming=False")
+    keys = ["categories", "images", "image", "annotations"] # xml_to_json writes "image"
+    if streaming:
+        items = iter_json_sections(json_file, keys)
+    else:
+        with open(json_file, "r") as f:
+            json_dict = json.load(f)
+        items = ((key, item) for key in keys for item in json_dict.get(key, []))
+    categories = {}
+    images = {}
+    # boxes grouped by image id, the category names are looked up at the end since categories may come last
+    detections = defaultdict(list)
+    for key, item in items:
+        if key == "annotations":
+            x, y, w, h = item["bbox"]
+            detections[item["image_id"]].append([int(round(x)), int(round(y)), int(round(x + w)), int(round(y + h)),
+                                                 item["category_id"]])
+        elif key == "categories":
+            categories[item["id"]] = item["name"]
+        else:
+            images[item["id"]] = (image_stem(str(item["file_name"])), item["width"], item["height"])
+    dropped = sum(len(boxes) for image_id, boxes in detections.items() if image_id not in images)
+    if dropped > 0:
+        print("Warning: {} annotations refer to unknown images.".format(dropped))
+
+    def image_records():
+        for image_id, (image_name, width, height) in images.items():
+            boxes = detections.pop(image_id, [])
+            for box in boxes:
+                box[4] = categories.get(box[4], str(box[4]))
+            yield image_name, width, height, boxes
+
+    count = generate_xmls(target_dir, image_records(), workers=workers, chunk_size=chunk_size)
+    print("Success: {} xml files have been generated.".format(count))
+    return count